@@ -0,0 +1,679 @@
+"""Benchmark the rendering of the validation documents on synthetic templates and checklists.
+
+Synthetic .docx templates containing the same merge fields as the real templates and matching
+tab-delimited inputs are generated for every checklist size; every registered document is then
+timed by phase (template load, tsv parse, row merge and write).  The results are written as JSON
+and can be compared against the results of a previous commit:
+
+    python benchmarks/benchmark_validation_docs.py --outfile before.json
+    python benchmarks/benchmark_validation_docs.py --outfile after.json --baseline before.json
+
+The peak resident memory of rendering every document is measured in a fresh interpreter for both the
+in-memory and the streaming mode, since streaming is meant to keep it bounded as checklists grow.
+The streaming peak of every document rendered on its own is checked as well: the benchmark exits
+non-zero when a document exceeds --max_streaming_rss megabytes or, given --max_streaming_growth,
+grows by more than that from the smallest to the largest size.
+The memory traced by tracemalloc is reported as well: the peak of every document and the bytes and
+blocks held by the records of every table, i.e. what the compact table records are meant to save.
+"""
+import contextlib
+import gc
+import io
+import json
+import logging
+import os
+import pathlib
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from zipfile import ZipFile, ZIP_DEFLATED
+
+import click
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, REPO_DIR)
+
+import generate_validation_docs as gvd
+
+DEFAULT_SIZES = '100,10000,100000'
+
+MEMORY_MODES = {'in-memory': False, 'streaming': True}
+
+# renders the documents in a fresh interpreter, see run_peak_rss()
+PEAK_RSS_SCRIPT = """import json, sys
+sys.path.insert(0, sys.argv[1])
+import benchmark_validation_docs
+print(json.dumps(benchmark_validation_docs.get_peak_rss(*json.loads(sys.argv[2]))))
+"""
+
+PHASES = gvd.TIMING_PHASES
+
+W_NAMESPACE = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+R_NAMESPACE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+CONTENT_TYPES_XML = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types"><Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/><Default Extension="xml" ContentType="application/xml"/><Default Extension="png" ContentType="image/png"/><Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/><Override PartName="/word/header1.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.header+xml"/><Override PartName="/word/settings.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.settings+xml"/><Override PartName="/word/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/></Types>'''
+
+PACKAGE_RELS_XML = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships"><Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/></Relationships>'''
+
+DOCUMENT_RELS_XML = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships"><Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/><Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/settings" Target="settings.xml"/><Relationship Id="rId3" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/header" Target="header1.xml"/><Relationship Id="rId4" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/image" Target="media/image1.png"/></Relationships>'''
+
+STYLES_XML = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:styles xmlns:w="{}"><w:docDefaults><w:rPrDefault><w:rPr><w:sz w:val="20"/></w:rPr></w:rPrDefault></w:docDefaults></w:styles>'''.format(W_NAMESPACE)
+
+SETTINGS_XML = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:settings xmlns:w="{}"><w:mailMerge><w:mainDocumentType w:val="formLetters"/></w:mailMerge></w:settings>'''.format(W_NAMESPACE)
+
+
+def get_simple_field_xml(field):
+    """Build a simple MERGEFIELD
+    :param field: {str} the merge field name
+    :return xml: {str}
+    """
+    return '<w:fldSimple w:instr=" MERGEFIELD {0} \\* MERGEFORMAT "><w:r><w:t>&#171;{0}&#187;</w:t></w:r></w:fldSimple>'.format(field)
+
+
+def get_complex_field_xml(field):
+    """Build a MERGEFIELD made of begin, instruction, separate and end runs as Word saves them
+    :param field: {str} the merge field name
+    :return xml: {str}
+    """
+    return ('<w:r><w:fldChar w:fldCharType="begin"/></w:r>'
+            '<w:r><w:instrText xml:space="preserve"> MERGEFIELD {0} </w:instrText></w:r>'
+            '<w:r><w:fldChar w:fldCharType="separate"/></w:r>'
+            '<w:r><w:rPr><w:b/></w:rPr><w:t>&#171;{0}&#187;</w:t></w:r>'
+            '<w:r><w:fldChar w:fldCharType="end"/></w:r>').format(field)
+
+
+def get_table_xml(fields):
+    """Build a table with a heading row and a template row holding one merge field per column
+    :param fields: {list} the merge field names
+    :return xml: {str}
+    """
+    heading_cells = ''.join(['<w:tc><w:p><w:r><w:t>{}</w:t></w:r></w:p></w:tc>'.format(field.upper()) for field in fields])
+    template_cells = ''.join(['<w:tc><w:p>{}</w:p></w:tc>'.format(get_complex_field_xml(field) if field_ctr == 0 else get_simple_field_xml(field))
+                              for field_ctr, field in enumerate(fields)])
+    return '<w:tbl><w:tblPr><w:tblW w:w="0" w:type="auto"/></w:tblPr><w:tr>{}</w:tr><w:tr>{}</w:tr></w:tbl>'.format(heading_cells, template_cells)
+
+
+def get_template_tables(doc_type):
+    """Derive the tables of the synthetic template of a document from the registry, so that the templates
+    carry the same tables and merge fields as the documents the script renders
+    :param doc_type: {str} the document type in gvd.DOCUMENT_REGISTRY
+    :return tables: {list} the merge fields of every table, anchor merge field first
+    """
+    return [list(gvd.TABLE_FIELDS[anchor]) for anchor, table_input, load_records in gvd.DOCUMENT_REGISTRY[doc_type]['tables']]
+
+
+def create_template(template_file, tables):
+    """Create a synthetic .docx template with the header merge fields and the given tables
+    :param template_file: {str} the template file to create
+    :param tables: {list} the merge fields of every table
+    :return None:
+    """
+    header_fields = ''.join([get_simple_field_xml(field) for field in gvd.HEADER_MERGE_FIELDS])
+    body = '<w:p><w:r><w:t xml:space="preserve">Prepared by </w:t></w:r>{}</w:p>'.format(header_fields)
+    for fields in tables:
+        body += '<w:p><w:r><w:t>Table</w:t></w:r></w:p>' + get_table_xml(fields)
+    body += '<w:sectPr><w:headerReference w:type="default" r:id="rId3"/></w:sectPr>'
+
+    document_xml = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<w:document xmlns:w="{}" xmlns:r="{}"><w:body>{}</w:body></w:document>'.format(W_NAMESPACE, R_NAMESPACE, body)
+    header_xml = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<w:hdr xmlns:w="{}"><w:p>{}</w:p></w:hdr>'.format(W_NAMESPACE, get_simple_field_xml('software_name'))
+
+    with ZipFile(template_file, 'w', ZIP_DEFLATED) as output:
+        output.writestr('[Content_Types].xml', CONTENT_TYPES_XML)
+        output.writestr('_rels/.rels', PACKAGE_RELS_XML)
+        output.writestr('word/_rels/document.xml.rels', DOCUMENT_RELS_XML)
+        output.writestr('word/document.xml', document_xml)
+        output.writestr('word/header1.xml', header_xml)
+        output.writestr('word/styles.xml', STYLES_XML)
+        output.writestr('word/settings.xml', SETTINGS_XML)
+        # stands in for the logos and other media that the real templates carry
+        output.writestr('word/media/image1.png', os.urandom(64 * 1024))
+
+
+def write_tsv_file(outfile, header, rows):
+    """Write a tab-delimited file
+    :param outfile: {str} the output file
+    :param header: {list} the column names
+    :param rows: {iterable} the rows
+    :return None:
+    """
+    with open(outfile, 'w') as fh:
+        fh.write('\t'.join(header) + '\n')
+        for row in rows:
+            fh.write('\t'.join(row) + '\n')
+
+
+def create_project(project_dir, num_rows):
+    """Create the templates, the tab-delimited inputs and the configuration file of a synthetic project
+    :param project_dir: {str} the project directory
+    :param num_rows: {int} the number of rows in every checklist
+    :return config_file: {str} the configuration file
+    """
+    template_files_dir = os.path.join(project_dir, 'template_files_dir')
+    pathlib.Path(template_files_dir).mkdir(parents=True, exist_ok=True)
+
+    config = {
+        'template_files_dir': template_files_dir,
+        'software_name': 'Benchmark',
+        'software_version': '1.0',
+        'server': 'localhost',
+        'default document prepared by': 'Benchmark',
+        'version history file basename': 'version_history.tsv',
+        'IQ': {'hardware checklist file basename': 'iq_hardware.tsv', 'software checklist file basename': 'iq_software.tsv'},
+        'OQ': {'checklist file basename': 'oq_checklist.tsv', 'test data file basename': 'oq_test_data.tsv'},
+        'User Requirements': {'checklist file basename': 'user_requirements.tsv'}
+    }
+
+    # every document in the registry, including the optional documents
+    for doc_type in gvd.DOCUMENT_REGISTRY:
+        basename = doc_type + ' template.docx'
+        create_template(os.path.join(template_files_dir, basename), get_template_tables(doc_type))
+        config.setdefault(gvd.DOCUMENT_REGISTRY[doc_type]['template'], {})['template file basename'] = basename
+
+    write_tsv_file(os.path.join(project_dir, 'iq_hardware.tsv'), ['Description', 'Requirement'],
+                   (['Hardware component {} & <rack {}>'.format(i, i % 42), 'Minimum requirement {}'.format(i)] for i in range(num_rows)))
+    write_tsv_file(os.path.join(project_dir, 'iq_software.tsv'), ['Description', 'Requirement'],
+                   (['Software package {}'.format(i), 'Version >= {}.{}'.format(i % 7, i % 13)] for i in range(num_rows)))
+    write_tsv_file(os.path.join(project_dir, 'oq_checklist.tsv'), ['Test Number', 'Test Procedure', 'Expected Finding'],
+                   (['T{}'.format(i), 'Run step {} of the procedure and record the output'.format(i), 'Output matches the expected value {}'.format(i)] for i in range(num_rows)))
+    write_tsv_file(os.path.join(project_dir, 'oq_test_data.tsv'), ['Name', 'Description'],
+                   (['dataset_{}'.format(i), 'Synthetic dataset {}'.format(i)] for i in range(10)))
+    write_tsv_file(os.path.join(project_dir, 'user_requirements.tsv'), ['ID', 'Requirement Description', 'Criticality', 'Comment', 'Test ID'],
+                   (['UR{}'.format(i), 'The system shall support requirement {}'.format(i), ('High', 'Medium', 'Low')[i % 3], '', 'T{}'.format(i)] for i in range(num_rows)))
+    write_tsv_file(os.path.join(project_dir, 'version_history.tsv'), ['Version', 'Date', 'Comment'],
+                   ([str(i), '01-Jan-2020', 'Release {}'.format(i)] for i in range(10)))
+
+    config_file = os.path.join(project_dir, 'config.json')
+    with open(config_file, 'w') as fh:
+        json.dump(config, fh, indent=2)
+
+    return config_file
+
+
+def start_release(config_file, outdir, streaming, compression_level=None, buffered_write=False):
+    """Resolve the release of the synthetic project, starting from empty caches
+    :param config_file: {str} the configuration file of the synthetic project
+    :param outdir: {str} the output directory
+    :param streaming: {bool} whether to stream the checklist rows
+    :param compression_level: {int} the deflate level of the documents, 0 to store them uncompressed
+    :param buffered_write: {bool} whether to assemble the documents in memory before writing them
+    :return None:
+    """
+    gvd.g_template_cache.clear()
+    gvd.g_input_record_store.clear()
+    del gvd.g_timing_spans[:]
+    pathlib.Path(outdir).mkdir(parents=True, exist_ok=True)
+
+    gvd.g_streaming = streaming
+    gvd.g_compression_level = compression_level
+    gvd.g_buffered_write = buffered_write
+    gvd.g_non_interactive = True
+    gvd.g_answers = {
+        'prepare_executed_iq': 'Y',
+        'prepare_executed_oq': 'Y',
+        'prepare_executed_pq': 'Y',
+        'version_history_comment': 'Benchmark release',
+        'append_version_history': 'n'
+    }
+
+    gvd.load_config(config_file)
+    gvd.resolve_release(config_file, outdir, None, None, None, None, None, '01-Jan-2020')
+    gvd.ask_executed_documents()
+    gvd.get_version_history_records()
+
+
+def verify_document(outfile):
+    """Check the CRC of every member of a rendered document, including the members that were copied
+    from the template as raw compressed bytes
+    :param outfile: {str} the rendered document
+    :return None:
+    """
+    with ZipFile(outfile) as document:
+        bad_member = document.testzip()
+
+    if bad_member is not None:
+        raise Exception("Member '{}' of document '{}' is corrupt".format(bad_member, outfile))
+
+
+def run_documents(config_file, outdir, streaming, compression_level=None, buffered_write=False, doc_types=None):
+    """Render every validation document of the synthetic project once, starting from empty caches
+    :param config_file: {str} the configuration file of the synthetic project
+    :param outdir: {str} the output directory
+    :param streaming: {bool} whether to stream the checklist rows
+    :param compression_level: {int} the deflate level of the documents, 0 to store them uncompressed
+    :param buffered_write: {bool} whether to assemble the documents in memory before writing them
+    :param doc_types: {list} the documents to render, default every document of the release
+    :return document_timings: {dict} seconds keyed by document type and then by phase, plus 'total'
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        start_release(config_file, outdir, streaming, compression_level, buffered_write)
+
+        document_timings = {}
+        for doc_type in (gvd.get_release_doc_types() if doc_types is None else doc_types):
+            start_time = time.perf_counter()
+            gvd.render_document(doc_type)
+            document_timings[doc_type] = {'total': time.perf_counter() - start_time}
+            verify_document(gvd.get_outfile(doc_type))
+
+    for doc_type, phase_timings in gvd.get_phase_timings().items():
+        if doc_type in document_timings:
+            for phase in PHASES:
+                document_timings[doc_type][phase] = phase_timings.get(phase, 0.0)
+
+    return document_timings
+
+
+def measure_allocations(config_file, outdir, streaming, compression_level=None, buffered_write=False):
+    """Trace the memory allocated while rendering every validation document and the memory held by the
+    records of every table once the input files are loaded
+    :param config_file: {str} the configuration file of the synthetic project
+    :param outdir: {str} the output directory
+    :param streaming: {bool} whether to stream the checklist rows
+    :param compression_level: {int} the deflate level of the documents, 0 to store them uncompressed
+    :param buffered_write: {bool} whether to assemble the documents in memory before writing them
+    :return allocations: {dict} the peak kilobytes keyed by document type under 'documents' and the
+    records, kilobytes and blocks keyed by table anchor merge field under 'tables'
+    """
+    allocations = {'documents': {}, 'tables': {}}
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start_release(config_file, outdir, streaming, compression_level, buffered_write)
+        doc_types = gvd.get_release_doc_types()
+        gvd.preload_shared_records(doc_types)
+
+        tracemalloc.start()
+        try:
+            for doc_type in doc_types:
+                tracemalloc.reset_peak()
+                current, peak = tracemalloc.get_traced_memory()
+                gvd.render_document(doc_type)
+                allocations['documents'][doc_type] = {'peak_kb': (tracemalloc.get_traced_memory()[1] - current) / 1024}
+
+            for doc_type in doc_types:
+                for anchor, table_inputs, load_records in gvd.get_document_tables(doc_type):
+                    if anchor in allocations['tables']:
+                        continue
+                    # collect the garbage of the previous tables first, so that freeing it is not
+                    # subtracted from the memory held by these records
+                    gc.collect()
+                    before = tracemalloc.take_snapshot()
+                    current = tracemalloc.get_traced_memory()[0]
+                    records = list(load_records())
+                    gc.collect()
+                    # measured while the records are still held
+                    size = tracemalloc.get_traced_memory()[0] - current
+                    statistics = tracemalloc.take_snapshot().compare_to(before, 'filename')
+                    allocations['tables'][anchor] = {
+                        'records': len(records),
+                        'kb': max(0, size) / 1024,
+                        'blocks': max(0, sum([statistic.count_diff for statistic in statistics]))
+                    }
+                    del records
+        finally:
+            tracemalloc.stop()
+
+    return allocations
+
+
+def get_rss_mb():
+    """Retrieve the peak resident memory of this process so far.  On Linux the maximum of getrusage() survives
+    exec, so a fresh interpreter started by a large benchmark process would report the peak of its parent;
+    the high-water mark of the process's own memory is read instead where available.
+    :return rss: {float} megabytes
+    """
+    try:
+        with open('/proc/self/status') as fh:
+            for line in fh:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    if sys.platform == 'darwin':
+        max_rss = max_rss / 1024
+
+    return max_rss / 1024
+
+
+def get_peak_rss(config_file, outdir, streaming, compression_level=None, buffered_write=False, doc_types=None):
+    """Render the validation documents once and report the peak resident memory of the process;
+    meant to run in a fresh interpreter, see run_peak_rss()
+    :param config_file: {str} the configuration file of the synthetic project
+    :param outdir: {str} the output directory
+    :param streaming: {bool} whether to stream the checklist rows
+    :param compression_level: {int} the deflate level of the documents, 0 to store them uncompressed
+    :param buffered_write: {bool} whether to assemble the documents in memory before writing them
+    :param doc_types: {list} the documents to render, default every document of the release
+    :return memory: {dict} the peak resident megabytes before and after rendering
+    """
+    logging.disable(logging.CRITICAL)
+
+    baseline_rss = get_rss_mb()
+    run_documents(config_file, outdir, streaming, compression_level, buffered_write, doc_types)
+
+    return {'baseline_rss_mb': baseline_rss, 'peak_rss_mb': get_rss_mb()}
+
+
+def run_peak_rss(config_file, outdir, streaming, compression_level=None, buffered_write=False, doc_types=None):
+    """Run get_peak_rss() in a fresh interpreter so that the peak resident memory is that of one run only
+    :param config_file: {str} the configuration file of the synthetic project
+    :param outdir: {str} the output directory
+    :param streaming: {bool} whether to stream the checklist rows
+    :param compression_level: {int} the deflate level of the documents, 0 to store them uncompressed
+    :param buffered_write: {bool} whether to assemble the documents in memory before writing them
+    :param doc_types: {list} the documents to render, default every document of the release
+    :return memory: {dict} see get_peak_rss()
+    """
+    arguments = json.dumps([config_file, outdir, streaming, compression_level, buffered_write, doc_types])
+    output = subprocess.check_output([sys.executable, '-c', PEAK_RSS_SCRIPT, os.path.dirname(os.path.abspath(__file__)), arguments], cwd=REPO_DIR)
+
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def measure_peak_rss(config_file, outdir, compression_level=None, buffered_write=False):
+    """Measure the peak resident memory of rendering every document in the in-memory and streaming modes
+    :param config_file: {str} the configuration file of the synthetic project
+    :param outdir: {str} the output directory
+    :param compression_level: {int} the deflate level of the documents, 0 to store them uncompressed
+    :param buffered_write: {bool} whether to assemble the documents in memory before writing them
+    :return memory: {dict} keyed by mode, see get_peak_rss()
+    """
+    memory = {}
+    for mode, streaming in MEMORY_MODES.items():
+        memory[mode] = run_peak_rss(config_file, outdir, streaming, compression_level, buffered_write)
+
+    return memory
+
+
+def measure_document_peak_rss(config_file, outdir, compression_level=None, buffered_write=False):
+    """Measure the peak resident memory of rendering each document on its own in the streaming mode,
+    which is meant to stay bounded however many rows the checklists have
+    :param config_file: {str} the configuration file of the synthetic project
+    :param outdir: {str} the output directory
+    :param compression_level: {int} the deflate level of the documents, 0 to store them uncompressed
+    :param buffered_write: {bool} whether to assemble the documents in memory before writing them
+    :return memory: {dict} keyed by document type, see get_peak_rss()
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        start_release(config_file, outdir, True, compression_level, buffered_write)
+        doc_types = gvd.get_release_doc_types()
+
+    memory = {}
+    for doc_type in doc_types:
+        memory[doc_type] = run_peak_rss(config_file, outdir, True, compression_level, buffered_write, [doc_type])
+
+    return memory
+
+
+def check_bounded_memory(results, max_streaming_rss, max_streaming_growth):
+    """Check that the streaming peak resident memory of every document stays bounded as the checklists grow
+    :param results: {dict} the benchmark results
+    :param max_streaming_rss: {float} the megabytes that no document may exceed, None for no ceiling
+    :param max_streaming_growth: {float} the megabytes by which a document may grow from the smallest to the largest size,
+    None to allow any growth
+    :return violations: {list} descriptions of the documents whose memory is not bounded
+    """
+    violations = []
+
+    document_memory = results.get('document_memory', {})
+    if len(document_memory) == 0:
+        return violations
+
+    sizes = sorted(document_memory, key=int)
+    smallest, largest = document_memory[sizes[0]], document_memory[sizes[-1]]
+
+    for size in sizes:
+        for doc_type, memory in document_memory[size].items():
+            if max_streaming_rss is not None and memory['peak_rss_mb'] > max_streaming_rss:
+                violations.append("{} rows, '{}' streaming peak RSS: {:.1f} MB exceeds the {:.1f} MB ceiling".format(size, doc_type, memory['peak_rss_mb'], max_streaming_rss))
+
+    if max_streaming_growth is not None and len(sizes) > 1:
+        for doc_type, memory in largest.items():
+            if doc_type not in smallest:
+                continue
+            growth = memory['peak_rss_mb'] - smallest[doc_type]['peak_rss_mb']
+            if growth > max_streaming_growth:
+                violations.append("'{}' streaming peak RSS grew by {:.1f} MB from {} to {} rows".format(doc_type, growth, sizes[0], sizes[-1]))
+
+    return violations
+
+
+def measure_startup(config_file, repeat):
+    """Time fresh interpreters importing the module, printing the help and running the check command,
+    i.e. the quick operations that wrapper scripts invoke many times
+    :param config_file: {str} the configuration file of a synthetic project
+    :param repeat: {int} the number of runs per command; the fastest run is reported
+    :return startup_timings: {dict} seconds keyed by command
+    """
+    script = os.path.join(REPO_DIR, 'generate_validation_docs.py')
+    commands = {
+        'import': [sys.executable, '-c', 'import generate_validation_docs'],
+        'help': [sys.executable, script, '--help'],
+        'check': [sys.executable, script, 'check', '--config_file', config_file]
+    }
+
+    startup_timings = {}
+    for name, command in commands.items():
+        fastest = None
+        for repeat_ctr in range(repeat):
+            start_time = time.perf_counter()
+            subprocess.run(command, cwd=REPO_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+            seconds = time.perf_counter() - start_time
+            if fastest is None or seconds < fastest:
+                fastest = seconds
+        startup_timings[name] = fastest
+
+    return startup_timings
+
+
+def get_git_commit():
+    """Retrieve the commit of the working tree being benchmarked
+    :return commit: {str} the commit hash or None outside of a git checkout
+    """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL).decode().strip()
+    except (subprocess.CalledProcessError, OSError):
+        return None
+
+
+def compare_results(results, baseline, max_regression, min_delta, min_memory_delta):
+    """Compare the timings and memory with those of a previous run
+    :param results: {dict} the benchmark results
+    :param baseline: {dict} the benchmark results to compare against
+    :param max_regression: {float} the allowed ratio of new to baseline seconds or megabytes
+    :param min_delta: {float} slowdowns of fewer seconds than this are ignored as noise
+    :param min_memory_delta: {float} increases of fewer megabytes than this are ignored as noise
+    :return regressions: {list} descriptions of the timings and memory that regressed
+    """
+    regressions = []
+
+    for size, modes in results.get('memory', {}).items():
+        for mode, memory in modes.items():
+            baseline_memory = baseline.get('memory', {}).get(size, {}).get(mode)
+            if baseline_memory is None:
+                continue
+            megabytes = memory['peak_rss_mb']
+            baseline_megabytes = baseline_memory['peak_rss_mb']
+            if megabytes - baseline_megabytes > min_memory_delta and megabytes > baseline_megabytes * max_regression:
+                regressions.append("{} rows, {} peak RSS: {:.1f} MB vs {:.1f} MB in the baseline".format(size, mode, megabytes, baseline_megabytes))
+
+    for size, allocations in results.get('allocations', {}).items():
+        baseline_allocations = baseline.get('allocations', {}).get(size, {})
+        for doc_type, memory in allocations['documents'].items():
+            baseline_memory = baseline_allocations.get('documents', {}).get(doc_type)
+            if baseline_memory is None:
+                continue
+            kilobytes = memory['peak_kb']
+            baseline_kilobytes = baseline_memory['peak_kb']
+            if kilobytes - baseline_kilobytes > min_memory_delta * 1024 and kilobytes > baseline_kilobytes * max_regression:
+                regressions.append("{} rows, '{}' traced peak: {:.0f} KB vs {:.0f} KB in the baseline".format(size, doc_type, kilobytes, baseline_kilobytes))
+        for anchor, memory in allocations['tables'].items():
+            baseline_memory = baseline_allocations.get('tables', {}).get(anchor)
+            if baseline_memory is None or memory['records'] == 0 or memory['records'] != baseline_memory['records']:
+                continue
+            if memory['blocks'] > baseline_memory['blocks'] * max_regression:
+                regressions.append("{} rows, '{}' table records: {} blocks vs {} blocks in the baseline".format(size, anchor, memory['blocks'], baseline_memory['blocks']))
+
+    for command, seconds in results.get('startup', {}).items():
+        baseline_seconds = baseline.get('startup', {}).get(command)
+        if baseline_seconds is not None and seconds - baseline_seconds > min_delta and seconds > baseline_seconds * max_regression:
+            regressions.append("startup '{}': {:.3f}s vs {:.3f}s in the baseline".format(command, seconds, baseline_seconds))
+
+    for size, documents in results['results'].items():
+        for doc_type, timings in documents.items():
+            baseline_timings = baseline.get('results', {}).get(size, {}).get(doc_type)
+            if baseline_timings is None:
+                continue
+            for phase in ['total'] + PHASES:
+                if phase not in timings or phase not in baseline_timings:
+                    continue
+                seconds = timings[phase]
+                baseline_seconds = baseline_timings[phase]
+                if seconds - baseline_seconds > min_delta and seconds > baseline_seconds * max_regression:
+                    regressions.append("{} rows, '{}' {}: {:.3f}s vs {:.3f}s in the baseline".format(size, doc_type, phase, seconds, baseline_seconds))
+
+    return regressions
+
+
+def display_results(results):
+    """Print the benchmark results as one table per checklist size
+    :param results: {dict} the benchmark results
+    :return None:
+    """
+    if 'startup' in results:
+        print("\nStartup")
+        for command, seconds in results['startup'].items():
+            print("{:<10}{:>10.3f}".format(command, seconds))
+
+    width = max([len(doc_type) for doc_type in gvd.DOCUMENT_REGISTRY])
+    for size, documents in results['results'].items():
+        print("\n{} rows".format(size))
+        print("{:<{}}".format('Document', width) + ''.join(['{:>15}'.format(phase) for phase in PHASES + ['total']]))
+        for doc_type, timings in documents.items():
+            print("{:<{}}".format(doc_type, width) + ''.join(['{:>15.3f}'.format(timings.get(phase, 0.0)) for phase in PHASES + ['total']]))
+
+    if 'memory' in results:
+        print("\nPeak RSS (MB)")
+        print("{:<10}".format('Rows') + ''.join(['{:>15}'.format(mode) for mode in MEMORY_MODES]))
+        for size, modes in results['memory'].items():
+            print("{:<10}".format(size) + ''.join(['{:>15.1f}'.format(modes[mode]['peak_rss_mb']) for mode in MEMORY_MODES]))
+
+    if 'document_memory' in results:
+        sizes = list(results['document_memory'])
+        print("\nStreaming peak RSS per document (MB)")
+        print("{:<{}}".format('Document', width) + ''.join(['{:>15}'.format(size) for size in sizes]))
+        for doc_type in results['document_memory'][sizes[-1]]:
+            print("{:<{}}".format(doc_type, width) + ''.join(['{:>15.1f}'.format(results['document_memory'][size][doc_type]['peak_rss_mb'])
+                                                            for size in sizes if doc_type in results['document_memory'][size]]))
+
+    for size, allocations in results.get('allocations', {}).items():
+        print("\n{} rows, traced allocations".format(size))
+        print("{:<{}}{:>15}".format('Document', width, 'peak KB'))
+        for doc_type, memory in allocations['documents'].items():
+            print("{:<{}}{:>15.0f}".format(doc_type, width, memory['peak_kb']))
+        print("{:<{}}{:>15}{:>15}{:>15}{:>15}".format('Table', width, 'records', 'KB', 'blocks', 'blocks/record'))
+        for anchor, memory in allocations['tables'].items():
+            blocks_per_record = memory['blocks'] / memory['records'] if memory['records'] > 0 else 0.0
+            print("{:<{}}{:>15}{:>15.0f}{:>15}{:>15.2f}".format(anchor, width, memory['records'], memory['kb'], memory['blocks'], blocks_per_record))
+
+
+@click.command()
+@click.option('--sizes', default=DEFAULT_SIZES, show_default=True, help="Comma-separated numbers of checklist rows to benchmark")
+@click.option('--repeat', type=click.IntRange(min=1), default=3, show_default=True, help="The number of runs per size; the fastest run is reported")
+@click.option('--streaming', is_flag=True, help="Benchmark the streaming mode")
+@click.option('--compression_level', type=click.IntRange(min=0, max=9), help="The deflate level of the documents, 0 to store them uncompressed")
+@click.option('--buffered_write', is_flag=True, help="Assemble the documents in memory before writing them")
+@click.option('--startup_repeat', type=click.IntRange(min=0), default=10, show_default=True, help="The number of runs per startup measurement, 0 to skip")
+@click.option('--skip_memory', is_flag=True, help="Do not measure the peak resident memory of the in-memory and streaming modes nor trace the allocations")
+@click.option('--workdir', help="The directory for the synthetic projects and documents, default a temporary directory")
+@click.option('--outfile', help="The JSON file to write the results to")
+@click.option('--baseline', type=click.Path(exists=True), help="JSON results of a previous run to compare against")
+@click.option('--max_regression', type=float, default=1.2, show_default=True, help="The allowed ratio of new to baseline seconds")
+@click.option('--min_delta', type=float, default=0.05, show_default=True, help="Slowdowns of fewer seconds than this are ignored")
+@click.option('--min_memory_delta', type=float, default=5.0, show_default=True, help="Peak RSS increases of fewer megabytes than this are ignored")
+@click.option('--max_streaming_rss', type=float, default=96.0, show_default=True, help="Fail when the streaming peak RSS of a document exceeds this many megabytes")
+@click.option('--max_streaming_growth', type=float, help="Fail when the streaming peak RSS of a document grows by more megabytes than this from the smallest to the largest size")
+def main(sizes, repeat, streaming, compression_level, buffered_write, startup_repeat, skip_memory, workdir, outfile, baseline, max_regression, min_delta, min_memory_delta,
+         max_streaming_rss, max_streaming_growth):
+    """Benchmark every registered validation document on synthetic templates and checklists
+    """
+    logging.disable(logging.CRITICAL)
+
+    if workdir is None:
+        workdir = tempfile.mkdtemp(prefix='benchmark_validation_docs.')
+
+    results = {
+        'created': datetime.today().strftime('%Y-%m-%d %H:%M:%S'),
+        'git_commit': get_git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'streaming': streaming,
+        'compression_level': compression_level,
+        'buffered_write': buffered_write,
+        'repeat': repeat,
+        'results': {}
+    }
+
+    for size_ctr, size in enumerate([int(size) for size in sizes.split(',')]):
+        project_dir = os.path.join(workdir, '{}-rows'.format(size))
+        print("Creating synthetic project with '{}' rows in '{}'".format(size, project_dir))
+        config_file = create_project(project_dir, size)
+
+        if size_ctr == 0 and startup_repeat > 0:
+            results['startup'] = measure_startup(config_file, startup_repeat)
+
+        fastest = {}
+        for repeat_ctr in range(repeat):
+            document_timings = run_documents(config_file, os.path.join(project_dir, 'output'), streaming, compression_level, buffered_write)
+            for doc_type, timings in document_timings.items():
+                if doc_type not in fastest or timings['total'] < fastest[doc_type]['total']:
+                    fastest[doc_type] = timings
+
+        results['results'][str(size)] = fastest
+
+        if not skip_memory:
+            results.setdefault('memory', {})[str(size)] = measure_peak_rss(config_file, os.path.join(project_dir, 'output'), compression_level, buffered_write)
+            results.setdefault('document_memory', {})[str(size)] = measure_document_peak_rss(config_file, os.path.join(project_dir, 'output'), compression_level, buffered_write)
+            results.setdefault('allocations', {})[str(size)] = measure_allocations(config_file, os.path.join(project_dir, 'output'), streaming, compression_level, buffered_write)
+
+    display_results(results)
+
+    if outfile is not None:
+        with open(outfile, 'w') as fh:
+            json.dump(results, fh, indent=2)
+        print("\nWrote benchmark results to '{}'".format(outfile))
+
+    violations = check_bounded_memory(results, max_streaming_rss, max_streaming_growth)
+    if len(violations) > 0:
+        print("\nStreaming memory is not bounded:")
+        for violation in violations:
+            print(violation)
+
+    if baseline is not None:
+        with open(baseline) as fh:
+            regressions = compare_results(results, json.load(fh), max_regression, min_delta, min_memory_delta)
+        if len(regressions) > 0:
+            print("\nRegressions against baseline '{}':".format(baseline))
+            for regression in regressions:
+                print(regression)
+            sys.exit(1)
+        print("\nNo regressions against baseline '{}'".format(baseline))
+
+    if len(violations) > 0:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,27 +1,28 @@
-import subprocess
 import csv
-from docx import Document
-from docx.shared import Inches
+import contextlib
+import copy
+import io
+import itertools
+import re
+import threading
 import os
+import shutil
 import sys
 import click
 import pathlib
 import json
 import logging
-import calendar
+import hashlib
 import time
-import pathlib
+import uuid
+from collections.abc import Mapping
 from colorama import Fore, Style
 from datetime import datetime
-from mailmerge import MailMerge
-from datetime import date
-
-DEFAULT_DOCUMENT_PREPARED_DATE = str(datetime.today().strftime('%d-%b-%Y'))
-
-DEFAULT_OUTDIR = "/tmp/" + os.path.basename(__file__) + '/' + str(datetime.today().strftime('%Y-%m-%d-%H%M%S'))
 
 g_config = None
+g_config_file = None
 g_config_dir = None
+g_config_cache = {}
 g_software_name = None
 g_software_version = None
 g_document_prepared_by = None
@@ -30,11 +31,6 @@ g_template_files_dir = None
 g_outdir = None
 g_server = None
 
-g_iq_checklist_ctr = 0
-
-g_iq_software_checklist_table_records = None
-g_iq_hardware_checklist_table_records = None
-
 g_iq_yes_no = None
 g_iq_date = None
 
@@ -47,805 +43,3218 @@ g_pq_date = None
 g_version_history_comment = None
 g_version_history_records = None
 
-g_reminders = ["Create OQ and PQ replicate folders", "Verify ending test numbers in the Test Plan"]
+g_traceability = None
+g_traceability_lock = threading.Lock()
 
-LOGGING_FORMAT = "%(levelname)s : %(asctime)s : %(pathname)s : %(lineno)d : %(message)s"
+g_input_record_store = {}
+g_input_record_store_stats = {'hits': 0, 'misses': 0}
+g_input_record_store_lock = threading.Lock()
+g_input_record_store_file_locks = {}
 
-LOG_LEVEL = logging.INFO
+g_timing_spans = []
+g_timing_spans_lock = threading.Lock()
 
+g_profile = False
+g_worker_profile_files = []
 
-def get_version_history_file():
-    """Derive the OQ checklist tab-delimited file
-    :return infile: {str} the absolute path to the OQ checklist tab-delimited file
-    """
-    if 'version history file basename' not in g_config:
-        error_msg = "Could not retrieve the 'version history file basename' from the config file"
-        logging.error(error_msg)
-        raise Exception(error_msg)
-    else:
-        basename = g_config['version history file basename']
-        infile = os.path.join(g_config_dir, basename)
+# a long-lived pool of document workers, e.g. of the render service, that is handed the release state with every document
+g_document_executor = None
 
-    if not os.path.exists(infile):
-        raise Exception("version history file '{}' does not exist".format(infile))
+# the module globals that a long-lived document worker needs to render a document of the current release
+RELEASE_STATE_GLOBALS = ['g_config', 'g_config_file', 'g_config_dir', 'g_software_name', 'g_software_version', 'g_document_prepared_by',
+                         'g_document_prepared_date', 'g_template_files_dir', 'g_outdir', 'g_server', 'g_iq_yes_no', 'g_iq_date',
+                         'g_oq_yes_no', 'g_oq_date', 'g_pq_yes_no', 'g_pq_date', 'g_version_history_comment', 'g_version_history_records',
+                         'g_answers', 'g_non_interactive', 'g_streaming', 'g_compression_level', 'g_buffered_write', 'g_log_max_records']
 
-    return infile
+g_template_cache = {}
+g_template_cache_lock = threading.Lock()
 
+TEMPLATE_CACHE_MAX_MERGED = 8
 
-def get_version_history_records():
-    """Retrieve the version history records from the tab-delimited file
-    :return version_history_records: {list} containing version history records
-    """
+g_file_hash_cache = {}
 
-    global g_version_history_records
+g_answers = {}
+g_non_interactive = False
 
-    if g_version_history_records is None or len(g_version_history_records) == 0:
+g_replicate_folder_servers = None
 
-        infile = get_version_history_file()
+g_streaming = False
 
-        header_to_position_lookup = {}
-        record_ctr = 0
-        version_history_records = []
+g_compression_level = None
+g_buffered_write = False
 
-        with open(infile) as f:
-            reader = csv.reader(f, delimiter='\t')
-            row_ctr = 0
-            for row in reader:
-                row_ctr += 1
-                if row_ctr == 1:
-                    field_ctr = 0
-                    for field in row:
-                        header_to_position_lookup[field] = field_ctr
-                        field_ctr += 1
-                    logging.info("Processed the header of tsv file '{}'".format(infile))
-                else:
-                    version_history_records.append({
-                        'vh_id': row[header_to_position_lookup['Version']],
-                        'vh_date': row[header_to_position_lookup['Date']],
-                        'vh_comment': row[header_to_position_lookup['Comment']]
-                    })
+g_pdf_workers = 0
 
-                    record_ctr += 1
+BUILD_MANIFEST_VERSION = 1
 
-            logging.info("Processed '{}' records in tab-delimited file '{}'".format(record_ctr, infile))
+PDF_CONVERTER_BASE_PORT = 2003
+PDF_CONVERTER_STARTUP_TIMEOUT = 120
+PDF_CONVERSION_TIMEOUT = 600
 
-        global g_version_history_comment
+TABLE_ROW_CHUNK_SIZE = 1000
 
-        if g_version_history_comment is None or g_version_history_comment is '':
-            g_version_history_comment = input("Please provide the version history comment for version '{}': ".format(g_software_version))
-            g_version_history_comment = g_version_history_comment.strip()
-            version_history_records.append({
-                'vh_id': g_software_version,
-                'vh_date': g_document_prepared_date,
-                'vh_comment': g_version_history_comment
-            })
+# the private ZipFile attributes that copy_zip_member() writes through
+ZIP_RAW_COPY_ATTRIBUTES = ['_lock', '_writing', '_seekable', '_writecheck', '_didModify', 'start_dir', 'filelist', 'NameToInfo', 'fp']
 
-        g_version_history_records = version_history_records
+WATCH_POLL_INTERVAL = 0.25
+WATCH_DEBOUNCE = 1.0
 
-        update_version_history_file(infile)
+TIMING_PHASES = ['template load', 'tsv parse', 'row merge', 'write']
 
-    return g_version_history_records
+DEFAULT_REMINDERS = ["Create OQ and PQ replicate folders", "Verify ending test numbers in the Test Plan"]
 
+g_reminders = list(DEFAULT_REMINDERS)
 
-def update_version_history_file(version_history_file):
-    """Append the new record to the bottom of the version history file
-    :param version_history_file: {str} abspath for the version history file
-    :return None:
-    """
+g_log_context = threading.local()
 
-    yes_or_no = input("\nAppend record to version history file '{}'? [Y/n] ".format(version_history_file))
-    
-    if yes_or_no is None or yes_or_no == '' or yes_or_no == 'Y' or yes_or_no == 'y':
-        with open(version_history_file, 'a') as fh:
-            fh.write("{}\t{}\t{}\n".format(g_software_version, g_document_prepared_date, g_version_history_comment))
+LOGGING_FORMAT = "%(levelname)s : %(asctime)s : %(pathname)s : %(lineno)d : %(doc_type)s : %(message)s"
 
-        logging.info("Appended record '{}' '{}' '{}' to version history file '{}'".format(g_software_version,
-                                                                                          g_document_prepared_date,
-                                                                                          g_version_history_comment,
-                                                                                          version_history_file))
-    else:
-        logging.info("Will not appended record '{}' '{}' '{}' to version history file '{}'".format(g_software_version,
-                                                                                                   g_document_prepared_date,
-                                                                                                   g_version_history_comment,
-                                                                                                   version_history_file))
-        global g_reminders
-        g_reminders.append("Append record '{}' '{}' '{}' to version history file '{}'".format(g_software_version,
-                                                                                                   g_document_prepared_date,
-                                                                                                   g_version_history_comment,
-                                                                                                   version_history_file))
+LOG_LEVEL = logging.INFO
 
+LOG_LEVELS = ['DEBUG', 'INFO', 'WARNING', 'ERROR']
 
-def display_reminders():
-    """Print the reminders to the STDOUT and log file
-    :return None:
-    """
-    count = len(g_reminders)
-    if count > 0:
-        print("\n\nSome friendly reminders:")
-        for i, reminder in enumerate(g_reminders, start=1):
-            print("{}. {}".format(i, reminder))
-            logging.info("{}. {}".format(i, reminder))
+LOG_MAX_RECORDS = 20
 
+g_log_max_records = LOG_MAX_RECORDS
 
-def instantiate_mailmerge(template_file):
-    """Instantiate the MailMerge class
 
-    :param template_file: {str} the template file
-    :return document: {Object} the MailMerge instance 
+def get_default_document_prepared_date():
+    """The document prepared date used when none is specified
+    :return document_prepared_date: {str} today's date, e.g. 01-Feb-2026
     """
-    document = MailMerge(template_file)
+    return str(datetime.today().strftime('%d-%b-%Y'))
 
-    logging.info(document.get_merge_fields())
 
-    document.merge(
-        document_prepared_by=g_document_prepared_by,
-        document_prepared_date=g_document_prepared_date,
-        software_name=g_software_name,
-        software_version=g_software_version,
-        server=g_server)
-
-    return document
+def get_default_outdir():
+    """The output directory used when none is specified
+    :return outdir: {str} a new timestamped directory under /tmp
+    """
+    return "/tmp/" + os.path.basename(__file__) + '/' + str(datetime.today().strftime('%Y-%m-%d-%H%M%S'))
 
 
-def get_template_file(doc_type):
-    """Derive the template file from the config file
-    :param doc_type: {str} document type
-    :return template_file: {str}
+@contextlib.contextmanager
+def timed_phase(phase):
+    """Record a timing span for a phase of rendering the current document.  Spans may be nested;
+    the time spent in nested spans is excluded from the self time of the enclosing span.
+    :param phase: {str} the phase, e.g. 'template load', 'tsv parse', 'row merge' or 'write'
+    :return None:
     """
-    template_file_basename = None
+    span_stack = getattr(g_log_context, 'span_stack', None)
+    if span_stack is None:
+        span_stack = g_log_context.span_stack = []
+
+    span = {
+        'doc_type': getattr(g_log_context, 'doc_type', 'main'),
+        'phase': phase,
+        'start': time.perf_counter(),
+        'child_duration': 0.0,
+        'pid': os.getpid(),
+        'tid': threading.get_ident()
+    }
+    span_stack.append(span)
+    try:
+        yield
+    finally:
+        span_stack.pop()
+        span['duration'] = time.perf_counter() - span['start']
+        span['self_duration'] = span['duration'] - span.pop('child_duration')
+        if len(span_stack) > 0:
+            span_stack[-1]['child_duration'] += span['duration']
+        with g_timing_spans_lock:
+            g_timing_spans.append(span)
+
+
+def get_phase_timings(spans=None):
+    """Sum the self time of the timing spans per document and phase
+    :param spans: {list} the timing spans, default all spans recorded so far
+    :return phase_timings: {dict} seconds keyed by document type and then by phase
+    """
+    if spans is None:
+        spans = g_timing_spans
 
-    if doc_type not in g_config or 'template file basename' not in g_config[doc_type]:
-        error_msg = "Could not retrieve the '{} 'template file basename' from the config file so set default '{}'".format(doc_type, template_file_basename)
-        logging.error("Could not retrieve the '{} 'template file basename' from the config file so set default '{}'".format(doc_type, template_file_basename))
-        raise Exception(error_msg)
-    else:
-        template_file_basename = g_config[doc_type]['template file basename']
+    phase_timings = {}
+    for span in spans:
+        document_timings = phase_timings.setdefault(span['doc_type'], {})
+        document_timings[span['phase']] = document_timings.get(span['phase'], 0.0) + span['self_duration']
 
-    template_file = os.path.join(g_template_files_dir, template_file_basename)
+    return phase_timings
 
-    if not os.path.exists(template_file):
-        error_msg = "template file '{}' does not exist".format(template_file)
-        logging.error(error_msg)
-        raise Exception(error_msg)
 
-    return template_file
+def display_phase_timings():
+    """Print the seconds spent in every phase of rendering each validation document to the STDOUT and log file.
+    Time not spent in any of the phases (e.g. building the merge values) is reported as 'other'.
+    :return None:
+    """
+    phase_timings = get_phase_timings()
+    if len(phase_timings) == 0:
+        return
 
+    columns = TIMING_PHASES + ['other', 'total']
+    width = max([len(doc_type) for doc_type in phase_timings] + [len('Document')])
 
-def prepare_validation_document(template_file, outfile):
-    """Prepare the specific validation document
-    :param template_file: {str} the MS Word template file
-    :param outfile: {str} the output file
-    :return:
-    """
-    if not os.path.exists(template_file):
-        error_msg = "template file '{}' does not exist".format(template_file)
-        logging.error(error_msg)
-        raise Exception(error_msg)
+    print("\n\nTime spent per phase (seconds):")
+    print("{:<{}}".format('Document', width) + ''.join(["{:>15}".format(column) for column in columns]))
 
-    document = instantiate_mailmerge(template_file)
-    document.write(outfile)
-    logging.info("Wrote output file '{}'".format(outfile))
-    print("Wrote output file '{}'".format(outfile))
+    for doc_type, document_timings in phase_timings.items():
+        total = sum(document_timings.values())
+        row = [document_timings.get(phase, 0.0) for phase in TIMING_PHASES]
+        row += [total - sum(row), total]
+        print("{:<{}}".format(doc_type, width) + ''.join(["{:>15.3f}".format(seconds) for seconds in row]))
+        logging.info("Time spent on '{}': {}".format(doc_type, ', '.join(["{} {:.3f}s".format(column, seconds) for column, seconds in zip(columns, row)])))
 
 
-def get_iq_hardware_checklist_file(doc_type):
-    """Derive the IQ hardware checklist file
-    :param doc_type: {str} the document type, default 'IQ'
-    :return infile: {str} the IQ hardware checklist file
+def write_chrome_trace(trace_file, spans=None):
+    """Write the timing spans as a Chrome trace (viewable in chrome://tracing or Perfetto) with one
+    complete event per span
+    :param trace_file: {str} the JSON file to write
+    :param spans: {list} the timing spans, default all spans recorded so far
+    :return None:
     """
-    if doc_type not in g_config or 'hardware checklist file basename' not in g_config[doc_type]:
-        error_msg = "Could not retrieve the '{}' 'hardware checklist file basename' from the config file".format(doc_type)
-        logging.error(error_msg)
-        raise Exception(error_msg)
-    else:
-        basename = g_config[doc_type]['hardware checklist file basename']
-        infile = os.path.join(g_config_dir, basename)
-
-    if not os.path.exists(infile):
-        raise Exception("file '{}' does not exist".format(infile))
+    if spans is None:
+        spans = g_timing_spans
 
-    return infile
+    trace_start = min([span['start'] for span in spans], default=0.0)
 
+    events = [{'name': "{}: {}".format(span['doc_type'], span['phase']),
+               'cat': span['phase'],
+               'ph': 'X',
+               'ts': round((span['start'] - trace_start) * 1000000, 3),
+               'dur': round(span['duration'] * 1000000, 3),
+               'pid': span['pid'],
+               'tid': span['tid'],
+               'args': {'document': span['doc_type'], 'self_ms': round(span['self_duration'] * 1000, 3)}}
+              for span in sorted(spans, key=lambda span: span['start'])]
 
-def get_iq_hardware_table_records(doc_type='IQ'):
-    """Parse the IQ hardware checklist tab-delimited file and build list of dictionaries
-    :param doc_type: {str} document type, default 'IQ'
-    :return hardware_table_records: {list} array of dictionaries
-    """
+    with open(trace_file, 'w') as fh:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, fh)
 
-    global g_iq_hardware_checklist_table_records
-    global g_iq_checklist_ctr
+    logging.info("Wrote '{}' timing spans to the trace file '{}'".format(len(events), trace_file))
 
-    if g_iq_hardware_checklist_table_records is None:
 
-        infile = get_iq_hardware_checklist_file(doc_type)
+def write_profile(profiler):
+    """Write the cProfile dump, merged with the dumps of any worker processes, and the Chrome trace
+    of the timing spans to the output directory
+    :param profiler: {cProfile.Profile} the profiler of the main process
+    :return None:
+    """
+    import pstats
 
-        header_to_position_lookup = {}
-        record_ctr = 0
+    global g_worker_profile_files
 
-        hardware_table_records = []
+    profile_file = os.path.join(g_outdir, os.path.basename(__file__) + '.prof')
+    trace_file = os.path.join(g_outdir, os.path.basename(__file__) + '.trace.json')
 
-        with open(infile) as f:
-            reader = csv.reader(f, delimiter='\t')
-            row_ctr = 0
-            for row in reader:
-                row_ctr += 1
-                if row_ctr == 1:
-                    field_ctr = 0
-                    for field in row:
-                        header_to_position_lookup[field] = field_ctr
-                        field_ctr += 1
-                    logging.info("Processed the header of csv file '{}'".format(infile))
-                else:
-                    g_iq_checklist_ctr += 1
+    stats = pstats.Stats(profiler)
+    for worker_profile_file in g_worker_profile_files:
+        stats.add(worker_profile_file)
+    stats.dump_stats(profile_file)
 
-                    description = row[header_to_position_lookup['Description']]
-                    requirement = row[header_to_position_lookup['Requirement']]
-                    record_lookup = {
-                        'h_id': str(g_iq_checklist_ctr),
-                        'h_desc': description,
-                        'h_req': requirement,
-                        'h_yes_no': g_iq_yes_no,
-                        'h_date': g_iq_date
-                    }
-                    hardware_table_records.append(record_lookup)
-                    record_ctr += 1
-            logging.info("Processed '{}' records in tab-delimited file '{}'".format(record_ctr, infile))
+    if len(g_worker_profile_files) > 0:
+        shutil.rmtree(os.path.dirname(g_worker_profile_files[0]), ignore_errors=True)
+    g_worker_profile_files = []
 
-        logging.info(hardware_table_records)
-        g_iq_hardware_checklist_table_records = hardware_table_records
+    write_chrome_trace(trace_file)
 
-    return g_iq_hardware_checklist_table_records
+    print("\nWrote the profile to '{}' and the timeline to '{}'".format(profile_file, trace_file))
+    logging.info("Wrote the profile to '{}' and the timeline to '{}'".format(profile_file, trace_file))
 
 
-def get_iq_software_checklist_file(doc_type):
-    """Derive the IQ software checklist file
-    :param doc_type: {str} the document type, default 'IQ'
-    :return infile: {str} the IQ software checklist file
+class RecordDump:
+    """Log argument that defers formatting a list of records until a handler actually emits the
+    log line.  At most g_log_max_records records are shown (the first and last halves); the rest
+    are summarised as a count.  Streamed records are sampled while they are consumed, in which
+    case only the sampled records and the total count are given.
     """
-    if doc_type not in g_config or 'software checklist file basename' not in g_config[doc_type]:
-        error_msg = "Could not retrieve the '{}' 'software checklist file basename' from the config file".format(doc_type)
-        logging.error(error_msg)
-        raise Exception(error_msg)
-    else:
-        basename = g_config[doc_type]['software checklist file basename']
-        infile = os.path.join(g_config_dir, basename)
 
-    if not os.path.exists(infile):
-        raise Exception("file '{}' does not exist".format(infile))
+    __slots__ = ('records', 'count')
 
-    return infile
+    def __init__(self, records, count=None):
+        self.records = records
+        self.count = count
 
+    def __len__(self):
+        return len(self.records) if self.count is None else self.count
 
-def get_iq_software_table_records(doc_type):
-    """Parse the IQ software checklist tab-delimited file and build list of dictionaries
-    :param doc_type: {str}
-    :return software_table_records: {list} array of dictionaries
-    """
-    global g_iq_software_checklist_table_records
-    global g_iq_checklist_ctr
+    def sample(self):
+        """Select the records to show
+        :return shown, omitted: {tuple} the first and last records to show and the number of records left out
+        """
+        if self.count is not None:
+            return list(self.records), self.count - len(self.records)
 
-    if g_iq_software_checklist_table_records is None:
+        count = len(self.records)
+        if g_log_max_records is None or g_log_max_records <= 0 or count <= g_log_max_records:
+            return list(self.records), 0
 
-        infile = get_iq_software_checklist_file(doc_type)
+        head = (g_log_max_records + 1) // 2
+        tail = g_log_max_records // 2
+        return list(self.records[:head]) + list(self.records[count - tail:]), count - head - tail
 
-        header_to_position_lookup = {}
-        record_ctr = 0
+    def to_json(self):
+        """Convert the shown records to JSON-serializable values
+        :return records: {list}
+        """
+        shown, omitted = self.sample()
+        return [dict(record) if isinstance(record, Mapping) else record for record in shown]
 
-        software_table_records = []
+    def __str__(self):
+        shown, omitted = self.sample()
+        if omitted == 0:
+            return repr(shown)
 
-        with open(infile) as f:
-            reader = csv.reader(f, delimiter='\t')
-            row_ctr = 0
-            for row in reader:
-                row_ctr += 1
-                if row_ctr == 1:
-                    field_ctr = 0
-                    for field in row:
-                        header_to_position_lookup[field] = field_ctr
-                        field_ctr += 1
-                    logging.info("Processed the header of csv file '{}'".format(infile))
-                else:
-                    g_iq_checklist_ctr += 1
-                    description = row[header_to_position_lookup['Description']]
-                    requirement = row[header_to_position_lookup['Requirement']]
-                    software_table_records.append({
-                        's_id': str(g_iq_checklist_ctr),
-                        's_desc': description,
-                        's_req': requirement,
-                        's_yes_no': g_iq_yes_no,
-                        's_date': g_iq_date
-                    })
-                    record_ctr += 1
-            logging.info("Processed '{}' records in tab-delimited file '{}'".format(record_ctr, infile))
+        head = (len(shown) + 1) // 2
+        return "[{}, ... '{}' more records ..., {}]".format(', '.join([repr(record) for record in shown[:head]]),
+                                                             omitted,
+                                                             ', '.join([repr(record) for record in shown[head:]]))
 
-        logging.info(software_table_records)
 
-        g_iq_software_checklist_table_records = software_table_records
-    return g_iq_software_checklist_table_records
+class TableRecord(Mapping):
+    """Read-only table row backed by a tuple of values and a field to position lookup that is
+    shared by every row of the table.  The same values can be exposed under other field names
+    (e.g. the OQ checklist replicates) through view() without copying them.
+    """
 
+    __slots__ = ('_field_positions', '_values')
 
-def prepare_iq():
-    """Prepare the IQ Checklist validation document
-    :return None:
-    """
-    doc_type = 'IQ'
+    def __init__(self, field_positions, values):
+        self._field_positions = field_positions
+        self._values = values
 
-    global g_iq_yes_no
-    global g_iq_date
+    def __getitem__(self, field):
+        return self._values[self._field_positions[field]]
 
-    yes_no = input("Prepare executed IQ? [Y/n] ")
-    yes_no = yes_no.strip()
-    if yes_no is None or yes_no == '' or yes_no == 'Y' or yes_no == 'y':
-        g_iq_yes_no = 'Yes'
-        g_iq_date = DEFAULT_DOCUMENT_PREPARED_DATE
-        logging.info("Will prepare partially executed IQ validation document")
-    elif yes_no == 'N' or yes_no == 'n':
-        g_iq_yes_no = ''
-        g_iq_date = ''
-        logging.info("Will not prepare a partially executed IQ validation document")
+    def __iter__(self):
+        return iter(self._field_positions)
 
-    template_file = get_template_file(doc_type)
+    def __len__(self):
+        return len(self._field_positions)
 
-    document = instantiate_mailmerge(template_file)
+    def __repr__(self):
+        return repr(dict(self))
 
-    outfile = g_outdir + '/' + g_software_name + ' ' + g_software_version + ' - IQ Checklist - ' + g_document_prepared_date + '.docx'
+    def view(self, field_positions):
+        """Expose the values of this row under different field names
+        :param field_positions: {dict} the field to position lookup of the view
+        :return record: {TableRecord}
+        """
+        return TableRecord(field_positions, self._values)
 
-    hardware_table_records = get_iq_hardware_table_records(doc_type)
-    software_table_records = get_iq_software_table_records(doc_type)
 
-    document.merge_rows('h_id', hardware_table_records)
-    document.merge_rows('s_id', software_table_records)
+def get_field_positions(*fields):
+    """Build the field to position lookup shared by the rows of a table
+    :param fields: {str} the merge field names in the order of the row values
+    :return field_positions: {dict}
+    """
+    return {field: position for position, field in enumerate(fields)}
+
+
+VERSION_HISTORY_FIELDS = get_field_positions('vh_id', 'vh_date', 'vh_comment')
+IQ_HARDWARE_FIELDS = get_field_positions('h_id', 'h_desc', 'h_req', 'h_yes_no', 'h_date')
+IQ_SOFTWARE_FIELDS = get_field_positions('s_id', 's_desc', 's_req', 's_yes_no', 's_date')
+OQ_CHECKLIST_FIELDS = {
+    replicate: get_field_positions('id_rep{}'.format(replicate), 'test_procedure_rep{}'.format(replicate), 'expected_finding_rep{}'.format(replicate), 'yes_no', 'date_initialed')
+    for replicate in (1, 2)
+}
+OQ_TEST_DATA_FIELDS = get_field_positions('test_data_name', 'test_data_desc')
+USER_REQUIREMENTS_FIELDS = get_field_positions('id', 'req', 'criticality', 'comment', 'test_id')
+TRACEABILITY_MATRIX_FIELDS = get_field_positions('tm_req_id', 'tm_req', 'tm_criticality', 'tm_test_id', 'tm_test_procedure', 'tm_status')
+ORPHAN_TEST_FIELDS = get_field_positions('tm_orphan_test_id', 'tm_orphan_test_procedure', 'tm_orphan_expected_finding')
+
+# a requirement's 'Test ID' may list several tests
+TEST_ID_SEPARATORS = re.compile('[,;\\s]+')
+
+
+def read_tsv_file(infile):
+    """Parse the tab-delimited file through the input record store so that every input file
+    is parsed at most once per run.  The stored rows are invalidated whenever the modification
+    time or size of the file changes.  Each file is parsed under its own lock, so that concurrent
+    workers wait for a file being parsed but parse different files at the same time.
+    :param infile: {str} the tab-delimited file
+    :return header_to_position_lookup, rows: {tuple} the header to position lookup and the list of data rows
+    """
+    stat = os.stat(infile)
+    stamp = (stat.st_mtime_ns, stat.st_size)
 
-    document.write(outfile)
+    with g_input_record_store_lock:
+        file_lock = g_input_record_store_file_locks.setdefault(infile, threading.Lock())
 
-    print("Wrote '{}' validation document  '{}'".format(doc_type, outfile))
+    with file_lock:
+        with g_input_record_store_lock:
+            entry = g_input_record_store.get(infile)
+            if entry is not None and entry['stamp'] == stamp:
+                g_input_record_store_stats['hits'] += 1
+                return entry['header_to_position_lookup'], entry['rows']
 
+            g_input_record_store_stats['misses'] += 1
 
-def get_oq_checklist_file(doc_type='OQ'):
-    """Derive the OQ checklist tab-delimited file
-    :param doc_type: {str} the document type, default 'OQ'
-    :return infile: {str} the absolute path to the OQ checklist tab-delimited file
+        header_to_position_lookup = {}
+        rows = []
+
+        if get_input_store_file() is not None:
+            with timed_phase('tsv parse'):
+                header_to_position_lookup, rows = read_input_store_rows(infile)
+        else:
+            with timed_phase('tsv parse'), open(infile) as f:
+                reader = csv.reader(f, delimiter='\t')
+                for row_ctr, row in enumerate(reader, start=1):
+                    if row_ctr == 1:
+                        for field_ctr, field in enumerate(row):
+                            header_to_position_lookup[field] = field_ctr
+                        logging.info("Processed the header of tsv file '{}'".format(infile))
+                    else:
+                        rows.append(row)
+
+        with g_input_record_store_lock:
+            g_input_record_store[infile] = {
+                'stamp': stamp,
+                'header_to_position_lookup': header_to_position_lookup,
+                'rows': rows
+            }
+
+        return header_to_position_lookup, rows
+
+
+def iter_tsv_rows(infile):
+    """Stream the data rows of the tab-delimited file without keeping them in memory
+    :param infile: {str} the tab-delimited file
+    :return rows: {generator} of rows
     """
-    if doc_type not in g_config or 'checklist file basename' not in g_config[doc_type]:
-        error_msg = "Could not retrieve the '{}' 'checklist file basename' from the config file".format(doc_type)
-        logging.error(error_msg)
-        raise Exception(error_msg)
-    else:
-        basename = g_config[doc_type]['checklist file basename']
-        infile = os.path.join(g_config_dir, basename)
+    with open(infile) as f:
+        reader = csv.reader(f, delimiter='\t')
+        next(reader, None)
+        for row in reader:
+            yield row
 
-    if not os.path.exists(infile):
-        raise Exception("'{}' checklist file '{}' does not exist".format(doc_type, infile))
 
-    return infile
+def read_tsv_header(infile):
+    """Read only the header of the tab-delimited file
+    :param infile: {str} the tab-delimited file
+    :return header_to_position_lookup: {dict} the position of every column keyed by its header
+    """
+    with open(infile) as f:
+        header = next(csv.reader(f, delimiter='\t'), [])
 
+    return {field: field_ctr for field_ctr, field in enumerate(header)}
 
-def get_oq_checklist_tables(doc_type='OQ'):
-    """Retrieve the OQ checklist data for replicate 1 and replicate 2 from the tab-delimited file
-    :param doc_type: {str} the document type default 'OQ'
-    :return checklist_tables: {list} containing two arrays for each checklist replicate which in turn are arrays of dictionaries
+
+def get_tsv_rows(infile):
+    """Retrieve the header and the data rows of the tab-delimited file.  When streaming, the rows
+    are read lazily from disk one at a time; otherwise they come from the input record store.
+    :param infile: {str} the tab-delimited file
+    :return header_to_position_lookup, rows: {tuple} the header to position lookup and an iterable of rows
     """
+    if not g_streaming:
+        return read_tsv_file(infile)
 
-    infile = get_oq_checklist_file(doc_type)
+    if get_input_store_file() is not None:
+        return read_input_store_rows(infile, streaming=True)
 
-    header_to_position_lookup = {}
-    record_ctr = 0
+    header_to_position_lookup = read_tsv_header(infile)
 
-    checklist_replicate1_table_records = []
-    checklist_replicate2_table_records = []
-    id_ctr = 0
+    logging.info("Streaming the rows of tsv file '{}'".format(infile))
 
-    test_numbers_included = False
+    return header_to_position_lookup, iter_tsv_rows(infile)
 
-    with open(infile) as f:
-        reader = csv.reader(f, delimiter='\t')
-        row_ctr = 0
-        for row in reader:
-            row_ctr += 1
-            if row_ctr == 1:
-                field_ctr = 0
-                for field in row:
-                    if field == 'Test Number':
-                        test_numbers_included = True
-                    header_to_position_lookup[field] = field_ctr
-                    field_ctr += 1
-                logging.info("Processed the header of csv file '{}'".format(infile))
-            else:
-                id_ctr += 1
-                if test_numbers_included:
-                    test_id = row[header_to_position_lookup['Test Number']]
-                else:
-                    test_id = 'T' + str(id_ctr)
-
-                checklist_replicate1_table_records.append({
-                    'id_rep1': test_id,
-                    'test_procedure_rep1': row[header_to_position_lookup['Test Procedure']],
-                    'expected_finding_rep1': row[header_to_position_lookup['Expected Finding']],
-                    'yes_no': g_oq_yes_no,
-                    'date_initialed': g_oq_date
-                })
-
-                checklist_replicate2_table_records.append({
-                    'id_rep2': test_id,
-                    'test_procedure_rep2': row[header_to_position_lookup['Test Procedure']],
-                    'expected_finding_rep2': row[header_to_position_lookup['Expected Finding']],
-                    'yes_no': g_oq_yes_no,
-                    'date_initialed': g_oq_date
-                })
-
-                record_ctr += 1
 
-        logging.info("Processed '{}' records in tab-delimited file '{}'".format(record_ctr, infile))
+def report_input_record_store_stats():
+    """Log the hit and miss counts of the input record store
+    :return None:
+    """
+    logging.info("Input record store: '{}' hits, '{}' misses across '{}' tab-delimited files".format(
+        g_input_record_store_stats['hits'],
+        g_input_record_store_stats['misses'],
+        len(g_input_record_store)))
+
+
+INPUT_STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS input_files (
+    file_id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    input TEXT,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    header TEXT NOT NULL,
+    imported TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS input_rows (
+    file_id INTEGER NOT NULL REFERENCES input_files (file_id) ON DELETE CASCADE,
+    row_number INTEGER NOT NULL,
+    cells TEXT NOT NULL,
+    criticality TEXT,
+    PRIMARY KEY (file_id, row_number)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS input_test_ids (
+    file_id INTEGER NOT NULL REFERENCES input_files (file_id) ON DELETE CASCADE,
+    row_number INTEGER NOT NULL,
+    test_id TEXT NOT NULL,
+    PRIMARY KEY (file_id, row_number, test_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS input_files_input ON input_files (input);
+CREATE INDEX IF NOT EXISTS input_rows_criticality ON input_rows (criticality, file_id);
+CREATE INDEX IF NOT EXISTS input_test_ids_test_id ON input_test_ids (test_id, file_id, row_number);
+"""
+
+# stores of an older version are rebuilt, since they only cache the tab-delimited inputs
+INPUT_STORE_VERSION = 2
+
+# the indexed columns of the input store and the headers they are imported from, in order of preference
+INPUT_STORE_INDEXED_HEADERS = {
+    'criticality': ['Criticality'],
+    'test_id': ['Test ID', 'Test Number']
+}
+
+
+def get_input_store_file():
+    """Derive the SQLite input store from the config file; when configured the tab-delimited inputs
+    are imported into the store and their rows are read from it
+    :return store_file: {str} the absolute path of the input store, None when not configured
+    """
+    if g_config is None or 'input store file basename' not in g_config:
+        return None
 
-    return [checklist_replicate1_table_records, checklist_replicate2_table_records]
+    return os.path.join(g_config_dir, g_config['input store file basename'])
 
 
-def get_oq_test_data_file(doc_type='OQ'):
-    """Derive the OQ test data tab-delimited file
-    :param doc_type: {str} the document type, default 'OQ'
-    :return infile: {str} the absolute path for the OQ test data tab-delimited file
+def open_input_store(store_file):
+    """Open the SQLite input store, creating its tables and indexes when they do not exist yet
+    :param store_file: {str} the input store
+    :return connection: {sqlite3.Connection}
     """
-    infile = None
+    import sqlite3
 
-    if doc_type not in g_config or 'test data file basename' not in g_config[doc_type]:
-        error_msg = "Could not retrieve the '{}' 'test data file basename' from the config file".format(doc_type)
-        logging.warning(error_msg)
-    else:
-        basename = g_config[doc_type]['test data file basename']
-        infile = os.path.join(g_config_dir, basename)
-        if not os.path.exists(infile):
-            raise Exception("'{}' test data file '{}' does not exist".format(doc_type, infile))
+    connection = sqlite3.connect(store_file, timeout=60)
+    connection.execute('PRAGMA journal_mode = WAL')
+    connection.execute('PRAGMA foreign_keys = ON')
 
-    return infile
+    if connection.execute('PRAGMA user_version').fetchone()[0] != INPUT_STORE_VERSION:
+        logging.info("Rebuilding input store '{}' for version '{}'".format(store_file, INPUT_STORE_VERSION))
+        connection.executescript('DROP TABLE IF EXISTS input_test_ids; DROP TABLE IF EXISTS input_rows; DROP TABLE IF EXISTS input_files;')
+        connection.execute('PRAGMA user_version = {}'.format(INPUT_STORE_VERSION))
 
+    connection.executescript(INPUT_STORE_SCHEMA)
 
-def get_oq_test_data_records(doc_type : str = 'OQ') -> list:
-    """Retrieve the OQ checklist data for replicate 1 and replicate 2 from the tab-delimited file
-    :param doc_type: {str} the document type default 'OQ'
-    :return checklist_tables: {list} containing two arrays for each checklist replicate which in turn are arrays of dictionaries
+    return connection
+
+
+def get_input_name(infile):
+    """Find the input in INPUT_FILES that the configuration resolves to the file
+    :param infile: {str} the tab-delimited file
+    :return input_name: {str} None when the file is not one of the configured inputs
     """
-    infile = get_oq_test_data_file(doc_type)
+    for input_name, input_file in INPUT_FILES.items():
+        try:
+            if input_file['get_file']() == infile:
+                return input_name
+        except Exception:
+            continue
+
+    return None
+
+
+def import_input_file(connection, infile, input_name=None):
+    """Import the tab-delimited file into the input store unless the store already holds its current contents.
+    The modification time and size are compared first and the content hash only when they differ.
+    :param connection: {sqlite3.Connection} the input store
+    :param infile: {str} the tab-delimited file
+    :param input_name: {str} the input in INPUT_FILES the file belongs to, default looked up from the configuration
+    :return status: {str} 'imported', 'touched' when only the modification time changed, or 'unchanged'
+    """
+    infile = os.path.abspath(infile)
+    stat = os.stat(infile)
 
-    test_data_records = []
+    entry = connection.execute('SELECT file_id, mtime_ns, size, sha256 FROM input_files WHERE path = ?', (infile,)).fetchone()
+    if entry is not None and (entry[1], entry[2]) == (stat.st_mtime_ns, stat.st_size):
+        return 'unchanged'
 
-    if infile is None:
-        test_data_records = [{
-            'test_data_name': 'TBD',
-            'test_data_desc': 'TBD'
-        }]
-    else:
-        header_to_position_lookup = {}
-        record_ctr = 0
+    file_hash = get_file_hash(infile)
+
+    if input_name is None:
+        input_name = get_input_name(infile)
+
+    with connection:
+        if entry is not None and entry[3] == file_hash:
+            connection.execute('UPDATE input_files SET mtime_ns = ?, size = ? WHERE file_id = ?', (stat.st_mtime_ns, stat.st_size, entry[0]))
+            return 'touched'
 
         with open(infile) as f:
             reader = csv.reader(f, delimiter='\t')
-            row_ctr = 0
-            for row in reader:
-                row_ctr += 1
-                if row_ctr == 1:
-                    field_ctr = 0
-                    for field in row:
-                        header_to_position_lookup[field] = field_ctr
-                        field_ctr += 1
-                    logging.info("Processed the header of csv file '{}'".format(infile))
-                else:
+            header = next(reader, [])
+            rows = list(reader)
 
-                    record_lookup = {
-                        'test_data_name': row[header_to_position_lookup['Name']],
-                        'test_data_desc': row[header_to_position_lookup['Description']]
-                    }
+        indexed_positions = {}
+        for column, headers in INPUT_STORE_INDEXED_HEADERS.items():
+            indexed_positions[column] = next((header.index(name) for name in headers if name in header), None)
 
-                    test_data_records.append(record_lookup)
+        if entry is not None:
+            connection.execute('DELETE FROM input_files WHERE file_id = ?', (entry[0],))
 
-                    record_ctr += 1
-            logging.info("Processed '{}' records in tab-delimited file '{}'".format(record_ctr, infile))
+        file_id = connection.execute('INSERT INTO input_files (path, input, mtime_ns, size, sha256, header, imported) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                     (infile, input_name, stat.st_mtime_ns, stat.st_size, file_hash, json.dumps(header), datetime.now().isoformat(timespec='seconds'))).lastrowid
 
-    return test_data_records
+        criticality_position, test_id_position = indexed_positions['criticality'], indexed_positions['test_id']
 
+        connection.executemany('INSERT INTO input_rows (file_id, row_number, cells, criticality) VALUES (?, ?, ?, ?)',
+                               [(file_id, row_number, json.dumps(row), row[criticality_position] if criticality_position is not None and criticality_position < len(row) else None)
+                                for row_number, row in enumerate(rows, start=1)])
 
-def prepare_oq():
-    """Prepare the OQ Validation Testing Worksheet validation document
-    :return None:
-    """
-    doc_type = 'OQ'
+        # a requirement's 'Test ID' may list several tests, each of which must be found by its own test ID
+        if test_id_position is not None:
+            connection.executemany('INSERT INTO input_test_ids (file_id, row_number, test_id) VALUES (?, ?, ?)',
+                                   [(file_id, row_number, test_id)
+                                    for row_number, row in enumerate(rows, start=1) if test_id_position < len(row)
+                                    for test_id in set(TEST_ID_SEPARATORS.split(row[test_id_position])) if test_id != ''])
 
-    global g_oq_yes_no
-    global g_oq_date
+    logging.info("Imported '{}' rows of tab-delimited file '{}' into the input store".format(len(rows), infile))
 
-    yes_no = input("Prepare executed OQ? [Y/n] ")
-    yes_no = yes_no.strip()
-    if yes_no is None or yes_no == '' or yes_no == 'Y' or yes_no == 'y':
-        g_oq_yes_no = 'Yes'
-        g_oq_date = DEFAULT_DOCUMENT_PREPARED_DATE
-        logging.info("Will prepare partially executed OQ validation document")
-    elif yes_no == 'N' or yes_no == 'n':
-        g_oq_yes_no = ''
-        g_oq_date = ''
-        logging.info("Will not prepare a partially executed OQ validation document")
+    return 'imported'
 
-    template_file = get_template_file(doc_type)
 
-    document = instantiate_mailmerge(template_file)
+def import_input_files(store_file, input_names=None):
+    """Incrementally import the configured tab-delimited inputs into the input store
+    :param store_file: {str} the input store
+    :param input_names: {list} the inputs to import, default all of INPUT_FILES
+    :return statuses: {dict} the import status keyed by file
+    """
+    if input_names is None:
+        input_names = list(INPUT_FILES)
 
-    outfile = g_outdir + '/' + g_software_name + ' ' + g_software_version + ' - OQ Validation Testing Worksheet - ' + g_document_prepared_date + '.docx'
+    statuses = {}
 
-    checklist_tables = get_oq_checklist_tables()
+    with contextlib.closing(open_input_store(store_file)) as connection:
+        for input_name in input_names:
+            infile = INPUT_FILES[input_name]['get_file']()
+            if infile is not None:
+                statuses[infile] = import_input_file(connection, infile, input_name)
 
-    test_data_records = get_oq_test_data_records()
+    return statuses
 
-    document.merge_rows('test_data_name', test_data_records)
-    document.merge_rows('id_rep1', checklist_tables[0])
-    document.merge_rows('id_rep2', checklist_tables[1])
 
-    document.write(outfile)
+def read_input_store_rows(infile, streaming=False):
+    """Read the header and the data rows of the tab-delimited file from the input store, importing the file first when it changed
+    :param infile: {str} the tab-delimited file
+    :param streaming: {bool} return the rows lazily instead of as a list
+    :return header_to_position_lookup, rows: {tuple} the header to position lookup and the rows
+    """
+    connection = open_input_store(get_input_store_file())
 
-    print("Wrote '{}' validation document  '{}'".format(doc_type, outfile))
+    try:
+        import_input_file(connection, infile)
+        file_id, header = connection.execute('SELECT file_id, header FROM input_files WHERE path = ?', (os.path.abspath(infile),)).fetchone()
+    except Exception:
+        connection.close()
+        raise
 
-    if g_oq_yes_no == 'Yes':
-        yes_no = input("\nPrepare OQ replicate folders? [Y/n] ")
-        yes_no = yes_no.strip()
-        if yes_no is None or yes_no == '' or yes_no == 'Y' or yes_no == 'y':
-            logging.info("Will prepare OQ replicate folders")
-            prepare_replicate_folders('OQ')            
-        elif yes_no == 'N' or yes_no == 'n':
-            logging.info("Will not prepare OQ replicate folders")
+    header_to_position_lookup = {field: field_ctr for field_ctr, field in enumerate(json.loads(header))}
 
+    def iter_rows():
+        with contextlib.closing(connection):
+            for cells, in connection.execute('SELECT cells FROM input_rows WHERE file_id = ? ORDER BY row_number', (file_id,)):
+                yield json.loads(cells)
 
-def prepare_replicate_folders(type):
-    """Prepare the OQ replicate folders
-    :param type: {str} either OQ or PQ
-    """
-    if 'executed_validation_documents_folder' in g_config:
-
-        dir = g_config['executed_validation_documents_folder']
-        
-        dir1 = dir + '/' + g_software_version + '/' + g_document_prepared_date + '/' + type + '-replicate-1'
-        
-        create_remote_directory(dir1)
-        
-        dir2 = dir + '/' + g_software_version + '/' + g_document_prepared_date + '/' + type + '-replicate-2'
-        
-        create_remote_directory(dir2)
-    else:
-        logging.warning("'executed_validation_documents_folder' does not exist in the configuration file so will not be able to create the '{}' replicate folders".format(type))
+    if streaming:
+        logging.info("Streaming the rows of tsv file '{}' from the input store".format(infile))
+        return header_to_position_lookup, iter_rows()
+
+    return header_to_position_lookup, list(iter_rows())
 
 
-def create_remote_directory(dir):
+def query_input_store(store_file, input_name=None, criticality=None, test_id=None):
+    """Select the rows of the imported tab-delimited files through the indexes of the input store
+    :param store_file: {str} the input store
+    :param input_name: {str} only rows of this input, default all inputs
+    :param criticality: {str} only rows with this criticality
+    :param test_id: {str} only rows with this test number or listing it in their test IDs
+    :return rows: {generator} of (file, row number, record) where the record maps the file's headers to the row's values
     """
+    conditions = []
+    parameters = []
+    for column, value in (('input_files.input', input_name), ('input_rows.criticality', criticality), ('input_test_ids.test_id', test_id)):
+        if value is not None:
+            conditions.append('{} = ?'.format(column))
+            parameters.append(value)
+
+    query = 'SELECT input_files.path, input_files.header, input_rows.row_number, input_rows.cells FROM input_rows JOIN input_files USING (file_id)'
+    if test_id is not None:
+        # the test IDs of a row are unique so the join selects every row at most once
+        query += ' JOIN input_test_ids USING (file_id, row_number)'
+    if len(conditions) > 0:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += ' ORDER BY input_files.path, input_rows.row_number'
+
+    with contextlib.closing(open_input_store(store_file)) as connection:
+        for path, header, row_number, cells in connection.execute(query, parameters):
+            yield path, row_number, dict(zip(json.loads(header), json.loads(cells)))
+
+
+def load_json_or_yaml_file(infile):
+    """Load the contents of a JSON file, or of a YAML file when the extension is .yaml or .yml
+    :param infile: {str} the JSON or YAML file
+    :return data: {object} the parsed contents
     """
-    if 'sshkey_file' in g_config:
-        
-        sshkey_file = g_config['sshkey_file']
-        
-        if not os.path.exists(sshkey_file):
-            raise Exception("sshkey file '{}' does not exist".format(sshkey_file))
-                
-        cmd = "ssh -i {} root@{} mkdir -p {}".format(sshkey_file, g_server, dir)
-        
-        logging.info("About to execute '{}'".format(cmd))
-        
-        retval = subprocess.call(cmd, shell=True)
-        
-        logging.info("return value: {}".format(retval))
-    else:
-        logging.warning("Cannot create the '{}' replicate folders because sshkey_file is not defined in the configuration file".format(type))
+    with open(infile) as fh:
+        if infile.endswith('.yaml') or infile.endswith('.yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise Exception("PyYAML must be installed in order to read the file '{}'".format(infile))
+            return yaml.safe_load(fh)
 
+        return json.load(fh)
 
 
-def prepare_pq():
-    """Prepare the PQ Validation Testing Worksheet validation document
-    :return None:
+def load_answers_file(answers_file):
+    """Load the answers to the interactive questions from a JSON or YAML file
+    :param answers_file: {str} the answers file
+    :return answers: {dict} the answers keyed by question key
     """
-    doc_type = 'PQ'
-    
-    global g_pq_yes_no
-    global g_pq_date
+    answers = load_json_or_yaml_file(answers_file)
 
-    yes_no = input("Prepare executed PQ? [Y/n] ")
-    yes_no = yes_no.strip()
-    if yes_no is None or yes_no == '' or yes_no == 'Y' or yes_no == 'y':
-        g_pq_yes_no = 'Yes'
-        g_pq_date = DEFAULT_DOCUMENT_PREPARED_DATE
-        logging.info("Will prepare partially executed PQ validation document")
-    elif yes_no == 'N' or yes_no == 'n':
-        g_pq_yes_no = ''
-        g_pq_date = ''
-        logging.info("Will not prepare a partially executed PQ validation document")
+    if not isinstance(answers, dict):
+        raise Exception("answers file '{}' must contain a mapping of question keys to answers".format(answers_file))
 
-    template_file = get_template_file(doc_type)
+    logging.info("Loaded '{}' answers from answers file '{}'".format(len(answers), answers_file))
 
-    document = instantiate_mailmerge(template_file)
+    return answers
 
-    outfile = g_outdir + '/' + g_software_name + ' ' + g_software_version + ' - PQ Validation Testing Worksheet - ' + g_document_prepared_date + '.docx'
 
-    checklist_tables = get_oq_checklist_tables()
+def ask(key, question, yes_no=False):
+    """Retrieve the answer to a question from the answers (answers file or --answer options)
+    and only prompt the user when running interactively
+    :param key: {str} the key of the question in the answers
+    :param question: {str} the prompt to display
+    :param yes_no: {bool} whether this is a Y/n question, in which case boolean and yes/no answers are normalized to Y/n
+    :return answer: {str} the stripped answer
+    """
+    if key in g_answers:
+        answer = g_answers[key]
+        if yes_no:
+            if isinstance(answer, bool):
+                answer = 'Y' if answer else 'n'
+            elif str(answer).strip().lower() in ('yes', 'true'):
+                answer = 'Y'
+            elif str(answer).strip().lower() in ('no', 'false'):
+                answer = 'n'
+        answer = '' if answer is None else str(answer).strip()
+        logging.info("Retrieved answer '{}' for '{}' from the answers".format(answer, key))
+        return answer
+
+    if g_non_interactive:
+        error_msg = "No answer was provided for '{}' ({}) while running in non-interactive mode".format(key, question.strip())
+        logging.error(error_msg)
+        raise Exception(error_msg)
 
-    test_data_records = get_oq_test_data_records()
+    return input(question).strip()
 
-    document.merge_rows('test_data_name', test_data_records)
-    document.merge_rows('id_rep1', checklist_tables[0])
-    document.merge_rows('id_rep2', checklist_tables[1])
 
-    document.write(outfile)
+def get_missing_release_answers(document_prepared_by, software_name, software_version, server):
+    """Determine which of the answers needed to resolve the release in an unattended run were not provided
+    :param document_prepared_by: {str} the name of the person that prepared the documents, if specified
+    :param software_name: {str} the name of the software system, if specified
+    :param software_version: {str} the version of the software system, if specified
+    :param server: {str} the server, if specified
+    :return missing_keys: {list} the keys of the questions that have no answer
+    """
+    required_keys = [key for key, value in (
+        ('document_prepared_by', document_prepared_by or g_config.get('default document prepared by')),
+        ('software_name', software_name or g_config.get('software_name')),
+        ('software_version', software_version or g_config.get('software_version')),
+        ('server', server or g_config.get('server'))) if value is None]
 
-    print("Wrote '{}' validation document  '{}'".format(doc_type, outfile))
+    return [key for key in required_keys if key not in g_answers]
 
-    if g_pq_yes_no == 'Yes':
-        yes_no = input("\nPrepare PQ replicate folders? [Y/n] ")
-        yes_no = yes_no.strip()
-        if yes_no is None or yes_no == '' or yes_no == 'Y' or yes_no == 'y':
-            logging.info("Will prepare PQ replicate folders")
-            prepare_replicate_folders('PQ')
-        elif yes_no == 'N' or yes_no == 'n':
-            logging.info("Will not prepare PQ replicate folders")
 
+def get_missing_document_answers(doc_types=None):
+    """Determine which of the answers that the validation documents of the resolved release need in an unattended
+    run were not provided so that the run can fail before any documents are rendered.  Questions about tables
+    that the templates do not contain are not required.
+    :param doc_types: {list} the document types that will be rendered, default all
+    :return missing_keys: {list} the keys of the questions that have no answer
+    """
+    required_keys = ['prepare_executed_{}'.format(type.lower()) for type in get_executed_doc_types(doc_types)]
+
+    if 'version history' in get_document_inputs(doc_types):
+        required_keys.append('version_history_comment')
+        # the append question is not asked when the release's record was already appended by an earlier run
+        if 'version_history_comment' not in g_answers or not is_version_history_record_appended(ask('version_history_comment', '')):
+            required_keys.append('append_version_history')
+
+    # the replicate folder questions are only asked for executed OQ and PQ documents
+    for type in ('oq', 'pq'):
+        key = 'prepare_executed_{}'.format(type)
+        if (doc_types is None or type.upper() in doc_types) and key in g_answers and ask(key, '', yes_no=True) in ('', 'Y', 'y'):
+            required_keys.append('prepare_{}_replicate_folders'.format(type))
+
+    return [key for key in required_keys if key not in g_answers]
+
+
+def get_version_history_file():
+    """Derive the OQ checklist tab-delimited file
+    :return infile: {str} the absolute path to the OQ checklist tab-delimited file
+    """
+    if 'version history file basename' not in g_config:
+        error_msg = "Could not retrieve the 'version history file basename' from the config file"
+        logging.error(error_msg)
+        raise Exception(error_msg)
+    else:
+        basename = g_config['version history file basename']
+        infile = os.path.join(g_config_dir, basename)
+
+    if not os.path.exists(infile):
+        raise Exception("version history file '{}' does not exist".format(infile))
+
+    return infile
+
+
+def get_version_history_records():
+    """Retrieve the version history records from the tab-delimited file
+    :return version_history_records: {list} containing version history records
+    """
+
+    global g_version_history_records
+
+    if g_version_history_records is None or len(g_version_history_records) == 0:
 
-def prepare_system_specification():
-    """Prepare the System Specification validation document
+        infile = get_version_history_file()
+
+        header_to_position_lookup, rows = read_tsv_file(infile)
+
+        version_history_records = []
+
+        version_position = header_to_position_lookup['Version']
+        date_position = header_to_position_lookup['Date']
+        comment_position = header_to_position_lookup['Comment']
+
+        for row in rows:
+            version_history_records.append(TableRecord(VERSION_HISTORY_FIELDS, (row[version_position], row[date_position], row[comment_position])))
+
+        logging.info("Processed '{}' records in tab-delimited file '{}'".format(len(version_history_records), infile))
+
+        global g_version_history_comment
+
+        if g_version_history_comment is None or g_version_history_comment == '':
+            g_version_history_comment = ask('version_history_comment', "Please provide the version history comment for version '{}': ".format(g_software_version))
+
+        current_record = TableRecord(VERSION_HISTORY_FIELDS, (g_software_version, g_document_prepared_date, g_version_history_comment))
+
+        g_version_history_records = version_history_records
+
+        # a rerun of the same release, e.g. with --incremental, finds its record already appended
+        if is_version_history_record_appended(g_version_history_comment):
+            print("Version history file '{}' already ends with record '{}' '{}' '{}' so will not append it again".format(infile,
+                                                                                                                  g_software_version,
+                                                                                                                  g_document_prepared_date,
+                                                                                                                  g_version_history_comment))
+            logging.info("Version history file '{}' already ends with record '{}' '{}' '{}' so will not append it again".format(infile,
+                                                                                                                           g_software_version,
+                                                                                                                           g_document_prepared_date,
+                                                                                                                           g_version_history_comment))
+        else:
+            version_history_records.append(current_record)
+            update_version_history_file(infile)
+
+    return g_version_history_records
+
+
+def is_version_history_record_appended(version_history_comment):
+    """Check whether the version history file already ends with the record of the release
+    :param version_history_comment: {str} the version history comment of the release
+    :return appended: {bool} False as well when the version history file cannot be read
+    """
+    try:
+        header_to_position_lookup, rows = read_tsv_file(get_version_history_file())
+    except Exception:
+        return False
+
+    if len(rows) == 0:
+        return False
+
+    last_record = tuple([rows[-1][header_to_position_lookup[header]] for header in ('Version', 'Date', 'Comment')])
+
+    return last_record == (g_software_version, g_document_prepared_date, version_history_comment)
+
+
+def update_version_history_file(version_history_file):
+    """Append the new record to the bottom of the version history file
+    :param version_history_file: {str} abspath for the version history file
     :return None:
     """
-    doc_type = 'System Specification'
-    template_file = get_template_file(doc_type)
 
-    document = instantiate_mailmerge(template_file)
+    yes_or_no = ask('append_version_history', "\nAppend record to version history file '{}'? [Y/n] ".format(version_history_file), yes_no=True)
     
-    outfile = g_outdir + '/' + g_software_name + ' ' + g_software_version + ' - System Specification - ' + g_document_prepared_date + '.docx'
+    if yes_or_no is None or yes_or_no == '' or yes_or_no == 'Y' or yes_or_no == 'y':
+        with open(version_history_file, 'a') as fh:
+            fh.write("{}\t{}\t{}\n".format(g_software_version, g_document_prepared_date, g_version_history_comment))
+
+        logging.info("Appended record '{}' '{}' '{}' to version history file '{}'".format(g_software_version,
+                                                                                          g_document_prepared_date,
+                                                                                          g_version_history_comment,
+                                                                                          version_history_file))
+    else:
+        logging.info("Will not appended record '{}' '{}' '{}' to version history file '{}'".format(g_software_version,
+                                                                                                   g_document_prepared_date,
+                                                                                                   g_version_history_comment,
+                                                                                                   version_history_file))
+        global g_reminders
+        g_reminders.append("Append record '{}' '{}' '{}' to version history file '{}'".format(g_software_version,
+                                                                                                   g_document_prepared_date,
+                                                                                                   g_version_history_comment,
+                                                                                                   version_history_file))
 
-    hardware_table_records = get_iq_hardware_table_records('IQ')
-    software_table_records = get_iq_software_table_records('IQ')
 
-    document.merge_rows('h_id', hardware_table_records)
-    document.merge_rows('s_id', software_table_records)
+def display_reminders():
+    """Print the reminders to the STDOUT and log file
+    :return None:
+    """
+    count = len(g_reminders)
+    if count > 0:
+        print("\n\nSome friendly reminders:")
+        for i, reminder in enumerate(g_reminders, start=1):
+            print("{}. {}".format(i, reminder))
+            logging.info("{}. {}".format(i, reminder))
 
-    document.write(outfile)
 
-    print("Wrote '{}' validation document  '{}'".format(doc_type, outfile))
+def clone_mailmerge(template_data, document):
+    """Make an independent copy of a parsed MailMerge instance without re-reading the template zip
+    or re-parsing any of its XML parts
+
+    :param template_data: {bytes} the raw contents of the template file
+    :param document: {Object} the parsed MailMerge instance to be copied
+    :return clone: {Object} the new MailMerge instance
+    """
+    from mailmerge import MailMerge
+    from zipfile import ZipFile
+
+    clone = MailMerge.__new__(MailMerge)
+    clone.zip = ZipFile(io.BytesIO(template_data))
+    clone.static_parts = document.static_parts
+    # parts without merge fields are never modified, so their trees are shared rather than copied
+    clone.parts = {clone.zip.getinfo(zi.filename): tree if zi.filename in clone.static_parts else copy.deepcopy(tree)
+                   for zi, tree in document.parts.items()}
+    clone.settings = copy.deepcopy(document.settings)
+    clone._settings_info = None
+    if document._settings_info is not None:
+        clone._settings_info = clone.zip.getinfo(document._settings_info.filename)
+    clone.remove_empty_tables = document.remove_empty_tables
+    clone.streamed_tables = []
+
+    return clone
+
+
+def get_template_cache_entry(template_file):
+    """Retrieve the cache entry of the template, parsing the template when it is not cached yet
+    or has changed on disk.  The caller must hold g_template_cache_lock.
+    :param template_file: {str} the template file
+    :return entry: {dict} the template's raw contents, parsed document, merge fields and header-merged documents
+    """
+    from mailmerge import MailMerge
+
+    stat = os.stat(template_file)
+    stamp = (stat.st_mtime_ns, stat.st_size)
 
+    entry = g_template_cache.get(template_file)
+    if entry is None or entry['stamp'] != stamp:
+        with open(template_file, 'rb') as fh:
+            template_data = fh.read()
+        document = MailMerge(io.BytesIO(template_data))
+        # parts without merge fields are never changed by the merge, so they are written out as they are in the template
+        document.static_parts = {zi.filename for zi, part in document.parts.items() if part.find('.//MergeField') is None}
+        merge_fields = document.get_merge_fields()
+        logging.debug("Merge fields in template file '%s': %s", template_file, RecordDump(sorted(merge_fields)))
+        entry = {'stamp': stamp, 'data': template_data, 'document': document, 'merge_fields': merge_fields, 'merged': {}}
+        g_template_cache[template_file] = entry
+        logging.info("Parsed template file '{}' into the template cache".format(template_file))
 
-def prepare_test_plan():
-    """Prepare the Test Plan validation document
+    return entry
+
+
+def get_template_merge_fields(template_file):
+    """Retrieve the names of the merge fields in the template, parsing it into the template cache
+    :param template_file: {str} the template file
+    :return merge_fields: {set}
+    """
+    with g_template_cache_lock:
+        return get_template_cache_entry(template_file)['merge_fields']
+
+
+def get_cached_template(template_file):
+    """Retrieve the parsed and header-merged template from the in-process template cache.
+    The template is parsed once per path, modification time and size, and merged once per
+    set of header field values, so that repeated renders only pay for a clone.
+
+    :param template_file: {str} the template file
+    :return template_data, document: {tuple} the raw template contents and the header-merged MailMerge instance
+    """
+    header_values = (g_document_prepared_by, g_document_prepared_date, g_software_name, g_software_version, g_server)
+
+    with g_template_cache_lock:
+        entry = get_template_cache_entry(template_file)
+
+        if header_values not in entry['merged']:
+            # a long-running process sees many releases, so only the most recently merged header values are kept
+            if len(entry['merged']) >= TEMPLATE_CACHE_MAX_MERGED:
+                entry['merged'].pop(next(iter(entry['merged'])))
+            document = clone_mailmerge(entry['data'], entry['document'])
+            document.merge(
+                document_prepared_by=g_document_prepared_by,
+                document_prepared_date=g_document_prepared_date,
+                software_name=g_software_name,
+                software_version=g_software_version,
+                server=g_server)
+            entry['merged'][header_values] = document
+
+        return entry['data'], entry['merged'][header_values]
+
+
+def instantiate_mailmerge(template_file):
+    """Instantiate the MailMerge class
+
+    :param template_file: {str} the template file
+    :return document: {Object} the MailMerge instance 
+    """
+    with timed_phase('template load'):
+        template_data, document = get_cached_template(template_file)
+
+        return clone_mailmerge(template_data, document)
+
+
+def find_row_anchor(document, anchor):
+    """Find the template row of the table containing the anchor merge field
+    :param document: {Object} the MailMerge instance
+    :param anchor: {str} the merge field that identifies the template row
+    :return table, idx, row: {tuple} the table element, the index of the template row and the template row, or None values if not found
+    """
+    from mailmerge import NAMESPACES
+
+    for part in document.parts.values():
+        for table in part.findall('.//{%(w)s}tbl' % NAMESPACES):
+            for idx, row in enumerate(table):
+                if row.find('.//MergeField[@name="%s"]' % anchor) is not None:
+                    return table, idx, row
+
+    return None, None, None
+
+
+def merge_table_rows(document, anchor, records):
+    """Merge the records into the table whose template row contains the anchor merge field.
+    The template row is compiled once and replaced with a placeholder; the rows are only
+    generated, in a single pass, when the document is written.  Unless streaming, the records
+    are materialized first; when streaming, they are consumed one at a time while the document
+    is written, so they are never held in memory all at once.
+    :param document: {Object} the MailMerge instance
+    :param anchor: {str} the merge field that identifies the template row
+    :param records: {iterable} the mappings to merge, one per table row
     :return None:
     """
+    from lxml import etree
+
+    if not g_streaming:
+        with timed_phase('tsv parse'):
+            records = list(records)
+        logging.debug("'%s' table records: %s", anchor, RecordDump(records))
+    elif logging.getLogger().isEnabledFor(logging.DEBUG):
+        records = iter_logged_records(anchor, records)
+
+    table, idx, row = find_row_anchor(document, anchor)
+    if table is None:
+        return
+
+    placeholder = etree.Comment('streamed-table-{}'.format(uuid.uuid4().hex))
+    table.replace(row, placeholder)
+
+    document.streamed_tables.append({
+        'anchor': anchor,
+        'marker': etree.tostring(placeholder),
+        'template_row': row,
+        'namespaces': table.nsmap,
+        'compiled_row': compile_table_row(row, table.nsmap),
+        'records': records
+    })
+
+
+def iter_logged_records(anchor, records):
+    """Pass the streamed records of a table through, keeping only the first and last of them so that
+    they can be logged like the records of a materialized table once the table has been written.
+    Without a g_log_max_records limit, LOG_MAX_RECORDS records are kept.
+    :param anchor: {str} the merge field that identifies the table
+    :param records: {iterable} the streamed records
+    :return records: {generator} the same records
+    """
+    import collections
 
-    doc_type = 'Test Plan'
-    template_file = get_template_file(doc_type)
+    max_records = g_log_max_records if g_log_max_records is not None and g_log_max_records > 0 else LOG_MAX_RECORDS
+    head = []
+    tail = collections.deque(maxlen=max_records // 2)
+    count = 0
+
+    for record in records:
+        if count < (max_records + 1) // 2:
+            head.append(record)
+        else:
+            tail.append(record)
+        count += 1
+        yield record
+
+    logging.debug("'%s' table records: %s", anchor, RecordDump(head + list(tail), count))
+
+
+def strip_inherited_namespaces(xml, namespaces):
+    """Drop the namespace declarations that a detached element re-declares on its start tag
+    but that are already declared by its ancestors in the document
+    :param xml: {bytes} the serialized element
+    :param namespaces: {dict} the namespaces declared by the ancestors
+    :return xml: {bytes}
+    """
+    end = xml.index(b'>')
+    start_tag = xml[:end]
+    for prefix, uri in namespaces.items():
+        if prefix is None:
+            declaration = ' xmlns="{}"'.format(uri)
+        else:
+            declaration = ' xmlns:{}="{}"'.format(prefix, uri)
+        start_tag = start_tag.replace(declaration.encode(), b'', 1)
+
+    return start_tag + xml[end:]
+
+
+def compile_table_row(template_row, namespaces):
+    """Analyze the template row once into the static XML fragments between its merge fields,
+    replacing every merge field the same way MailMerge does but with a substitution slot
+    :param template_row: {Element} the template row
+    :param namespaces: {dict} the namespaces declared by the ancestors of the table
+    :return compiled_row: {dict} the fragments, the slot field names and the markup that separates lines, or None if the row cannot be compiled
+    """
+    from mailmerge import NAMESPACES
+    from lxml import etree
+
+    row = copy.deepcopy(template_row)
+    token_prefix = 'slot{}'.format(uuid.uuid4().hex)
+    fields = []
+
+    for merge_field in list(row.iter('MergeField')):
+        children = list(merge_field)
+        name = merge_field.attrib['name']
+        merge_field.clear()
+        merge_field.tag = '{%(w)s}r' % NAMESPACES
+        merge_field.extend(children)
+
+        text_node = etree.Element('{%(w)s}t' % NAMESPACES)
+        text_node.text = '{}-{}-'.format(token_prefix, len(fields))
+        fields.append(name)
+
+        merge_text = merge_field.find('MergeText')
+        if merge_text is not None:
+            merge_field.insert(merge_field.index(merge_text), text_node)
+            merge_field.remove(merge_text)
+        else:
+            merge_field.append(text_node)
+
+    xml = strip_inherited_namespaces(etree.tostring(row), namespaces)
+
+    fragments = []
+    position = 0
+    for slot_ctr in range(len(fields)):
+        token = '{}-{}-'.format(token_prefix, slot_ctr).encode()
+        if xml.count(token) != 1:
+            logging.info("Could not compile the template row containing '{}' so will merge it row by row".format(fields[slot_ctr]))
+            return None
+        token_position = xml.index(token)
+        fragments.append(xml[position:token_position])
+        position = token_position + len(token)
+    fragments.append(xml[position:])
+
+    # multi-line values are split into text nodes separated by line breaks, as MailMerge does;
+    # every slot sits directly inside a text node so its start tag precedes the slot
+    text_start_tag = fragments[0][fragments[0].rindex(b'<'):]
+    qualified_name = text_start_tag[1:-1]
+    line_break = b'</' + qualified_name + b'><' + qualified_name[:-1] + b'br/>' + text_start_tag
+
+    return {'fragments': fragments, 'fields': fields, 'line_break': line_break}
+
+
+# the characters outside of the XML 1.0 Char production, spelled out rather than negated as that is much cheaper to compile
+INVALID_XML_CHARACTERS = re.compile('[\u0000-\u0008\u000b\u000c\u000e-\u001f\ud800-\udfff\ufffe\uffff]')
+
+
+def render_compiled_row(compiled_row, record):
+    """Fill the substitution slots of the compiled row with the values of the record
+    :param compiled_row: {dict} the compiled template row
+    :param record: {Mapping} the values to merge
+    :return xml: {bytes} the serialized row, or None if a value cannot be rendered by the compiled row
+    """
+    fragments = compiled_row['fragments']
+    parts = [fragments[0]]
+
+    for slot_ctr, field in enumerate(compiled_row['fields']):
+        value = record.get(field)
+        if value is None:
+            value = ''
+        elif not isinstance(value, str) or INVALID_XML_CHARACTERS.search(value) is not None:
+            return None
+
+        lines = value.replace('\r', '').split('\n')
+        for line_ctr, line in enumerate(lines):
+            if line_ctr > 0:
+                parts.append(compiled_row['line_break'])
+            parts.append(line.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').encode('ascii', 'xmlcharrefreplace'))
+
+        parts.append(fragments[slot_ctr + 1])
+
+    return b''.join(parts)
+
+
+def serialize_table_row(document, row, namespaces):
+    """Serialize a merged table row exactly as it would appear within the document part
+    :param document: {Object} the MailMerge instance
+    :param row: {Element} the merged table row
+    :param namespaces: {dict} the namespaces already declared by the ancestors of the table
+    :return xml: {bytes}
+    """
+    from lxml import etree
+
+    # remaining merge fields are emptied as MailMerge.write() does for the rest of the document
+    for field in document.get_merge_fields([row]):
+        document.merge([row], **{field: ''})
+
+    return strip_inherited_namespaces(etree.tostring(row), namespaces)
+
+
+def iter_streamed_table_rows(document, streamed_table):
+    """Generate the serialized rows of a table, one record at a time.  Rows are rendered from the
+    compiled template row; records it cannot render fall back to copying and merging the
+    template row with MailMerge.
+    :param document: {Object} the MailMerge instance
+    :param streamed_table: {dict} the table registered by merge_table_rows()
+    :return rows: {generator} of serialized rows
+    """
+    template_row = streamed_table['template_row']
+    compiled_row = streamed_table['compiled_row']
+    row_ctr = 0
+    fallback_ctr = 0
+
+    for record in streamed_table['records']:
+        xml = None
+        if compiled_row is not None:
+            xml = render_compiled_row(compiled_row, record)
+        if xml is None:
+            row = copy.deepcopy(template_row)
+            document.merge([row], **record)
+            xml = serialize_table_row(document, row, streamed_table['namespaces'])
+            fallback_ctr += 1
+        yield xml
+        row_ctr += 1
+
+    if row_ctr == 0:
+        # MailMerge leaves the template row in place when there are no records
+        yield serialize_table_row(document, copy.deepcopy(template_row), streamed_table['namespaces'])
+
+    logging.info("Merged '{}' rows into the '{}' table ('{}' without the compiled row)".format(row_ctr, streamed_table['anchor'], fallback_ctr))
+
+
+def iter_table_row_chunks(document, streamed_table):
+    """Group the serialized rows of a table into chunks so that they are written in a few large writes
+    :param document: {Object} the MailMerge instance
+    :param streamed_table: {dict} the table registered by merge_table_rows()
+    :return chunks: {generator} of up to TABLE_ROW_CHUNK_SIZE serialized rows joined together
+    """
+    rows = iter_streamed_table_rows(document, streamed_table)
+    while True:
+        with timed_phase('row merge'):
+            chunk = b''.join(itertools.islice(rows, TABLE_ROW_CHUNK_SIZE))
+        if len(chunk) == 0:
+            break
+        yield chunk
+
+
+def can_copy_raw_zip_member(output, source):
+    """Check that the private zipfile internals that copy_zip_member() writes through are present,
+    since they are not a public API and differ between Python versions
+    :param output: {ZipFile} the archive being written
+    :param source: {ZipFile} the archive the member is copied from
+    :return supported: {bool}
+    """
+    from zipfile import ZipInfo
+
+    return (all([hasattr(output, attribute) for attribute in ZIP_RAW_COPY_ATTRIBUTES])
+            and callable(getattr(ZipInfo, 'FileHeader', None))
+            and getattr(source, 'fp', None) is not None)
+
+
+def copy_zip_member(output, source, zi):
+    """Copy a member of the source archive into the output archive as its raw compressed bytes,
+    without decompressing and recompressing it.  zipfile has no public API for this, so the local
+    header and the data are written the way ZipFile.open(name, 'w') writes them.  When the zipfile
+    internals this relies on are missing, the member is decompressed and written with writestr().
+    :param output: {ZipFile} the archive being written
+    :param source: {ZipFile} the archive the member is copied from
+    :param zi: {ZipInfo} the member of the source archive
+    :return None:
+    """
+    import struct
+    from zipfile import ZipInfo
+
+    if not can_copy_raw_zip_member(output, source):
+        member = ZipInfo(zi.filename, zi.date_time)
+        member.compress_type = zi.compress_type
+        member.create_system = zi.create_system
+        member.external_attr = zi.external_attr
+        output.writestr(member, source.read(zi.filename))
+        return
+
+    source.fp.seek(zi.header_offset)
+    header = source.fp.read(30)
+    if header[:4] != b'PK\x03\x04':
+        raise Exception("Bad local file header for member '{}' of the template".format(zi.filename))
+    filename_length, extra_length = struct.unpack('<HH', header[26:30])
+    source.fp.seek(zi.header_offset + 30 + filename_length + extra_length)
+    data = source.fp.read(zi.compress_size)
+
+    member = ZipInfo(zi.filename, zi.date_time)
+    member.compress_type = zi.compress_type
+    member.CRC = zi.CRC
+    member.compress_size = zi.compress_size
+    member.file_size = zi.file_size
+    # the sizes and CRC go in the local header, so no data descriptor follows the data
+    member.flag_bits = zi.flag_bits & ~0x08
+    member.create_system = zi.create_system
+    member.external_attr = zi.external_attr
+
+    with output._lock:
+        if output._writing:
+            raise ValueError("Can't copy a member into the zip file while another write handle is open on it")
+        if output._seekable:
+            output.fp.seek(output.start_dir)
+        member.header_offset = output.fp.tell()
+        output._writecheck(member)
+        output._didModify = True
+        output.fp.write(member.FileHeader())
+        output.fp.write(data)
+        output.filelist.append(member)
+        output.NameToInfo[member.filename] = member
+        output.start_dir = output.fp.tell()
+
+
+def write_document(document, outfile):
+    """Write the merged document to the output file.  The rows of the merged tables are emitted
+    directly into their zip member, so memory use does not grow with the number of records.
+    Only the XML parts that the merge can change are re-serialized; every other member (media,
+    styles, relationships and parts without merge fields) is copied from the template as its raw
+    compressed bytes.  Re-serialized parts are deflated at g_compression_level (0 stores them
+    uncompressed) and, when g_buffered_write is set, the zip is assembled in memory and written
+    to disk with a single write.
+    :param document: {Object} the MailMerge instance
+    :param outfile: {str} the output file
+    :return None:
+    """
+    from lxml import etree
+    from zipfile import ZipFile, ZIP_DEFLATED, ZIP_STORED
+
+    if g_compression_level == 0:
+        compression, compresslevel = ZIP_STORED, None
+    else:
+        compression, compresslevel = ZIP_DEFLATED, g_compression_level
+
+    with timed_phase('write'):
+        # remaining merge fields are emptied as MailMerge.write() does
+        for field in document.get_merge_fields():
+            document.merge(**{field: ''})
+
+        target = io.BytesIO() if g_buffered_write else outfile
+
+        with ZipFile(target, 'w', compression, compresslevel=compresslevel) as output:
+            for zi in document.zip.filelist:
+                if zi in document.parts and zi.filename not in document.static_parts:
+                    xml = etree.tostring(document.parts[zi].getroot())
+                    streamed_tables = sorted([streamed_table for streamed_table in document.streamed_tables if streamed_table['marker'] in xml],
+                                             key=lambda streamed_table: xml.index(streamed_table['marker']))
+                    if len(streamed_tables) == 0:
+                        output.writestr(zi.filename, xml)
+                        continue
+
+                    with output.open(zi.filename, 'w') as fh:
+                        position = 0
+                        for streamed_table in streamed_tables:
+                            marker_position = xml.index(streamed_table['marker'])
+                            fh.write(xml[position:marker_position])
+                            for chunk in iter_table_row_chunks(document, streamed_table):
+                                fh.write(chunk)
+                            position = marker_position + len(streamed_table['marker'])
+                        fh.write(xml[position:])
+                elif zi == document._settings_info:
+                    xml = etree.tostring(document.settings.getroot())
+                    output.writestr(zi.filename, xml)
+                else:
+                    copy_zip_member(output, document.zip, zi)
+
+        if g_buffered_write:
+            with open(outfile, 'wb') as fh:
+                fh.write(target.getbuffer())
+
+
+def get_template_file(doc_type):
+    """Derive the template file from the config file
+    :param doc_type: {str} document type
+    :return template_file: {str}
+    """
+    template_file_basename = None
+
+    config_key = DOCUMENT_REGISTRY[doc_type]['template']
+
+    if config_key not in g_config or 'template file basename' not in g_config[config_key]:
+        error_msg = "Could not retrieve the '{} 'template file basename' from the config file so set default '{}'".format(config_key, template_file_basename)
+        logging.error("Could not retrieve the '{} 'template file basename' from the config file so set default '{}'".format(config_key, template_file_basename))
+        raise Exception(error_msg)
+    else:
+        template_file_basename = g_config[config_key]['template file basename']
+
+    template_file = os.path.join(g_template_files_dir, template_file_basename)
+
+    if not os.path.exists(template_file):
+        error_msg = "template file '{}' does not exist".format(template_file)
+        logging.error(error_msg)
+        raise Exception(error_msg)
+
+    return template_file
+
+
+def get_outfile(doc_type):
+    """Derive the output file for the validation document
+    :param doc_type: {str} document type
+    :return outfile: {str}
+    """
+    return g_outdir + '/' + DOCUMENT_REGISTRY[doc_type]['outfile'].format(software_name=g_software_name, software_version=g_software_version, document_prepared_date=g_document_prepared_date)
+
+
+def prepare_validation_document(template_file, outfile):
+    """Prepare the specific validation document
+    :param template_file: {str} the MS Word template file
+    :param outfile: {str} the output file
+    :return:
+    """
+    if not os.path.exists(template_file):
+        error_msg = "template file '{}' does not exist".format(template_file)
+        logging.error(error_msg)
+        raise Exception(error_msg)
 
     document = instantiate_mailmerge(template_file)
+    write_document(document, outfile)
+    logging.info("Wrote output file '{}'".format(outfile))
+    print("Wrote output file '{}'".format(outfile))
 
-    outfile = g_outdir + '/' + g_software_name + ' ' + g_software_version + ' - Test Plan - ' + g_document_prepared_date + '.docx'
 
-    hardware_table_records = get_iq_hardware_table_records('IQ')
-    software_table_records = get_iq_software_table_records('IQ')
+def get_iq_hardware_checklist_file(doc_type):
+    """Derive the IQ hardware checklist file
+    :param doc_type: {str} the document type, default 'IQ'
+    :return infile: {str} the IQ hardware checklist file
+    """
+    if doc_type not in g_config or 'hardware checklist file basename' not in g_config[doc_type]:
+        error_msg = "Could not retrieve the '{}' 'hardware checklist file basename' from the config file".format(doc_type)
+        logging.error(error_msg)
+        raise Exception(error_msg)
+    else:
+        basename = g_config[doc_type]['hardware checklist file basename']
+        infile = os.path.join(g_config_dir, basename)
+
+    if not os.path.exists(infile):
+        raise Exception("file '{}' does not exist".format(infile))
+
+    return infile
 
-    checklist_tables = get_oq_checklist_tables()
 
-    test_data_records = get_oq_test_data_records()
+def iter_iq_hardware_table_records(doc_type='IQ'):
+    """Generate the IQ hardware checklist records one row at a time
+    :param doc_type: {str} document type, default 'IQ'
+    :return hardware_table_records: {generator} of dictionaries
+    """
+    infile = get_iq_hardware_checklist_file(doc_type)
 
-    document.merge_rows('test_data_name', test_data_records)
-    document.merge_rows('id_rep1', checklist_tables[0])
+    header_to_position_lookup, rows = get_tsv_rows(infile)
 
-    document.merge_rows('h_id', hardware_table_records)
-    document.merge_rows('s_id', software_table_records)
+    description_position = header_to_position_lookup['Description']
+    requirement_position = header_to_position_lookup['Requirement']
 
-    version_history_records = get_version_history_records()
-    document.merge_rows('vh_id', version_history_records)
+    record_ctr = 0
 
-    document.write(outfile)
+    for iq_checklist_ctr, row in enumerate(rows, start=1):
+        yield TableRecord(IQ_HARDWARE_FIELDS, (str(iq_checklist_ctr), row[description_position], row[requirement_position], g_iq_yes_no, g_iq_date))
+        record_ctr += 1
 
-    print("Wrote '{}' validation document  '{}'".format(doc_type, outfile))
+    logging.info("Processed '{}' records in tab-delimited file '{}'".format(record_ctr, infile))
 
 
-def get_user_requirements_checklist_file(doc_type='User Requirements'):
-    """Derive the User Requirements checklist file
-    :param doc_type: {str} the document type, default 'User Requirements'
-    :return infile: {str} the User Requirements checklist file
+def get_iq_software_checklist_file(doc_type):
+    """Derive the IQ software checklist file
+    :param doc_type: {str} the document type, default 'IQ'
+    :return infile: {str} the IQ software checklist file
     """
-    if doc_type not in g_config or 'checklist file basename' not in g_config[doc_type]:
-        error_msg = "Could not retrieve the '{}' 'checklist file basename' from the config file".format(doc_type)
+    if doc_type not in g_config or 'software checklist file basename' not in g_config[doc_type]:
+        error_msg = "Could not retrieve the '{}' 'software checklist file basename' from the config file".format(doc_type)
         logging.error(error_msg)
         raise Exception(error_msg)
     else:
-        basename = g_config[doc_type]['checklist file basename']
+        basename = g_config[doc_type]['software checklist file basename']
         infile = os.path.join(g_config_dir, basename)
 
-    if not os.path.exists(infile):
-        raise Exception("file '{}' does not exist".format(infile))
+    if not os.path.exists(infile):
+        raise Exception("file '{}' does not exist".format(infile))
+
+    return infile
+
+
+def iter_iq_software_table_records(doc_type):
+    """Generate the IQ software checklist records one row at a time.
+    The IQ checklist numbering continues on from the hardware checklist.
+    :param doc_type: {str}
+    :return software_table_records: {generator} of dictionaries
+    """
+    infile = get_iq_software_checklist_file(doc_type)
+
+    header_to_position_lookup, rows = get_tsv_rows(infile)
+
+    hardware_header_to_position_lookup, hardware_rows = get_tsv_rows(get_iq_hardware_checklist_file(doc_type))
+
+    hardware_record_ctr = sum(1 for row in hardware_rows)
+
+    description_position = header_to_position_lookup['Description']
+    requirement_position = header_to_position_lookup['Requirement']
+
+    record_ctr = 0
+
+    for iq_checklist_ctr, row in enumerate(rows, start=hardware_record_ctr + 1):
+        yield TableRecord(IQ_SOFTWARE_FIELDS, (str(iq_checklist_ctr), row[description_position], row[requirement_position], g_iq_yes_no, g_iq_date))
+        record_ctr += 1
+
+    logging.info("Processed '{}' records in tab-delimited file '{}'".format(record_ctr, infile))
+
+
+def get_oq_checklist_file(doc_type='OQ'):
+    """Derive the OQ checklist tab-delimited file
+    :param doc_type: {str} the document type, default 'OQ'
+    :return infile: {str} the absolute path to the OQ checklist tab-delimited file
+    """
+    if doc_type not in g_config or 'checklist file basename' not in g_config[doc_type]:
+        error_msg = "Could not retrieve the '{}' 'checklist file basename' from the config file".format(doc_type)
+        logging.error(error_msg)
+        raise Exception(error_msg)
+    else:
+        basename = g_config[doc_type]['checklist file basename']
+        infile = os.path.join(g_config_dir, basename)
+
+    if not os.path.exists(infile):
+        raise Exception("'{}' checklist file '{}' does not exist".format(doc_type, infile))
+
+    return infile
+
+
+def iter_oq_checklist_records(replicate, doc_type='OQ'):
+    """Generate the OQ checklist records of one replicate one row at a time
+    :param replicate: {int} the checklist replicate, either 1 or 2
+    :param doc_type: {str} the document type default 'OQ'
+    :return checklist_records: {generator} of dictionaries
+    """
+    infile = get_oq_checklist_file(doc_type)
+
+    header_to_position_lookup, rows = get_tsv_rows(infile)
+
+    test_numbers_included = 'Test Number' in header_to_position_lookup
+
+    test_procedure_position = header_to_position_lookup['Test Procedure']
+    expected_finding_position = header_to_position_lookup['Expected Finding']
+
+    field_positions = OQ_CHECKLIST_FIELDS[replicate]
+
+    record_ctr = 0
+
+    for id_ctr, row in enumerate(rows, start=1):
+        if test_numbers_included:
+            test_id = row[header_to_position_lookup['Test Number']]
+        else:
+            test_id = 'T' + str(id_ctr)
+
+        yield TableRecord(field_positions, (test_id, row[test_procedure_position], row[expected_finding_position], g_oq_yes_no, g_oq_date))
+        record_ctr += 1
+
+    logging.info("Processed '{}' records in tab-delimited file '{}'".format(record_ctr, infile))
+
+
+def get_oq_test_data_file(doc_type='OQ'):
+    """Derive the OQ test data tab-delimited file
+    :param doc_type: {str} the document type, default 'OQ'
+    :return infile: {str} the absolute path for the OQ test data tab-delimited file
+    """
+    infile = None
+
+    if doc_type not in g_config or 'test data file basename' not in g_config[doc_type]:
+        error_msg = "Could not retrieve the '{}' 'test data file basename' from the config file".format(doc_type)
+        logging.warning(error_msg)
+    else:
+        basename = g_config[doc_type]['test data file basename']
+        infile = os.path.join(g_config_dir, basename)
+        if not os.path.exists(infile):
+            raise Exception("'{}' test data file '{}' does not exist".format(doc_type, infile))
+
+    return infile
+
+
+def iter_oq_test_data_records(doc_type='OQ'):
+    """Generate the OQ test data records one row at a time
+    :param doc_type: {str} the document type default 'OQ'
+    :return test_data_records: {generator} of dictionaries
+    """
+    infile = get_oq_test_data_file(doc_type)
+
+    if infile is None:
+        yield TableRecord(OQ_TEST_DATA_FIELDS, ('TBD', 'TBD'))
+    else:
+        header_to_position_lookup, rows = get_tsv_rows(infile)
+
+        name_position = header_to_position_lookup['Name']
+        description_position = header_to_position_lookup['Description']
+
+        record_ctr = 0
+
+        for row in rows:
+
+            yield TableRecord(OQ_TEST_DATA_FIELDS, (row[name_position], row[description_position]))
+
+            record_ctr += 1
+
+        logging.info("Processed '{}' records in tab-delimited file '{}'".format(record_ctr, infile))
+
+
+def get_oq_test_data_records(doc_type : str = 'OQ') -> list:
+    """Retrieve the OQ test data records from the tab-delimited file
+    :param doc_type: {str} the document type default 'OQ'
+    :return test_data_records: {list} array of dictionaries
+    """
+    return list(iter_oq_test_data_records(doc_type))
+
+
+def ask_prepare_executed(doc_type):
+    """Ask whether the partially executed version of the validation document should be prepared
+    :param doc_type: {str} either IQ, OQ or PQ
+    :return yes_no, date: {tuple} the values for the yes/no and date columns of the checklist tables
+    """
+    yes_no = ask('prepare_executed_{}'.format(doc_type.lower()), "Prepare executed {}? [Y/n] ".format(doc_type), yes_no=True)
+    if yes_no is None or yes_no == '' or yes_no == 'Y' or yes_no == 'y':
+        logging.info("Will prepare partially executed {} validation document".format(doc_type))
+        return 'Yes', get_default_document_prepared_date()
+    elif yes_no == 'N' or yes_no == 'n':
+        logging.info("Will not prepare a partially executed {} validation document".format(doc_type))
+        return '', ''
+
+    return None, None
+
+
+def get_executed_doc_types(doc_types=None):
+    """Determine which of the executed IQ, OQ and PQ questions the validation documents need: the IQ and OQ
+    answers are merged into the records of the IQ checklists and the OQ checklist, while the PQ answer
+    only decides whether the PQ replicate folders are offered
+    :param doc_types: {list} the document types that will be rendered, default all
+    :return executed_doc_types: {list} a subset of IQ, OQ and PQ
+    """
+    # the traceability matrix only joins the checklist IDs so it needs no answers
+    input_names = get_document_inputs([doc_type for doc_type in get_release_doc_types(doc_types) if doc_type != 'Traceability Matrix'])
+
+    executed_doc_types = []
+    if 'IQ hardware checklist' in input_names or 'IQ software checklist' in input_names:
+        executed_doc_types.append('IQ')
+    if 'OQ checklist' in input_names:
+        executed_doc_types.append('OQ')
+    if doc_types is None or 'PQ' in doc_types:
+        executed_doc_types.append('PQ')
+
+    return executed_doc_types
+
+
+def ask_executed_documents(doc_types=None):
+    """Ask up-front whether to prepare the executed IQ, OQ and PQ validation documents
+    so that no prompts are issued while the documents are being rendered
+    :param doc_types: {list} the document types that will be rendered, default all
+    :return None:
+    """
+    global g_iq_yes_no
+    global g_iq_date
+    global g_oq_yes_no
+    global g_oq_date
+    global g_pq_yes_no
+    global g_pq_date
+
+    executed_doc_types = get_executed_doc_types(doc_types)
+
+    if 'IQ' in executed_doc_types:
+        g_iq_yes_no, g_iq_date = ask_prepare_executed('IQ')
+    if 'OQ' in executed_doc_types:
+        g_oq_yes_no, g_oq_date = ask_prepare_executed('OQ')
+    if 'PQ' in executed_doc_types:
+        g_pq_yes_no, g_pq_date = ask_prepare_executed('PQ')
+
+
+def ask_prepare_replicate_folders(doc_types=None):
+    """Ask whether to prepare the OQ and PQ replicate folders for the executed validation documents,
+    then create all of the folders that are wanted at once
+    :param doc_types: {list} the document types that were rendered, default all
+    :return None:
+    """
+    replicate_folders = []
+
+    for type, yes_no in (('OQ', g_oq_yes_no), ('PQ', g_pq_yes_no)):
+        if doc_types is not None and type not in doc_types:
+            continue
+        if yes_no == 'Yes':
+            answer = ask('prepare_{}_replicate_folders'.format(type.lower()), "\nPrepare {} replicate folders? [Y/n] ".format(type), yes_no=True)
+            if answer is None or answer == '' or answer == 'Y' or answer == 'y':
+                logging.info("Will prepare {} replicate folders".format(type))
+                replicate_folders.extend(get_replicate_folders(type))
+            elif answer == 'N' or answer == 'n':
+                logging.info("Will not prepare {} replicate folders".format(type))
+
+    if len(replicate_folders) > 0:
+        create_replicate_folders(replicate_folders)
+
+
+def get_replicate_folders(type):
+    """Derive the replicate folders for the executed validation documents, one per replicate
+    ('number of replicates' in the configuration file, default 2)
+    :param type: {str} either OQ or PQ
+    :return replicate_folders: {list} the folders; empty when no executed validation documents folder is configured
+    """
+    if 'executed_validation_documents_folder' not in g_config:
+        logging.warning("'executed_validation_documents_folder' does not exist in the configuration file so will not be able to create the '{}' replicate folders".format(type))
+        return []
+
+    dir = g_config['executed_validation_documents_folder']
+
+    return [dir + '/' + g_software_version + '/' + g_document_prepared_date + '/' + type + '-replicate-' + str(replicate)
+            for replicate in range(1, int(g_config.get('number of replicates', 2)) + 1)]
+
+
+def get_replicate_folder_servers():
+    """Derive the servers on which to create the replicate folders: those given on the command line,
+    else 'replicate folders servers' in the configuration file, else the server of the release
+    :return servers: {list}
+    """
+    if g_replicate_folder_servers:
+        return list(g_replicate_folder_servers)
+
+    return list(g_config.get('replicate folders servers', [g_server]))
+
+
+def create_replicate_folders(replicate_folders):
+    """Create the replicate folders on every server concurrently with the backend named by
+    'replicate folders backend' in the configuration file: 'ssh' (the default) or 'local', which
+    creates them on this host.  At most 'replicate folders jobs' servers (default 8) are provisioned
+    at a time and each is given 'replicate folders timeout' seconds (default 60).
+    :param replicate_folders: {list} the folders to create
+    :return None:
+    """
+    import concurrent.futures
+
+    backend = g_config.get('replicate folders backend', 'ssh')
+    if backend not in REPLICATE_FOLDER_BACKENDS:
+        raise Exception("Unsupported 'replicate folders backend' '{}', expected one of: {}".format(backend, ', '.join(REPLICATE_FOLDER_BACKENDS)))
+
+    if backend == 'ssh' and 'sshkey_file' not in g_config:
+        logging.warning("Cannot create the replicate folders because sshkey_file is not defined in the configuration file")
+        return
+
+    servers = get_replicate_folder_servers()
+    jobs = min(len(servers), int(g_config.get('replicate folders jobs', 8)))
+    timeout = float(g_config.get('replicate folders timeout', 60))
+
+    logging.info("Creating '{}' replicate folders on '{}' servers with the '{}' backend".format(len(replicate_folders), len(servers), backend))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(provision_server, REPLICATE_FOLDER_BACKENDS[backend], server, replicate_folders, timeout) for server in servers]
+        results = [future.result() for future in futures]
+
+    display_provisioning_summary(results)
+
+    failed_servers = [server for server, status, seconds, message in results if status != 'ok']
+    if len(failed_servers) > 0:
+        raise Exception("Could not create the replicate folders on '{}' of '{}' servers: {}".format(len(failed_servers), len(servers), ', '.join(failed_servers)))
+
+
+def provision_server(create_directories, server, dirs, timeout):
+    """Create the directories on a single server, capturing the outcome rather than raising
+    :param create_directories: {function} the backend
+    :param server: {str} the server
+    :param dirs: {list} the directories to create
+    :param timeout: {float} the seconds allowed for the server
+    :return server, status, seconds, message: {tuple} the status is 'ok', 'timeout' or 'failed'
+    """
+    start_time = time.time()
+    try:
+        create_directories(server, dirs, timeout)
+        return server, 'ok', time.time() - start_time, ''
+    except TimeoutError as e:
+        logging.error(str(e))
+        return server, 'timeout', time.time() - start_time, str(e)
+    except Exception as e:
+        logging.error(str(e))
+        return server, 'failed', time.time() - start_time, str(e)
+
+
+def display_provisioning_summary(results):
+    """Print the per-server outcome of creating the replicate folders to the STDOUT and log file
+    :param results: {list} the (server, status, seconds, message) for every server
+    :return None:
+    """
+    width = max([len(server) for server, status, seconds, message in results] + [len('Server')])
+
+    print("\nReplicate folders:")
+    print("{:<{}}  {:<7}  {:>9}".format('Server', width, 'Status', 'Seconds'))
+    for server, status, seconds, message in results:
+        print("{:<{}}  {:<7}  {:>9.2f}  {}".format(server, width, status, seconds, message).rstrip())
+        logging.info("Replicate folders on server '{}' {} in {:.2f} seconds {}".format(server, status, seconds, message).rstrip())
+
+
+def create_remote_directories(server, dirs, timeout):
+    """Create the directories on the server over a single SSH session
+    :param server: {str} the server
+    :param dirs: {list} the directories to create
+    :param timeout: {float} the seconds allowed before the session is killed
+    :return None:
+    """
+    import shlex
+    import subprocess
+
+    sshkey_file = g_config['sshkey_file']
+
+    if not os.path.exists(sshkey_file):
+        raise Exception("sshkey file '{}' does not exist".format(sshkey_file))
+
+    remote_cmd = 'mkdir -p -- ' + ' '.join([shlex.quote(dir) for dir in dirs])
+    cmd = ['ssh', '-i', sshkey_file, '-o', 'BatchMode=yes', '-o', 'ConnectTimeout={}'.format(max(1, int(timeout))), 'root@{}'.format(server), remote_cmd]
+
+    logging.info("About to execute '{}'".format(' '.join([shlex.quote(arg) for arg in cmd])))
+
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise TimeoutError("Creating the replicate folders on server '{}' timed out after {} seconds".format(server, timeout))
+
+    logging.info("return value: {}".format(result.returncode))
+
+    if result.returncode != 0:
+        raise Exception("Could not create the replicate folders on server '{}' (exit status {}): {}".format(server, result.returncode, result.stderr.strip()))
+
+    for dir in dirs:
+        logging.info("Created replicate folder '{}' on server '{}'".format(dir, server))
+
+
+def create_local_directories(server, dirs, timeout):
+    """Create the directories on this host, standing in for the server e.g. when testing
+    or when the executed validation documents folder is a mounted share
+    :param server: {str} the server this host stands in for
+    :param dirs: {list} the directories to create
+    :param timeout: {float} unused
+    :return None:
+    """
+    for dir in dirs:
+        pathlib.Path(dir).mkdir(parents=True, exist_ok=True)
+        logging.info("Created replicate folder '{}' for server '{}'".format(dir, server))
+
+
+REPLICATE_FOLDER_BACKENDS = {
+    'ssh': create_remote_directories,
+    'local': create_local_directories
+}
+
+
+def get_user_requirements_checklist_file(doc_type='User Requirements'):
+    """Derive the User Requirements checklist file
+    :param doc_type: {str} the document type, default 'User Requirements'
+    :return infile: {str} the User Requirements checklist file
+    """
+    if doc_type not in g_config or 'checklist file basename' not in g_config[doc_type]:
+        error_msg = "Could not retrieve the '{}' 'checklist file basename' from the config file".format(doc_type)
+        logging.error(error_msg)
+        raise Exception(error_msg)
+    else:
+        basename = g_config[doc_type]['checklist file basename']
+        infile = os.path.join(g_config_dir, basename)
+
+    if not os.path.exists(infile):
+        raise Exception("file '{}' does not exist".format(infile))
+
+    return infile
+
+
+def iter_user_requirements_table_records(doc_type='User Requirements'):
+    """Generate the User Requirements checklist records one row at a time
+    :param doc_type: {str} document type, default 'User Requirements'
+    :return table_records: {generator} of dictionaries
+    """
+    infile = get_user_requirements_checklist_file(doc_type)
+
+    header_to_position_lookup, rows = get_tsv_rows(infile)
+
+    id_header_found = 'ID' in header_to_position_lookup
+
+    requirement_position = header_to_position_lookup['Requirement Description']
+    criticality_position = header_to_position_lookup['Criticality']
+    comment_position = header_to_position_lookup['Comment']
+    test_id_position = header_to_position_lookup['Test ID']
+
+    record_ctr = 0
+
+    for id_ctr, row in enumerate(rows, start=1):
+        ur_id = str(id_ctr)
+        if id_header_found:
+            ur_id = row[header_to_position_lookup['ID']]
+
+        yield TableRecord(USER_REQUIREMENTS_FIELDS, (ur_id, row[requirement_position], row[criticality_position], row[comment_position], row[test_id_position]))
+        record_ctr += 1
+
+    logging.info("Processed '{}' records in tab-delimited file '{}'".format(record_ctr, infile))
+
+
+def get_traceability():
+    """Retrieve the traceability of the release, joining the checklists only once.  The join is
+    repeated when the modification time or size of either checklist changes.
+    :return traceability: {dict} see join_traceability()
+    """
+    global g_traceability
+
+    stamps = get_file_stamps([get_user_requirements_checklist_file(), get_oq_checklist_file()])
+
+    with g_traceability_lock:
+        if g_traceability is None or g_traceability['stamps'] != stamps:
+            g_traceability = {'stamps': stamps, 'traceability': join_traceability()}
+
+        return g_traceability['traceability']
+
+
+def join_traceability():
+    """Join the 'Test ID' of each User Requirements checklist row to the 'Test Number' of the OQ checklist rows.
+    The test procedures are indexed by test number once so that the join takes one pass over each checklist; the tests
+    that no requirement refers to are known once the pass over the requirements has collected the linked tests.
+    Unless streaming, the links and orphan tests are kept for the matrix and the report.  When streaming, only the
+    index and the linked tests are kept and the rows are generated again from another pass over the checklists
+    whenever they are needed, so that the join does not grow with the matrix.
+    :return traceability: {dict} the 'tests' procedures keyed by test number, the 'linked_test_ids', and the 'links' and
+    'orphan_tests' (None when streaming, see get_traceability_links() and get_orphan_tests())
+    """
+    tests = {}
+    for test in iter_oq_checklist_records(1):
+        tests.setdefault(test['id_rep1'], test['test_procedure_rep1'])
+
+    links = None if g_streaming else []
+    linked_test_ids = set()
+
+    for link in iter_traceability_links(tests):
+        if link[5] == 'Covered':
+            linked_test_ids.add(link[3])
+        if links is not None:
+            links.append(link)
+
+    traceability = {'tests': tests, 'linked_test_ids': linked_test_ids, 'links': links, 'orphan_tests': None}
+    if not g_streaming:
+        traceability['orphan_tests'] = list(iter_orphan_tests(linked_test_ids))
+
+    return traceability
+
+
+def iter_traceability_links(tests):
+    """Look up the tests of every requirement in one pass over the User Requirements checklist
+    :param tests: {dict} the test procedures keyed by test number
+    :return links: {generator} the values of the TRACEABILITY_MATRIX_FIELDS of every requirement and test in requirement
+    order, where the status is 'Covered', 'No test' or 'Unknown test'
+    """
+    for requirement in iter_user_requirements_table_records():
+        test_ids = [test_id for test_id in TEST_ID_SEPARATORS.split(requirement['test_id']) if test_id != '']
+        if len(test_ids) == 0:
+            yield (requirement['id'], requirement['req'], requirement['criticality'], '', '', 'No test')
+            continue
+
+        for test_id in test_ids:
+            test_procedure = tests.get(test_id)
+            if test_procedure is None:
+                yield (requirement['id'], requirement['req'], requirement['criticality'], test_id, '', 'Unknown test')
+            else:
+                yield (requirement['id'], requirement['req'], requirement['criticality'], test_id, test_procedure, 'Covered')
+
+
+def get_traceability_links(traceability):
+    """Retrieve the links of the traceability, generating them again when streaming
+    :param traceability: {dict} the traceability from get_traceability()
+    :return links: {iterable} see iter_traceability_links()
+    """
+    if traceability['links'] is None:
+        return iter_traceability_links(traceability['tests'])
+
+    return traceability['links']
+
+
+def iter_orphan_tests(linked_test_ids):
+    """Find the OQ tests that no requirement refers to in one pass over the OQ checklist
+    :param linked_test_ids: {set} the test numbers referred to by a requirement
+    :return orphan_tests: {generator} the values of the ORPHAN_TEST_FIELDS of the first row of every orphan test
+    """
+    orphan_test_ids = set()
+
+    for test in iter_oq_checklist_records(1):
+        if test['id_rep1'] not in linked_test_ids and test['id_rep1'] not in orphan_test_ids:
+            orphan_test_ids.add(test['id_rep1'])
+            yield test['id_rep1'], test['test_procedure_rep1'], test['expected_finding_rep1']
+
+
+def get_orphan_tests(traceability):
+    """Retrieve the orphan tests of the traceability, finding them again when streaming
+    :param traceability: {dict} the traceability from get_traceability()
+    :return orphan_tests: {iterable} see iter_orphan_tests()
+    """
+    if traceability['orphan_tests'] is None:
+        return iter_orphan_tests(traceability['linked_test_ids'])
+
+    return traceability['orphan_tests']
+
+
+def iter_traceability_matrix_records(traceability):
+    """Generate the traceability matrix records, one per requirement and test
+    :param traceability: {dict} the traceability from get_traceability()
+    :return table_records: {generator} of dictionaries
+    """
+    for link in get_traceability_links(traceability):
+        yield TableRecord(TRACEABILITY_MATRIX_FIELDS, link)
+
+
+def iter_orphan_test_records(traceability):
+    """Generate the records of the OQ tests that no requirement refers to
+    :param traceability: {dict} the traceability from get_traceability()
+    :return table_records: {generator} of dictionaries
+    """
+    for test in get_orphan_tests(traceability):
+        yield TableRecord(ORPHAN_TEST_FIELDS, test)
+
+
+def get_traceability_report_file():
+    """Derive the traceability gap report written next to the traceability matrix
+    :return outfile: {str}
+    """
+    return os.path.splitext(get_outfile('Traceability Matrix'))[0] + '.tsv'
+
+
+def write_traceability_report(outfile, traceability):
+    """Write the requirements without a test, the requirements referring to an unknown test and the
+    OQ tests without a requirement to a tab-delimited file
+    :param outfile: {str} the output file
+    :param traceability: {dict} the traceability from get_traceability()
+    :return problem_count: {int} the number of rows written
+    """
+    link_count = 0
+    problem_count = 0
+
+    with open(outfile, 'w', newline='') as output_file:
+        writer = csv.writer(output_file, delimiter='\t', lineterminator='\n')
+        writer.writerow(['Problem', 'Requirement ID', 'Requirement Description', 'Criticality', 'Test ID', 'Test Procedure'])
+
+        for requirement_id, requirement, criticality, test_id, test_procedure, status in get_traceability_links(traceability):
+            link_count += 1
+            if status == 'No test':
+                writer.writerow(['Requirement without test', requirement_id, requirement, criticality, '', ''])
+                problem_count += 1
+            elif status == 'Unknown test':
+                writer.writerow(['Unknown test', requirement_id, requirement, criticality, test_id, ''])
+                problem_count += 1
+
+        for test_id, test_procedure, expected_finding in get_orphan_tests(traceability):
+            writer.writerow(['Test without requirement', '', '', '', test_id, test_procedure])
+            problem_count += 1
+
+    print("Wrote traceability report '{}' with '{}' links and '{}' problems".format(outfile, link_count, problem_count))
+    logging.info("Wrote traceability report '{}' with '{}' links and '{}' problems".format(outfile, link_count, problem_count))
+
+    if problem_count > 0:
+        g_reminders.append("Review the '{}' traceability problems in '{}'".format(problem_count, outfile))
+
+    return problem_count
+
+
+def get_document_input_files(doc_type):
+    """Derive the tab-delimited input files that the validation document is merged from
+    :param doc_type: {str} document type
+    :return input_files: {list} the absolute paths of the input files
+    """
+    input_files = [INPUT_FILES[input_name]['get_file']() for input_name in get_document_inputs([doc_type])]
+
+    return [infile for infile in input_files if infile is not None]
+
+
+def get_document_merge_values(doc_type):
+    """Collect the values, other than the input files, that are merged into the validation document
+    :param doc_type: {str} document type
+    :return merge_values: {dict}
+    """
+    merge_values = {
+        'document_prepared_by': g_document_prepared_by,
+        'document_prepared_date': g_document_prepared_date,
+        'software_name': g_software_name,
+        'software_version': g_software_version,
+        'server': g_server
+    }
+
+    for input_name in get_document_inputs([doc_type]):
+        merge_values.update(INPUT_FILES[input_name]['merge_values']())
+
+    return merge_values
+
+
+def get_file_hash(infile):
+    """Compute the SHA-256 content hash of the file, reusing the hash while the file's
+    modification time and size are unchanged
+    :param infile: {str} the file
+    :return file_hash: {str} the hexadecimal digest
+    """
+    stat = os.stat(infile)
+    key = (infile, stat.st_mtime_ns, stat.st_size)
+
+    if key not in g_file_hash_cache:
+        sha256 = hashlib.sha256()
+        with open(infile, 'rb') as fh:
+            for chunk in iter(lambda: fh.read(1024 * 1024), b''):
+                sha256.update(chunk)
+        g_file_hash_cache[key] = sha256.hexdigest()
+
+    return g_file_hash_cache[key]
+
+
+def get_document_fingerprint(doc_type):
+    """Fingerprint everything the validation document is generated from.  Files are recorded by their
+    real path, so that the same build run with relative and absolute directories matches its manifest.
+    :param doc_type: {str} document type
+    :return fingerprint: {dict} the content hashes of the template and input files and the merge field values
+    """
+    template_file = os.path.realpath(get_template_file(doc_type))
+
+    return {
+        'version': BUILD_MANIFEST_VERSION,
+        'outfile': os.path.realpath(get_outfile(doc_type)),
+        'template': {template_file: get_file_hash(template_file)},
+        'inputs': {os.path.realpath(infile): get_file_hash(infile) for infile in get_document_input_files(doc_type)},
+        'merge_values': get_document_merge_values(doc_type)
+    }
+
+
+def get_build_manifest_file(doc_type):
+    """Derive the build manifest file of the validation document in the output directory
+    :param doc_type: {str} document type
+    :return manifest_file: {str}
+    """
+    return os.path.join(g_outdir, '.build', doc_type + '.json')
+
+
+def get_rebuild_reasons(doc_type, fingerprint):
+    """Compare the fingerprint of the validation document with its build manifest
+    :param doc_type: {str} document type
+    :param fingerprint: {dict} the current fingerprint of the document
+    :return reasons: {list} why the document must be regenerated; empty when it is up to date
+    """
+    manifest_file = get_build_manifest_file(doc_type)
+    if not os.path.exists(manifest_file):
+        return ["no build manifest '{}'".format(manifest_file)]
+
+    with open(manifest_file) as fh:
+        manifest = json.load(fh)
+
+    outfile = fingerprint['outfile']
+    if not os.path.exists(outfile):
+        return ["output file '{}' does not exist".format(outfile)]
+
+    if manifest.get('version') != fingerprint['version'] or manifest.get('outfile') != outfile:
+        return ["build manifest '{}' is for a different build".format(manifest_file)]
+
+    if manifest.get('outfile_hash') != get_file_hash(outfile):
+        return ["output file '{}' was modified".format(outfile)]
+
+    reasons = []
+
+    for section, label in (('template', 'template file'), ('inputs', 'input file')):
+        for infile, file_hash in fingerprint[section].items():
+            if infile not in manifest.get(section, {}):
+                reasons.append("new {} '{}'".format(label, infile))
+            elif manifest[section][infile] != file_hash:
+                reasons.append("changed {} '{}'".format(label, infile))
+        for infile in manifest.get(section, {}):
+            if infile not in fingerprint[section]:
+                reasons.append("{} '{}' is no longer used".format(label, infile))
+
+    for field, value in fingerprint['merge_values'].items():
+        if manifest.get('merge_values', {}).get(field) != value:
+            reasons.append("changed merge field value '{}'".format(field))
+
+    return reasons
+
+
+def write_build_manifest(doc_type, fingerprint):
+    """Record the fingerprint of the freshly generated validation document in its build manifest
+    :param doc_type: {str} document type
+    :param fingerprint: {dict} the fingerprint the document was generated from
+    :return None:
+    """
+    manifest_file = get_build_manifest_file(doc_type)
+    pathlib.Path(os.path.dirname(manifest_file)).mkdir(parents=True, exist_ok=True)
+
+    manifest = dict(fingerprint)
+    manifest['outfile_hash'] = get_file_hash(fingerprint['outfile'])
+    manifest['built'] = datetime.today().strftime('%Y-%m-%d %H:%M:%S')
+
+    with open(manifest_file, 'w') as fh:
+        json.dump(manifest, fh, indent=2)
+
+    logging.info("Wrote build manifest '{}'".format(manifest_file))
+
+
+HEADER_MERGE_FIELDS = ['document_prepared_by', 'document_prepared_date', 'software_name', 'software_version', 'server']
+
+# the tab-delimited inputs: how to resolve each file, the headers its loader requires and
+# the values other than the file contents that its loader merges into the records
+INPUT_FILES = {
+    'IQ hardware checklist': {'get_file': lambda: get_iq_hardware_checklist_file('IQ'), 'required_headers': ['Description', 'Requirement'],
+                              'merge_values': lambda: {'iq_yes_no': g_iq_yes_no, 'iq_date': g_iq_date}},
+    'IQ software checklist': {'get_file': lambda: get_iq_software_checklist_file('IQ'), 'required_headers': ['Description', 'Requirement'],
+                              'merge_values': lambda: {'iq_yes_no': g_iq_yes_no, 'iq_date': g_iq_date}},
+    'OQ checklist': {'get_file': lambda: get_oq_checklist_file(), 'required_headers': ['Test Procedure', 'Expected Finding'],
+                     'merge_values': lambda: {'oq_yes_no': g_oq_yes_no, 'oq_date': g_oq_date}},
+    'OQ test data': {'get_file': lambda: get_oq_test_data_file(), 'required_headers': ['Name', 'Description'],
+                     'merge_values': lambda: {}},
+    'User Requirements checklist': {'get_file': lambda: get_user_requirements_checklist_file(), 'required_headers': ['Requirement Description', 'Criticality', 'Comment', 'Test ID'],
+                                    'merge_values': lambda: {}},
+    'version history': {'get_file': lambda: get_version_history_file(), 'required_headers': ['Version', 'Date', 'Comment'],
+                        'merge_values': lambda: {'version_history_comment': g_version_history_comment}}
+}
+
+# the merge fields of the table row identified by each anchor merge field
+TABLE_FIELDS = {
+    'h_id': IQ_HARDWARE_FIELDS,
+    's_id': IQ_SOFTWARE_FIELDS,
+    'id_rep1': OQ_CHECKLIST_FIELDS[1],
+    'id_rep2': OQ_CHECKLIST_FIELDS[2],
+    'test_data_name': OQ_TEST_DATA_FIELDS,
+    'vh_id': VERSION_HISTORY_FIELDS,
+    'id': USER_REQUIREMENTS_FIELDS,
+    'tm_req_id': TRACEABILITY_MATRIX_FIELDS,
+    'tm_orphan_test_id': ORPHAN_TEST_FIELDS
+}
+
+# the validation documents in the order they are rendered: the config file section with the template file basename,
+# the output file name pattern and the tables merged into the template, as (anchor merge field, input, record loader)
+# where the input is a tuple when the loader joins several inputs.  Optional documents are only generated when
+# the config file has their section.
+DOCUMENT_REGISTRY = {
+    'IQ': {
+        'template': 'IQ',
+        'outfile': '{software_name} {software_version} - IQ Checklist - {document_prepared_date}.docx',
+        'tables': [('h_id', 'IQ hardware checklist', lambda: iter_iq_hardware_table_records('IQ')),
+                   ('s_id', 'IQ software checklist', lambda: iter_iq_software_table_records('IQ'))]
+    },
+    'OQ': {
+        'template': 'OQ',
+        'outfile': '{software_name} {software_version} - OQ Validation Testing Worksheet - {document_prepared_date}.docx',
+        'tables': [('test_data_name', 'OQ test data', lambda: iter_oq_test_data_records()),
+                   ('id_rep1', 'OQ checklist', lambda: iter_oq_checklist_records(1)),
+                   ('id_rep2', 'OQ checklist', lambda: iter_oq_checklist_records(2))]
+    },
+    'PQ': {
+        'template': 'PQ',
+        'outfile': '{software_name} {software_version} - PQ Validation Testing Worksheet - {document_prepared_date}.docx',
+        'tables': [('test_data_name', 'OQ test data', lambda: iter_oq_test_data_records()),
+                   ('id_rep1', 'OQ checklist', lambda: iter_oq_checklist_records(1)),
+                   ('id_rep2', 'OQ checklist', lambda: iter_oq_checklist_records(2))]
+    },
+    'System Specification': {
+        'template': 'System Specification',
+        'outfile': '{software_name} {software_version} - System Specification - {document_prepared_date}.docx',
+        'tables': [('h_id', 'IQ hardware checklist', lambda: iter_iq_hardware_table_records('IQ')),
+                   ('s_id', 'IQ software checklist', lambda: iter_iq_software_table_records('IQ'))]
+    },
+    'Test Plan': {
+        'template': 'Test Plan',
+        'outfile': '{software_name} {software_version} - Test Plan - {document_prepared_date}.docx',
+        'tables': [('test_data_name', 'OQ test data', lambda: iter_oq_test_data_records()),
+                   ('id_rep1', 'OQ checklist', lambda: iter_oq_checklist_records(1)),
+                   ('h_id', 'IQ hardware checklist', lambda: iter_iq_hardware_table_records('IQ')),
+                   ('s_id', 'IQ software checklist', lambda: iter_iq_software_table_records('IQ')),
+                   ('vh_id', 'version history', lambda: get_version_history_records())]
+    },
+    'User Requirements': {
+        'template': 'User Requirements',
+        'outfile': '{software_name} {software_version} - User Requirements - {document_prepared_date}.docx',
+        'tables': [('id', 'User Requirements checklist', lambda: iter_user_requirements_table_records())]
+    },
+    'Validation Report': {
+        'template': 'Validation Report',
+        'outfile': '{software_name} {software_version} - Validation Report - {document_prepared_date}.docx',
+        'tables': [('id', 'User Requirements checklist', lambda: iter_user_requirements_table_records()),
+                   ('vh_id', 'version history', lambda: get_version_history_records())]
+    },
+    'Traceability Matrix': {
+        'template': 'Traceability Matrix',
+        'outfile': '{software_name} {software_version} - Traceability Matrix - {document_prepared_date}.docx',
+        'tables': [('tm_req_id', ('User Requirements checklist', 'OQ checklist'), lambda: iter_traceability_matrix_records(get_traceability())),
+                   ('tm_orphan_test_id', ('User Requirements checklist', 'OQ checklist'), lambda: iter_orphan_test_records(get_traceability()))],
+        'optional': True
+    }
+}
+
+
+def get_table_inputs(table_inputs):
+    """Normalize the input of a registry table
+    :param table_inputs: {str|tuple} the input, or the inputs joined by the table's loader
+    :return input_names: {tuple}
+    """
+    return table_inputs if isinstance(table_inputs, tuple) else (table_inputs,)
+
+
+def get_release_doc_types(doc_types=None):
+    """Drop the optional validation documents that the config file has no section for
+    :param doc_types: {list} the selected document types, default all
+    :return doc_types: {list} the document types to generate for the release
+    """
+    if doc_types is None:
+        doc_types = list(DOCUMENT_REGISTRY)
+
+    return [doc_type for doc_type in doc_types if not DOCUMENT_REGISTRY[doc_type].get('optional', False) or DOCUMENT_REGISTRY[doc_type]['template'] in g_config]
+
+
+def get_document_tables(doc_type):
+    """Select the tables of the registry entry whose anchor merge field is in the document's template, so that
+    the records of tables the template does not contain are never loaded.  When the template cannot be
+    read every table is returned; the render plan reports the template as an error.
+    :param doc_type: {str} the document type
+    :return tables: {list} the (anchor merge field, input, record loader) of the tables in the template
+    """
+    tables = DOCUMENT_REGISTRY[doc_type]['tables']
+
+    try:
+        merge_fields = get_template_merge_fields(get_template_file(doc_type))
+    except Exception:
+        return tables
+
+    return [table for table in tables if table[0] in merge_fields]
+
+
+def get_document_inputs(doc_types=None):
+    """Collect the tab-delimited inputs that the tables in the templates of the validation documents are merged from
+    :param doc_types: {list} the document types, default all of the release
+    :return input_names: {list} the names of the inputs in INPUT_FILES, each listed once
+    """
+    if doc_types is None:
+        doc_types = get_release_doc_types()
+
+    return list(dict.fromkeys([input_name for doc_type in doc_types for anchor, table_inputs, load_records in get_document_tables(doc_type)
+                               for input_name in get_table_inputs(table_inputs)]))
+
+
+def get_selected_doc_types(only=(), skip=()):
+    """Select the validation documents to render from the --only and --skip options
+    :param only: {iterable} the only document types to render, default all
+    :param skip: {iterable} the document types not to render
+    :return doc_types: {list} the selected document types in rendering order
+    """
+    only = [doc_type.lower() for doc_type in only]
+    skip = [doc_type.lower() for doc_type in skip]
+
+    return [doc_type for doc_type in DOCUMENT_REGISTRY if (len(only) == 0 or doc_type.lower() in only) and doc_type.lower() not in skip]
+
+
+def prepare_document(doc_type):
+    """Prepare a validation document from its registry entry: merge the records of every table into the template and write the document
+    :param doc_type: {str} the document type
+    :return None:
+    """
+    template_file = get_template_file(doc_type)
+
+    document = instantiate_mailmerge(template_file)
+
+    outfile = get_outfile(doc_type)
+
+    for anchor, input_name, load_records in get_document_tables(doc_type):
+        merge_table_rows(document, anchor, load_records())
+
+    write_document(document, outfile)
+
+    print("Wrote '{}' validation document  '{}'".format(doc_type, outfile))
+
+
+def check_input_files(input_names=None):
+    """Resolve the tab-delimited inputs and check that each has the headers its loader requires
+    :param input_names: {list} the inputs to check, default all of INPUT_FILES
+    :return input_files, problems: {tuple} the resolved file keyed by input (None when an optional input is not configured) and the problems found
+    """
+    if input_names is None:
+        input_names = list(INPUT_FILES)
+
+    input_files = {}
+    problems = []
+
+    for input_name in input_names:
+        try:
+            infile = INPUT_FILES[input_name]['get_file']()
+        except Exception as e:
+            problems.append("{}: {}".format(input_name, e))
+            continue
+
+        input_files[input_name] = infile
+        if infile is None:
+            continue
+
+        header_to_position_lookup = read_tsv_header(infile)
+        missing_headers = [header for header in INPUT_FILES[input_name]['required_headers'] if header not in header_to_position_lookup]
+        if len(missing_headers) > 0:
+            problems.append("{}: file '{}' is missing the required columns: {}".format(input_name, infile, ', '.join(missing_headers)))
+
+    return input_files, problems
+
+
+def get_render_plan(doc_types):
+    """Resolve the template, inputs and output file of every validation document and check them before
+    anything is rendered.  Missing settings, files and required columns are errors; template merge
+    fields that do not match the data supplied for the document are warnings, since they only leave
+    fields empty or columns unmerged.
+    :param doc_types: {list} the document types that will be rendered
+    :return plan, errors, warnings: {tuple} a plan entry per document and the problems found
+    """
+    document_inputs = {doc_type: get_document_inputs([doc_type]) for doc_type in doc_types}
+
+    input_files, errors = check_input_files(list(dict.fromkeys(itertools.chain.from_iterable(document_inputs.values()))))
+    warnings = []
+    plan = []
+
+    if g_pdf_workers > 0 and get_libreoffice_executable() is None and not has_warm_pdf_converter():
+        errors.append("LibreOffice was not found; set 'libreoffice executable' in the configuration file or install soffice to use --pdf")
+
+    for doc_type in doc_types:
+        entry = {'doc_type': doc_type, 'template_file': None, 'outfile': get_outfile(doc_type),
+                 'inputs': [(input_name, input_files.get(input_name)) for input_name in document_inputs[doc_type]]}
+        plan.append(entry)
+
+        try:
+            entry['template_file'] = get_template_file(doc_type)
+            merge_fields = get_template_merge_fields(entry['template_file'])
+        except Exception as e:
+            errors.append("'{}' template: {}".format(doc_type, e))
+            continue
+
+        supplied_fields = set(HEADER_MERGE_FIELDS)
+        for anchor, table_inputs, load_records in DOCUMENT_REGISTRY[doc_type]['tables']:
+            input_name = ' and '.join(get_table_inputs(table_inputs))
+            table_fields = TABLE_FIELDS[anchor]
+            supplied_fields.update(table_fields)
+            if anchor not in merge_fields:
+                warnings.append("'{}' template '{}' has no table row with the merge field '{}' so the {} will not be loaded or merged".format(doc_type, entry['template_file'], anchor, input_name))
+                continue
+            missing_fields = [field for field in table_fields if field not in merge_fields]
+            if len(missing_fields) > 0:
+                warnings.append("'{}' template '{}' lacks the {} merge fields: {}".format(doc_type, entry['template_file'], input_name, ', '.join(missing_fields)))
+
+        unsupplied_fields = sorted(merge_fields - supplied_fields)
+        if len(unsupplied_fields) > 0:
+            warnings.append("'{}' template '{}' has merge fields that no input supplies, so they will be left empty: {}".format(doc_type, entry['template_file'], ', '.join(unsupplied_fields)))
+
+    return plan, errors, warnings
+
+
+def display_render_problems(errors, warnings):
+    """Print the problems found by the pre-flight checks to the STDOUT and log file
+    :param errors: {list} the problems that prevent rendering
+    :param warnings: {list} the problems that do not prevent rendering
+    :return None:
+    """
+    for warning in warnings:
+        logging.warning(warning)
+        print(Fore.YELLOW + "WARNING: {}".format(warning))
+        print(Style.RESET_ALL + '', end='')
+
+    for error in errors:
+        logging.error(error)
+        print(Fore.RED + "ERROR: {}".format(error))
+        print(Style.RESET_ALL + '', end='')
+
+
+def display_render_plan(plan, errors, warnings):
+    """Print the render plan and every problem found to the STDOUT and log file
+    :param plan: {list} the plan entry per document
+    :param errors: {list} the problems that prevent rendering
+    :param warnings: {list} the problems that do not prevent rendering
+    :return None:
+    """
+    print("\nRender plan:")
+    for entry in plan:
+        template = "'{}'".format(entry['template_file']) if entry['template_file'] is not None else 'no template'
+        print("{}: {} -> '{}'".format(entry['doc_type'], template, entry['outfile']))
+        for input_name, infile in entry['inputs']:
+            print("    {}: {}".format(input_name, "'{}'".format(infile) if infile is not None else 'not configured'))
+
+    display_render_problems(errors, warnings)
+
+    print("\nFound '{}' errors and '{}' warnings".format(len(errors), len(warnings)))
+
+
+def check_render_plan(doc_types):
+    """Run the pre-flight checks of the render plan, reporting every problem at once, so that a
+    misconfigured document fails the run before any prompts are asked or documents rendered
+    :param doc_types: {list} the document types that will be rendered
+    :return None:
+    """
+    plan, errors, warnings = get_render_plan(doc_types)
+
+    display_render_problems(errors, warnings)
+
+    if len(errors) > 0:
+        raise Exception("Found '{}' errors before rendering so no validation documents were rendered".format(len(errors)))
+
+
+class DocumentLogFilter(logging.Filter):
+    """Tag every log record with the validation document being rendered by the current thread or process"""
+
+    def filter(self, record):
+        record.doc_type = getattr(g_log_context, 'doc_type', 'main')
+        return True
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Format every log record as one JSON object per line.  Record dumps are emitted as a
+    'records' array (bounded like the text output) with the total 'record_count'."""
+
+    def format(self, record):
+        args = record.args if isinstance(record.args, tuple) else ()
+        dumps = [arg for arg in args if isinstance(arg, RecordDump)]
+
+        if len(dumps) > 0:
+            message = record.msg % tuple(["<'{}' records>".format(len(arg)) if isinstance(arg, RecordDump) else arg for arg in args])
+        else:
+            message = record.getMessage()
+
+        line = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'document': getattr(record, 'doc_type', 'main'),
+            'pathname': record.pathname,
+            'lineno': record.lineno,
+            'message': message
+        }
+
+        if len(dumps) > 0:
+            line['record_count'] = sum([len(dump) for dump in dumps])
+            line['records'] = [shown for dump in dumps for shown in dump.to_json()]
+
+        if record.exc_info:
+            line['exception'] = self.formatException(record.exc_info)
+
+        return json.dumps(line, default=str)
+
+
+def preload_shared_records(doc_types=None):
+    """Load the records that are shared by several validation documents before any rendering starts.
+    The version history prompts must be answered before the documents are handed to the worker pool.
+    Unless streaming, the tab-delimited inputs are read into the input record store so that forked
+    workers inherit them.  Only the inputs of the documents that will be rendered are loaded.
+    :param doc_types: {list} the document types that will be rendered, default all of the release
+    :return None:
+    """
+    input_names = get_document_inputs(doc_types)
+
+    # import the changed inputs before any worker reads from the input store
+    store_file = get_input_store_file()
+    if store_file is not None:
+        import_input_files(store_file, input_names)
+
+    if 'version history' in input_names:
+        get_version_history_records()
+
+    # joined once here so that the matrix, its orphan tests and the report share the join
+    if doc_types is not None and 'Traceability Matrix' in doc_types:
+        get_traceability()
+
+    if g_streaming:
+        return
+
+    for input_name in input_names:
+        infile = INPUT_FILES[input_name]['get_file']()
+        if infile is not None:
+            read_tsv_file(infile)
+
+
+def render_document(doc_type):
+    """Render a single validation document, attributing all log lines and timing spans to that document.
+    When profiling in a worker process the document is profiled separately so that the main process can merge the dumps.
+    :param doc_type: {str} the document type
+    :return doc_type, store_stats, spans, profile_file: {tuple} the document type that was rendered, the input record store hits and misses it incurred,
+    the timing spans it recorded and the worker's profile dump (None unless profiling in a worker process)
+    """
+    import cProfile
+    import multiprocessing
+
+    hits = g_input_record_store_stats['hits']
+    misses = g_input_record_store_stats['misses']
+    span_count = len(g_timing_spans)
+
+    profiler = None
+    profile_file = None
+    if g_profile and multiprocessing.parent_process() is not None:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    g_log_context.doc_type = doc_type
+    try:
+        with timed_phase('render'):
+            prepare_document(doc_type)
+    finally:
+        g_log_context.doc_type = 'main'
+        if profiler is not None:
+            profiler.disable()
+            profile_dir = os.path.join(g_outdir, '.profile')
+            pathlib.Path(profile_dir).mkdir(parents=True, exist_ok=True)
+            profile_file = os.path.join(profile_dir, '{}.{}.prof'.format(doc_type.replace(' ', '_'), os.getpid()))
+            profiler.dump_stats(profile_file)
+
+    spans = [span for span in g_timing_spans[span_count:] if span['doc_type'] == doc_type]
+
+    return doc_type, {'hits': g_input_record_store_stats['hits'] - hits, 'misses': g_input_record_store_stats['misses'] - misses}, spans, profile_file
+
+
+class PdfConverterPool:
+    """A small pool of headless LibreOffice converters that turn the rendered .docx files into PDFs
+    next to them while the remaining documents are still being rendered.
+
+    When unoserver is installed, every slot of the pool is a warm unoserver daemon (with its own
+    ports and LibreOffice profile) and files are converted through unoconvert, so LibreOffice starts
+    once per slot instead of once per file.  Otherwise every conversion runs soffice --convert-to
+    with the slot's own profile, which lets the slots convert concurrently.
+    """
+
+    def __init__(self, size, workdir):
+        """
+        :param size: {int} the number of converters
+        :param workdir: {str} the directory for the LibreOffice profiles of the converters
+        """
+        import queue
+
+        self.size = size
+        self.workdir = workdir
+        self.slots = queue.Queue()
+        self.daemons = []
+        self.executor = None
+        self.futures = []
+        self.soffice = get_libreoffice_executable()
+        self.warm = has_warm_pdf_converter()
+
+    def start(self):
+        """Start the warm converters, if available.  They boot while the documents are rendered.
+        :return None:
+        """
+        import subprocess
+
+        if not self.warm and self.soffice is None:
+            raise Exception("LibreOffice was not found; set 'libreoffice executable' in the configuration file or install soffice to use --pdf")
+
+        for slot_ctr in range(self.size):
+            profile_dir = os.path.join(self.workdir, 'libreoffice-profile-{}'.format(slot_ctr))
+            slot = {'profile_url': pathlib.Path(profile_dir).absolute().as_uri(), 'port': None}
+            if self.warm:
+                slot['port'] = PDF_CONVERTER_BASE_PORT + 2 * slot_ctr
+                cmd = ['unoserver', '--interface', '127.0.0.1', '--port', str(slot['port']), '--uno-port', str(slot['port'] + 1),
+                       '--user-installation', slot['profile_url']]
+                if self.soffice is not None:
+                    cmd += ['--executable', self.soffice]
+                logging.info("Starting PDF converter '{}'".format(' '.join(cmd)))
+                self.daemons.append(subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+            self.slots.put(slot)
+
+        logging.info("Started '{}' {} PDF converters".format(self.size, 'warm' if self.warm else 'cold-start'))
+
+    def submit(self, docx_file):
+        """Queue the conversion of the .docx file to a PDF next to it
+        :param docx_file: {str} the .docx file
+        :return None:
+        """
+        import concurrent.futures
+
+        if self.executor is None:
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.size)
+        self.futures.append((docx_file, self.executor.submit(self.convert, docx_file)))
+
+    def convert(self, docx_file):
+        """Convert the .docx file using the next free converter
+        :param docx_file: {str} the .docx file
+        :return pdf_file: {str} the PDF file
+        """
+        import subprocess
+
+        pdf_file = os.path.splitext(docx_file)[0] + '.pdf'
+
+        slot = self.slots.get()
+        try:
+            if self.warm:
+                wait_for_port(slot['port'], PDF_CONVERTER_STARTUP_TIMEOUT)
+                cmd = ['unoconvert', '--host', '127.0.0.1', '--port', str(slot['port']), '--convert-to', 'pdf', docx_file, pdf_file]
+            else:
+                cmd = [self.soffice, '--headless', '--norestore', '-env:UserInstallation=' + slot['profile_url'],
+                       '--convert-to', 'pdf', '--outdir', os.path.dirname(os.path.abspath(docx_file)), docx_file]
+            logging.info("About to execute '{}'".format(' '.join(cmd)))
+            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, timeout=PDF_CONVERSION_TIMEOUT)
+        finally:
+            self.slots.put(slot)
+
+        if result.returncode != 0 or not os.path.exists(pdf_file):
+            raise Exception("Could not convert '{}' to PDF (exit status {}): {}".format(docx_file, result.returncode, result.stderr.strip()))
+
+        return pdf_file
+
+    def close(self):
+        """Wait for the queued conversions, stop the converters and report the outcome
+        :return None:
+        """
+        failures = []
+        try:
+            for docx_file, future in self.futures:
+                try:
+                    pdf_file = future.result()
+                    logging.info("Wrote PDF '{}'".format(pdf_file))
+                    print("Wrote PDF '{}'".format(pdf_file))
+                except Exception as e:
+                    logging.error(str(e))
+                    print(Fore.RED + str(e))
+                    print(Style.RESET_ALL + '', end='')
+                    failures.append(docx_file)
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
+            for daemon in self.daemons:
+                daemon.terminate()
+            for daemon in self.daemons:
+                daemon.wait()
+
+        if len(failures) > 0:
+            raise Exception("Could not convert '{}' of '{}' validation documents to PDF".format(len(failures), len(self.futures)))
+
+
+def get_libreoffice_executable():
+    """Locate LibreOffice: 'libreoffice executable' in the configuration file, else soffice or libreoffice on the PATH
+    :return executable: {str} or None when it was not found
+    """
+    return g_config.get('libreoffice executable') or shutil.which('soffice') or shutil.which('libreoffice')
+
+
+def has_warm_pdf_converter():
+    """Check whether unoserver and unoconvert are installed so that warm converters can be used
+    :return available: {bool}
+    """
+    return shutil.which('unoserver') is not None and shutil.which('unoconvert') is not None
+
+
+def wait_for_port(port, timeout):
+    """Wait until a local server accepts connections on the port
+    :param port: {int} the port
+    :param timeout: {float} the seconds to wait
+    :return None:
+    """
+    import socket
+
+    deadline = time.time() + timeout
+    while True:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            if time.time() > deadline:
+                raise Exception("The PDF converter on port '{}' did not start within {} seconds".format(port, timeout))
+            time.sleep(0.2)
+
+
+def get_document_executor(jobs):
+    """Instantiate the pool that will render the validation documents concurrently.
+    Worker processes are forked so that they inherit the configuration and the preloaded records;
+    on platforms without fork a thread pool is used instead.
+    :param jobs: {int} the number of workers
+    :return executor: {concurrent.futures.Executor}
+    """
+    import concurrent.futures
+    import multiprocessing
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return concurrent.futures.ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context('fork'))
+
+    logging.info("fork is not available on this platform so will render the documents in a thread pool")
+    return concurrent.futures.ThreadPoolExecutor(max_workers=jobs)
+
+
+def get_release_state():
+    """Capture the module globals that a long-lived document worker needs to render a document of the current release
+    :return state: {dict} the values of RELEASE_STATE_GLOBALS
+    """
+    return {name: globals()[name] for name in RELEASE_STATE_GLOBALS}
+
+
+def render_release_document(state, doc_type, capture_output=False):
+    """Render a single validation document in a long-lived worker, after taking on the state of the release
+    :param state: {dict} the release state from get_release_state()
+    :param doc_type: {str} the document type
+    :param capture_output: {bool} return what the worker printed instead of printing it to its own stdout;
+    only for worker processes, since redirecting the stdout of a worker thread would redirect that of the whole process
+    :return doc_type, store_stats, spans, profile_file, output: {tuple} see render_document(), and the printed output or None
+    """
+    globals().update(state)
+
+    if not capture_output:
+        return render_document(doc_type) + (None,)
+
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        return render_document(doc_type) + (output.getvalue(),)
+
+
+def render_documents(jobs=1, incremental=False, doc_types=None):
+    """Render the validation documents either serially or in a pool of workers.
+    With --pdf, every document is converted to PDF as soon as it has been rendered.
+    :param jobs: {int} the number of documents to render concurrently, default 1
+    :param incremental: {bool} only render the documents whose template, inputs or merge field values changed since the last build
+    :param doc_types: {list} the document types to render, default all of the release
+    :return None:
+    """
+    documents = []
+    fingerprints = {}
+    pdf_files = []
+
+    if doc_types is None:
+        doc_types = get_release_doc_types()
+
+    for doc_type in DOCUMENT_REGISTRY:
+        if doc_type not in doc_types:
+            continue
+        fingerprint = get_document_fingerprint(doc_type)
+        if incremental:
+            reasons = get_rebuild_reasons(doc_type, fingerprint)
+            if len(reasons) == 0:
+                print("Skipped '{}' validation document because its template, inputs and merge field values are unchanged".format(doc_type))
+                logging.info("Skipped '{}' validation document because its template, inputs and merge field values are unchanged".format(doc_type))
+                outfile = get_outfile(doc_type)
+                if g_pdf_workers > 0 and not os.path.exists(os.path.splitext(outfile)[0] + '.pdf'):
+                    pdf_files.append(outfile)
+                continue
+            logging.info("Will regenerate '{}' validation document because: {}".format(doc_type, '; '.join(reasons)))
+            print("Will regenerate '{}' validation document because: {}".format(doc_type, '; '.join(reasons)))
+        fingerprints[doc_type] = fingerprint
+        documents.append(doc_type)
+
+    if g_pdf_workers == 0:
+        render_document_files(documents, fingerprints, jobs)
+        return
+
+    pdf_pool = PdfConverterPool(min(g_pdf_workers, max(1, len(documents) + len(pdf_files))), os.path.join(g_outdir, '.pdf'))
+    pdf_pool.start()
+    try:
+        for outfile in pdf_files:
+            pdf_pool.submit(outfile)
+        render_document_files(documents, fingerprints, jobs, pdf_pool)
+    finally:
+        pdf_pool.close()
+
+
+def render_document_files(documents, fingerprints, jobs, pdf_pool=None):
+    """Render the validation documents either serially or in a pool of workers and record their build manifests
+    :param documents: {list} the document types to render
+    :param fingerprints: {dict} the build fingerprint of every document keyed by document type
+    :param jobs: {int} the number of documents to render concurrently
+    :param pdf_pool: {PdfConverterPool} the converters to hand every rendered document to, default None
+    :return None:
+    """
+    if jobs <= 1:
+        for doc_type in documents:
+            render_document(doc_type)
+            write_build_manifest(doc_type, fingerprints[doc_type])
+            if pdf_pool is not None:
+                pdf_pool.submit(get_outfile(doc_type))
+        return
+
+    logging.info("Will render '{}' validation documents with '{}' jobs".format(len(documents), jobs))
+
+    if g_document_executor is not None:
+        import concurrent.futures
+
+        state = get_release_state()
+        capture_output = isinstance(g_document_executor, concurrent.futures.ProcessPoolExecutor)
+        futures = [g_document_executor.submit(render_release_document, state, doc_type, capture_output) for doc_type in documents]
+        collect_rendered_documents(g_document_executor, futures, fingerprints, pdf_pool)
+        return
+
+    with get_document_executor(jobs) as executor:
+        futures = [executor.submit(render_document, doc_type) for doc_type in documents]
+        collect_rendered_documents(executor, futures, fingerprints, pdf_pool)
+
+
+def collect_rendered_documents(executor, futures, fingerprints, pdf_pool=None):
+    """Record the build manifest, timing spans and input record store statistics of every document
+    as soon as its worker has rendered it
+    :param executor: {concurrent.futures.Executor} the pool the documents were submitted to
+    :param futures: {list} the futures of the render_document() or render_release_document() calls
+    :param fingerprints: {dict} the build fingerprint of every document keyed by document type
+    :param pdf_pool: {PdfConverterPool} the converters to hand every rendered document to, default None
+    :return None:
+    """
+    import concurrent.futures
+
+    for future in concurrent.futures.as_completed(futures):
+        doc_type, store_stats, spans, profile_file, *output = future.result()
+        # the output captured by a long-lived worker process is printed here, e.g. into the response of the render service
+        if len(output) > 0 and output[0] is not None:
+            print(output[0], end='')
+        logging.info("Finished rendering '{}' validation document".format(doc_type))
+        write_build_manifest(doc_type, fingerprints[doc_type])
+        if pdf_pool is not None:
+            pdf_pool.submit(get_outfile(doc_type))
+        if isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+            g_input_record_store_stats['hits'] += store_stats['hits']
+            g_input_record_store_stats['misses'] += store_stats['misses']
+            g_timing_spans.extend(spans)
+        if profile_file is not None:
+            g_worker_profile_files.append(profile_file)
+
+
+def configure_logging(logfile, log_level=LOG_LEVEL, log_json=False, log_max_records=LOG_MAX_RECORDS):
+    """Configure logging to the log file, tagging every line with the document being rendered
+    :param logfile: {str} the log file
+    :param log_level: {int|str} the minimum level to log; record dumps are only logged at DEBUG
+    :param log_json: {bool} write JSON lines instead of text lines
+    :param log_max_records: {int} the maximum number of records shown per record dump, 0 for no limit
+    :return None:
+    """
+    global g_log_max_records
+
+    g_log_max_records = log_max_records
+
+    logging.basicConfig(filename=logfile, format=LOGGING_FORMAT, level=log_level)
+
+    for handler in logging.getLogger().handlers:
+        handler.addFilter(DocumentLogFilter())
+        if log_json:
+            handler.setFormatter(JsonLinesFormatter())
+
+
+def load_config(config_file):
+    """Load the project configuration file.  The parsed configuration is kept per path and only
+    reloaded when the modification time or size of the file changes.
+    :param config_file: {str} the configuration file
+    :return None:
+    """
+    logging.info("Loading configuration from '{}'".format(config_file))
+
+    global g_config
+    global g_config_file
+    global g_config_dir
+
+    config_file = os.path.abspath(config_file)
+    stat = os.stat(config_file)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+
+    entry = g_config_cache.get(config_file)
+    if entry is None or entry['stamp'] != stamp:
+        entry = {'stamp': stamp, 'config': json.loads(open(config_file).read())}
+        g_config_cache[config_file] = entry
+
+    g_config = entry['config']
+    g_config_file = config_file
+    g_config_dir = os.path.dirname(config_file)
+
+
+def resolve_release(config_file, outdir, template_files_dir, software_name, software_version, server, document_prepared_by, document_prepared_date):
+    """Derive the values that were not specified from the configuration file (or the answers) and
+    set them as the current release, resetting the state left behind by any previous release
+    :param config_file: {str} the configuration file
+    :param outdir: {str} the output directory
+    :param template_files_dir: {str} the directory containing the template files, if specified
+    :param software_name: {str} the name of the software system, if specified
+    :param software_version: {str} the version of the software system, if specified
+    :param server: {str} the server, if specified
+    :param document_prepared_by: {str} the name of the person that prepared the documents, if specified
+    :param document_prepared_date: {str} the date the documents were prepared
+    :return None:
+    """
+    if document_prepared_by is None:
+        if 'default document prepared by' in g_config:
+            document_prepared_by = g_config['default document prepared by']
+            print(Fore.YELLOW + "--document_prepared_by was not specified and therefore was set to '{}'".format(document_prepared_by))
+            print(Style.RESET_ALL + '', end='')
+        else:
+            document_prepared_by = ask('document_prepared_by', "What is the first and last name of the person that will prepare the documents? ")
+
+    if template_files_dir is None:
+        if 'template_files_dir' in g_config:
+            template_files_dir = g_config['template_files_dir']
+            print(Fore.YELLOW + "--template_files_dir was not specified and therefore was set to '{}'".format(template_files_dir))
+            print(Style.RESET_ALL + '', end='')
+        else:
+            template_files_dir = os.path.dirname(os.path.abspath(config_file)) + '/template_files_dir'
+            if os.path.exists(template_files_dir):
+                print(Fore.YELLOW + "--template_files_dir was not specified and therefore was set to '{}'".format(template_files_dir))
+                print(Style.RESET_ALL + '', end='')
+            else:
+                raise Exception("'template_files_dir' does not exist in the configuration file '{}' and was not found here '{}'".format(config_file, template_files_dir))
+
+    if not os.path.exists(template_files_dir):
+        raise Exception("template_files_dir '{}' does not exist".format(template_files_dir))
+
+    if software_name is None:
+        if 'software_name' in g_config:
+            software_name = g_config['software_name']
+        else:
+            software_name = ask('software_name', "What is the software name? ")
+
+    if software_version is None:
+        if 'software_version' in g_config:
+            software_version = g_config['software_version']
+        else:
+            software_version = ask('software_version', "What is the software version? ")
+
+    if server is None:
+        if 'server' in g_config:
+            server = g_config['server']
+        else:
+            server = ask('server', "What is the server? ")
+
+    global g_software_name
+    global g_software_version
+    global g_document_prepared_by
+    global g_document_prepared_date
+    global g_template_files_dir
+    global g_outdir
+    global g_server
+    global g_version_history_comment
+    global g_version_history_records
+    global g_traceability
+    global g_reminders
+    global g_iq_yes_no
+    global g_iq_date
+    global g_oq_yes_no
+    global g_oq_date
+    global g_pq_yes_no
+    global g_pq_date
+
+    g_software_name = software_name
+    g_software_version = software_version
+    g_document_prepared_by = document_prepared_by
+    g_document_prepared_date = document_prepared_date
+    g_outdir = outdir
+    g_template_files_dir = template_files_dir
+    g_server = server
+
+    g_version_history_comment = None
+    g_version_history_records = None
+    g_traceability = None
+    g_reminders = list(DEFAULT_REMINDERS)
+    g_iq_yes_no = g_iq_date = g_oq_yes_no = g_oq_date = g_pq_yes_no = g_pq_date = None
+
+    with g_timing_spans_lock:
+        del g_timing_spans[:]
+
+
+def generate_release(jobs=1, incremental=False, doc_types=None):
+    """Generate the validation documents for the current release
+    :param jobs: {int} the number of documents to render concurrently, default 1
+    :param incremental: {bool} skip the documents that are unchanged since the last build in the output directory
+    :param doc_types: {list} the document types to generate, default all of the release
+    :return None:
+    """
+    if doc_types is None:
+        doc_types = get_release_doc_types()
+
+    check_render_plan(doc_types)
+
+    ask_executed_documents(doc_types)
+
+    preload_shared_records(doc_types)
+
+    render_documents(jobs, incremental, doc_types)
 
-    return infile
+    if 'Traceability Matrix' in doc_types:
+        write_traceability_report(get_traceability_report_file(), get_traceability())
 
+    ask_prepare_replicate_folders(doc_types)
 
-def get_user_requirements_table_records(doc_type='User Requirements'):
-    """Parse the User Requirements checklist tab-delimited file and build list of dictionaries
-    :param doc_type: {str} document type, default 'User Requirements'
-    :return hardware_table_records: {list} array of dictionaries
+
+def get_dependency_graph(doc_types=None):
+    """Map every file the validation documents are rendered from to the documents that depend on it:
+    the configuration file, the templates and the tab-delimited inputs each document is merged from
+    :param doc_types: {list} the document types, default all of the release
+    :return dependency_graph: {dict} the document types keyed by absolute file path
     """
-    infile = get_user_requirements_checklist_file(doc_type)
+    if doc_types is None:
+        doc_types = get_release_doc_types()
 
-    header_to_position_lookup = {}
-    record_ctr = 0
+    dependency_graph = {}
 
-    table_records = []
-    id_ctr = 0
+    for doc_type in doc_types:
+        for infile in [get_template_file(doc_type)] + get_document_input_files(doc_type):
+            dependent_doc_types = dependency_graph.setdefault(os.path.abspath(infile), [])
+            if doc_type not in dependent_doc_types:
+                dependent_doc_types.append(doc_type)
 
-    with open(infile) as f:
-        reader = csv.reader(f, delimiter='\t')
-        row_ctr = 0
-        id_header_found = False
-        for row in reader:
-            row_ctr += 1
-            if row_ctr == 1:
-                field_ctr = 0
-                for field in row:
-                    header_to_position_lookup[field] = field_ctr
-                    field_ctr += 1
-                    if field == 'ID':
-                        id_header_found = True
-                logging.info("Processed the header of csv file '{}'".format(infile))
-            else:
-                id_ctr += 1
-                ur_id = str(id_ctr)
-                if id_header_found:
-                    ur_id = row[header_to_position_lookup['ID']]
+    dependency_graph[g_config_file] = list(doc_types)
 
-                table_records.append({
-                    'id': ur_id,
-                    'req': row[header_to_position_lookup['Requirement Description']],
-                    'criticality': row[header_to_position_lookup['Criticality']],
-                    'comment': row[header_to_position_lookup['Comment']],
-                    'test_id': row[header_to_position_lookup['Test ID']]
-                })
+    return dependency_graph
 
-                record_ctr += 1
 
-        logging.info("Processed '{}' records in tab-delimited file '{}'".format(record_ctr, infile))
+def get_file_stamps(files):
+    """Retrieve the modification time and size of the files
+    :param files: {iterable} the files
+    :return stamps: {dict} the (modification time, size) keyed by file, None when the file does not exist
+    """
+    stamps = {}
+    for infile in files:
+        try:
+            stat = os.stat(infile)
+            stamps[infile] = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            stamps[infile] = None
+
+    return stamps
+
+
+def reload_version_history_records():
+    """Re-read the version history records after the version history file was edited, keeping the record
+    of the current release without prompting or appending it to the file again
+    :return None:
+    """
+    global g_version_history_records
+
+    header_to_position_lookup, rows = read_tsv_file(get_version_history_file())
 
-    logging.info(table_records)
+    version_position = header_to_position_lookup['Version']
+    date_position = header_to_position_lookup['Date']
+    comment_position = header_to_position_lookup['Comment']
 
-    return table_records
+    version_history_records = [TableRecord(VERSION_HISTORY_FIELDS, (row[version_position], row[date_position], row[comment_position])) for row in rows]
 
+    current_record = TableRecord(VERSION_HISTORY_FIELDS, (g_software_version, g_document_prepared_date, g_version_history_comment))
+    if g_version_history_comment and current_record not in version_history_records:
+        version_history_records.append(current_record)
 
-def prepare_user_requirements():
-    """Prepare the User Requirements validation document
+    g_version_history_records = version_history_records
+
+
+def display_rebuild_report(rebuild_ctr, changed_files, doc_types, first_change_time, start_time):
+    """Print the latency of a watch mode rebuild to the STDOUT and log file: the render time of every
+    document and the time from the first detected change until the documents were written
+    :param rebuild_ctr: {int} the number of the rebuild
+    :param changed_files: {list} the files whose changes triggered the rebuild
+    :param doc_types: {list} the document types that were rendered
+    :param first_change_time: {float} the time the first change was detected
+    :param start_time: {float} the time the rebuild started, after debouncing
+    :return None:
+    """
+    end_time = time.time()
+    phase_timings = get_phase_timings()
+    width = max([len(doc_type) for doc_type in doc_types] + [len('Document')])
+
+    print("\nRebuild {}: '{}' documents in {:.3f} seconds, {:.3f} seconds after the first change".format(rebuild_ctr, len(doc_types), end_time - start_time, end_time - first_change_time))
+    for infile in changed_files:
+        print("changed: {}".format(infile))
+    print("{:<{}}  {:>9}".format('Document', width, 'Seconds'))
+    for doc_type in doc_types:
+        print("{:<{}}  {:>9.3f}".format(doc_type, width, sum(phase_timings.get(doc_type, {}).values())))
+
+    logging.info("Rebuild {} of '{}' after changes to '{}' took {:.3f} seconds, {:.3f} seconds after the first change".format(
+        rebuild_ctr, "', '".join(doc_types), "', '".join(changed_files), end_time - start_time, end_time - first_change_time))
+
+
+def watch_release(jobs=1, debounce=WATCH_DEBOUNCE, doc_types=None):
+    """Watch the configuration file, templates and tab-delimited inputs of the current release and re-render
+    only the documents that depend on the files that changed.  Changes are debounced so that a burst of
+    saves triggers a single rebuild.  Runs until interrupted.
+    :param jobs: {int} the number of documents to render concurrently, default 1
+    :param debounce: {float} the number of seconds without further changes to wait before rebuilding
+    :param doc_types: {list} the document types to keep up to date, default all
     :return None:
     """
-    doc_type = 'User Requirements'
+    dependency_graph = get_dependency_graph(doc_types)
+    stamps = get_file_stamps(dependency_graph)
 
-    template_file = get_template_file(doc_type)
+    print("\nWatching '{}' files for changes, press Ctrl+C to stop".format(len(dependency_graph)))
+    logging.info("Watching '{}' files for changes".format(len(dependency_graph)))
 
-    document = instantiate_mailmerge(template_file)
+    rebuild_ctr = 0
 
-    outfile = g_outdir + '/' + g_software_name + ' ' + g_software_version + ' - User Requirements - ' + g_document_prepared_date + '.docx'
+    try:
+        while True:
+            time.sleep(WATCH_POLL_INTERVAL)
 
-    user_req_table_records = get_user_requirements_table_records(doc_type)
+            current_stamps = get_file_stamps(dependency_graph)
+            changed_files = [infile for infile in dependency_graph if current_stamps[infile] != stamps[infile]]
+            if len(changed_files) == 0:
+                continue
 
-    document.merge_rows('id', user_req_table_records)
+            first_change_time = last_change_time = time.time()
+            stamps = current_stamps
 
-    document.write(outfile)
+            while time.time() - last_change_time < debounce:
+                time.sleep(WATCH_POLL_INTERVAL)
+                current_stamps = get_file_stamps(dependency_graph)
+                for infile in dependency_graph:
+                    if current_stamps[infile] != stamps[infile]:
+                        last_change_time = time.time()
+                        if infile not in changed_files:
+                            changed_files.append(infile)
+                stamps = current_stamps
 
-    print("Wrote '{}' validation document  '{}'".format(doc_type, outfile))
+            affected_doc_types = set()
+            for infile in changed_files:
+                affected_doc_types.update(dependency_graph[infile])
+            affected_doc_types = [doc_type for doc_type in DOCUMENT_REGISTRY if doc_type in affected_doc_types]
 
+            rebuild_ctr += 1
+            start_time = time.time()
+            logging.info("Changes to '{}' affect '{}'".format("', '".join(changed_files), "', '".join(affected_doc_types)))
 
-def prepare_validation_report():
-    """Prepare the Validation Report validation document
-    :return None:
-    """
-    doc_type = 'Validation Report'
-    template_file = get_template_file(doc_type)
-    document = instantiate_mailmerge(template_file)
+            with g_timing_spans_lock:
+                del g_timing_spans[:]
 
-    outfile = g_outdir + '/' + g_software_name + ' ' + g_software_version + ' - Validation Report - ' + g_document_prepared_date + '.docx'
-    user_req_table_records = get_user_requirements_table_records('User Requirements')
-    document.merge_rows('id', user_req_table_records)
+            try:
+                if g_config_file in changed_files:
+                    load_config(g_config_file)
 
-    version_history_records = get_version_history_records()
-    document.merge_rows('vh_id', version_history_records)
+                if get_version_history_file() in changed_files:
+                    reload_version_history_records()
 
-    document.write(outfile)
-    print("Wrote '{}' validation document  '{}'".format(doc_type, outfile))
+                render_documents(jobs, False, affected_doc_types)
 
+                if 'Traceability Matrix' in affected_doc_types:
+                    write_traceability_report(get_traceability_report_file(), get_traceability())
 
-@click.command()
+                # the configuration may now name other templates or inputs
+                dependency_graph = get_dependency_graph(doc_types)
+            except Exception as e:
+                logging.exception("Rebuild {} failed".format(rebuild_ctr))
+                print(Fore.RED + "Rebuild {} failed: {}".format(rebuild_ctr, e))
+                print(Style.RESET_ALL + '', end='')
+            else:
+                display_rebuild_report(rebuild_ctr, changed_files, affected_doc_types, first_change_time, start_time)
+
+            # keep the stamps taken before rendering so that files saved during the rebuild trigger the next one
+            stamps.update(get_file_stamps([infile for infile in dependency_graph if infile not in stamps]))
+    except KeyboardInterrupt:
+        print("\nStopped watching after '{}' rebuilds".format(rebuild_ctr))
+        logging.info("Stopped watching after '{}' rebuilds".format(rebuild_ctr))
+
+
+class DefaultCommandGroup(click.Group):
+    """Command group that falls back to the 'generate' command when no command is named,
+    so that the original command-line invocation keeps working"""
+
+    def parse_args(self, ctx, args):
+        if len(args) == 0 or (args[0] not in self.commands and args[0] not in ctx.help_option_names):
+            args.insert(0, 'generate')
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=DefaultCommandGroup)
+def cli():
+    """Generate the validation documents for a software release
+    """
+
+
+@cli.command('generate')
 @click.option('--outdir', help='The default is the current working directory')
 @click.option('--config_file', type=click.Path(exists=True), help="The configuration file for this project")
 @click.option('--logfile', help="The log file")
@@ -855,8 +3264,28 @@ def prepare_validation_report():
 @click.option('--server', help="The server on which the software will be installed and validated on")
 @click.option('--document_prepared_by', help="The name of the person that prepared the document")
 @click.option('--document_prepared_date', help="The date the document was prepared")
-def main(outdir, config_file, logfile, template_files_dir, software_name, software_version, server, document_prepared_by, document_prepared_date):
-    """Template command-line executable
+@click.option('--jobs', type=click.IntRange(min=1), default=1, show_default=True, help="The number of validation documents to render concurrently")
+@click.option('--answers_file', type=click.Path(exists=True), help="JSON or YAML file with the answers to the interactive questions")
+@click.option('--answer', 'answer_options', multiple=True, help="The answer to an interactive question as KEY=VALUE, overrides the answers file")
+@click.option('--non_interactive', is_flag=True, help="Never prompt; every answer must come from the answers file or --answer options")
+@click.option('--incremental', is_flag=True, help="Only regenerate the documents whose template, inputs or merge field values changed since the last build in --outdir")
+@click.option('--streaming', is_flag=True, help="Stream the checklist rows from the tab-delimited files into the documents without holding them in memory")
+@click.option('--compression_level', type=click.IntRange(min=0, max=9), help="The deflate level of the .docx files from 1 (fastest) to 9 (smallest), or 0 to store them uncompressed for quick drafts; default zlib's")
+@click.option('--pdf', is_flag=True, help="Also convert every validation document to PDF next to the .docx with headless LibreOffice")
+@click.option('--pdf_workers', type=click.IntRange(min=1), default=2, show_default=True, help="The number of LibreOffice converters kept running for --pdf")
+@click.option('--buffered_write', is_flag=True, help="Assemble every .docx in memory and write it to disk with a single write")
+@click.option('--profile', is_flag=True, help="Write a cProfile dump and a Chrome trace of the rendering phases to --outdir")
+@click.option('--replicate_server', 'replicate_servers', multiple=True, help="A server on which to create the replicate folders, overrides 'replicate folders servers' in the config file")
+@click.option('--plan', is_flag=True, help="Only resolve and check every template and input, report the render plan and all problems, and exit")
+@click.option('--only', multiple=True, type=click.Choice(list(DOCUMENT_REGISTRY), case_sensitive=False), help="Only generate this validation document; may be repeated")
+@click.option('--skip', multiple=True, type=click.Choice(list(DOCUMENT_REGISTRY), case_sensitive=False), help="Do not generate this validation document; may be repeated")
+@click.option('--watch', is_flag=True, help="After generating, keep watching the config file, templates and inputs and re-render only the documents that depend on the files that changed")
+@click.option('--watch_debounce', type=click.FloatRange(min=0), default=WATCH_DEBOUNCE, show_default=True, help="The number of seconds without further changes to wait before re-rendering with --watch")
+@click.option('--log_level', type=click.Choice(LOG_LEVELS, case_sensitive=False), default=logging.getLevelName(LOG_LEVEL), show_default=True, help="The minimum level to log; table record dumps are logged at DEBUG")
+@click.option('--log_json', is_flag=True, help="Write the log file as JSON lines")
+@click.option('--log_max_records', type=click.IntRange(min=0), default=LOG_MAX_RECORDS, show_default=True, help="The maximum number of records shown per record dump in the log, 0 for no limit")
+def main(outdir, config_file, logfile, template_files_dir, software_name, software_version, server, document_prepared_by, document_prepared_date, jobs, answers_file, answer_options, non_interactive, incremental, streaming, compression_level, buffered_write, pdf, pdf_workers, profile, replicate_servers, plan, only, skip, watch, watch_debounce, log_level, log_json, log_max_records):
+    """Generate the validation documents for a single release
     """
 
     error_ctr = 0
@@ -877,14 +3306,14 @@ def main(outdir, config_file, logfile, template_files_dir, software_name, softwa
         sys.exit(1)
 
     if document_prepared_date is None:
-        document_prepared_date = DEFAULT_DOCUMENT_PREPARED_DATE
+        document_prepared_date = get_default_document_prepared_date()
         print(Fore.YELLOW + "--document_prepared_date was not specified and therefore was set to '{}'".format(document_prepared_date))
         print(Style.RESET_ALL + '', end='')
 
     assert isinstance(document_prepared_date, str)
 
     if outdir is None:
-        outdir = DEFAULT_OUTDIR
+        outdir = get_default_outdir()
         print(Fore.YELLOW + "--outdir was not specified and therefore was set to '{}'".format(outdir))
         print(Style.RESET_ALL + '', end='')
 
@@ -902,78 +3331,70 @@ def main(outdir, config_file, logfile, template_files_dir, software_name, softwa
 
     assert isinstance(logfile, str)
 
-    logging.basicConfig(filename=logfile, format=LOGGING_FORMAT, level=LOG_LEVEL)
-
-    logging.info("Loading configuration from '{}'".format(config_file))
-
-    global g_config
-    g_config = json.loads(open(config_file).read())
-
-    if document_prepared_by is None:
-        if 'default document prepared by' in g_config:
-            document_prepared_by = g_config['default document prepared by']
-            print(Fore.YELLOW + "--document_prepared_by was not specified and therefore was set to '{}'".format(document_prepared_by))
-            print(Style.RESET_ALL + '', end='')
-        else:
-            document_prepared_by = input("What is the first and last name of the person that will prepare the documents? ")
-            document_prepared_by = document_prepared_by.strip()
+    configure_logging(logfile, log_level.upper(), log_json, log_max_records)
 
-    if template_files_dir is None:
-        if 'template_files_dir' in g_config:
-            template_files_dir = g_config['template_files_dir']
-            print(Fore.YELLOW + "--template_files_dir was not specified and therefore was set to '{}'".format(template_files_dir))
-            print(Style.RESET_ALL + '', end='')
-        else:
-            template_files_dir = os.path.dirname(os.path.abspath(config_file)) + '/template_files_dir'
-            if os.path.exists(template_files_dir):
-                print(Fore.YELLOW + "--template_files_dir was not specified and therefore was set to '{}'".format(template_files_dir))
-                print(Style.RESET_ALL + '', end='')
-            else:
-                raise Exception("'template_files_dir' does not exist in the configuration file '{}' and was not found here '{}'".format(config_file, template_files_dir))
-            
-    if not os.path.exists(template_files_dir):
-        print(Fore.RED + "template_files_dir '{}' does not exist".format(template_files_dir))
+    doc_types = get_selected_doc_types(only, skip)
+    if len(doc_types) == 0:
+        print(Fore.RED + "--only and --skip leave no validation documents to generate")
         print(Style.RESET_ALL + '', end='')
         sys.exit(1)
 
-    if software_name is None:
-        if 'software_name' in g_config:
-            software_name = g_config['software_name']
-        else:
-            software_name = input("What is the software name? ")
-            software_name = software_name.strip()
+    load_config(config_file)
 
-    if software_version is None:
-        if 'software_version' in g_config:
-            software_version = g_config['software_version']
-        else:
-            software_version = input("What is the software version? ")
-            software_version = software_version.strip()
+    doc_types = get_release_doc_types(doc_types)
+    if len(doc_types) == 0:
+        print(Fore.RED + "The config file has no section for the selected optional validation documents")
+        print(Style.RESET_ALL + '', end='')
+        sys.exit(1)
 
-    if server is None:
-        if 'server' in g_config:
-            server = g_config['server']
-        else:
-            server = input("What is the server? ")
-            server = server.strip()
+    global g_answers
+    global g_non_interactive
+    global g_streaming
+    global g_compression_level
+    global g_buffered_write
+    global g_pdf_workers
+    global g_profile
+    global g_replicate_folder_servers
+
+    g_streaming = streaming
+    g_compression_level = compression_level
+    g_buffered_write = buffered_write
+    g_pdf_workers = pdf_workers if pdf else 0
+    g_profile = profile
+    g_replicate_folder_servers = replicate_servers
+
+    if answers_file is not None:
+        g_answers = load_answers_file(answers_file)
+
+    for answer_option in answer_options:
+        if '=' not in answer_option:
+            print(Fore.RED + "--answer '{}' must be specified as KEY=VALUE".format(answer_option))
+            print(Style.RESET_ALL + '', end='')
+            sys.exit(1)
+        key, value = answer_option.split('=', 1)
+        g_answers[key.strip()] = value
+
+    g_non_interactive = non_interactive
+
+    if non_interactive:
+        missing_keys = get_missing_release_answers(document_prepared_by, software_name, software_version, server)
+        if len(missing_keys) > 0:
+            error_msg = "The following answers are required in non-interactive mode: {}".format(', '.join(missing_keys))
+            logging.error(error_msg)
+            print(Fore.RED + error_msg)
+            print(Style.RESET_ALL + '', end='')
+            sys.exit(1)
 
-    global g_software_name
-    global g_software_version
-    global g_document_prepared_by
-    global g_document_prepared_date
-    global g_template_files_dir
-    global g_outdir
-    global g_server
-    global g_config_dir
+    resolve_release(config_file, outdir, template_files_dir, software_name, software_version, server, document_prepared_by, document_prepared_date)
 
-    g_software_name = software_name
-    g_software_version = software_version
-    g_document_prepared_by = document_prepared_by
-    g_document_prepared_date = document_prepared_date
-    g_outdir = outdir
-    g_template_files_dir = template_files_dir
-    g_server = server
-    g_config_dir = os.path.dirname(os.path.abspath(config_file))
+    if non_interactive and not plan:
+        missing_keys = get_missing_document_answers(doc_types)
+        if len(missing_keys) > 0:
+            error_msg = "The following answers are required in non-interactive mode: {}".format(', '.join(missing_keys))
+            logging.error(error_msg)
+            print(Fore.RED + error_msg)
+            print(Style.RESET_ALL + '', end='')
+            sys.exit(1)
 
     print("\nHere are the key values:")
     print("software name: {}".format(g_software_name))
@@ -984,23 +3405,733 @@ def main(outdir, config_file, logfile, template_files_dir, software_name, softwa
     print("template files directory: {}".format(g_template_files_dir))
     print("config directory: {}".format(g_config_dir))
 
-    proceed_yes_or_no = input("\nOkay to proceed? [Y/n] ")
-    if proceed_yes_or_no is None or proceed_yes_or_no is '' or proceed_yes_or_no == 'Y' or proceed_yes_or_no == 'y':
-        pass
+    if plan:
+        render_plan, errors, warnings = get_render_plan(doc_types)
+        display_render_plan(render_plan, errors, warnings)
+        sys.exit(1 if len(errors) > 0 else 0)
+
+    if non_interactive:
+        logging.info("Running in non-interactive mode so will proceed")
     else:
-        print("Will not proceed.  Please rerun when ready.")
-        sys.exit(0)
+        proceed_yes_or_no = ask('proceed', "\nOkay to proceed? [Y/n] ", yes_no=True)
+        if proceed_yes_or_no is None or proceed_yes_or_no == '' or proceed_yes_or_no == 'Y' or proceed_yes_or_no == 'y':
+            pass
+        else:
+            print("Will not proceed.  Please rerun when ready.")
+            sys.exit(0)
+
+    profiler = None
+    if profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    generate_release(jobs, incremental, doc_types)
 
-    prepare_iq()
-    prepare_oq()
-    prepare_pq()
-    prepare_system_specification()
-    prepare_test_plan()
-    prepare_user_requirements()
-    prepare_validation_report()
+    if profiler is not None:
+        profiler.disable()
+        write_profile(profiler)
+
+    report_input_record_store_stats()
+
+    display_phase_timings()
 
     display_reminders()
 
+    if watch:
+        watch_release(jobs, watch_debounce, doc_types)
+
+
+def load_batch_manifest(manifest_file):
+    """Load the batch manifest listing the releases to generate.  The manifest is either a list
+    of releases or a mapping with optional 'defaults' applied to every entry of 'releases'.
+    Relative paths are resolved against the directory of the manifest.
+    :param manifest_file: {str} the JSON or YAML manifest file
+    :return releases: {list} the release entries with the defaults applied
+    """
+    manifest = load_json_or_yaml_file(manifest_file)
+
+    defaults = {}
+    if isinstance(manifest, dict):
+        defaults = manifest.get('defaults', {})
+        manifest = manifest.get('releases')
+
+    if not isinstance(manifest, list) or len(manifest) == 0:
+        raise Exception("batch manifest '{}' does not list any releases".format(manifest_file))
+
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_file))
+
+    releases = []
+    for entry in manifest:
+        release = dict(defaults)
+        release.update(entry)
+        release['answers'] = dict(defaults.get('answers', {}))
+        release['answers'].update(entry.get('answers', {}))
+
+        if 'config_file' not in release:
+            raise Exception("release '{}' in batch manifest '{}' does not specify a config_file".format(entry, manifest_file))
+
+        for key in ('config_file', 'outdir', 'template_files_dir'):
+            if release.get(key) is not None:
+                release[key] = os.path.join(manifest_dir, release[key])
+
+        releases.append(release)
+
+    return releases
+
+
+def display_batch_summary(results):
+    """Print the per-release timing summary of the batch to the STDOUT and log file
+    :param results: {list} the (release label, status, seconds) for every release
+    :return None:
+    """
+    width = max([len(label) for label, status, seconds in results] + [len('Release')])
+
+    print("\n\nBatch summary:")
+    print("{:<{}}  {:<6}  {:>9}".format('Release', width, 'Status', 'Seconds'))
+    for label, status, seconds in results:
+        print("{:<{}}  {:<6}  {:>9.2f}".format(label, width, status, seconds))
+        logging.info("Release '{}' {} in {:.2f} seconds".format(label, status, seconds))
+
+    total = sum([seconds for label, status, seconds in results])
+    print("{:<{}}  {:<6}  {:>9.2f}".format('Total', width, '', total))
+
+
+@cli.command('batch')
+@click.option('--manifest', 'manifest_file', type=click.Path(exists=True), required=True, help="JSON or YAML manifest listing the releases to generate")
+@click.option('--outdir', help="The base output directory for releases that do not specify an outdir")
+@click.option('--logfile', help="The log file")
+@click.option('--jobs', type=click.IntRange(min=1), default=1, show_default=True, help="The number of validation documents to render concurrently")
+@click.option('--incremental', is_flag=True, help="Only regenerate the documents that changed since the last build in each release's output directory")
+@click.option('--only', multiple=True, type=click.Choice(list(DOCUMENT_REGISTRY), case_sensitive=False), help="Only generate this validation document for every release; may be repeated")
+@click.option('--skip', multiple=True, type=click.Choice(list(DOCUMENT_REGISTRY), case_sensitive=False), help="Do not generate this validation document for any release; may be repeated")
+@click.option('--streaming', is_flag=True, help="Stream the checklist rows from the tab-delimited files into the documents without holding them in memory")
+@click.option('--compression_level', type=click.IntRange(min=0, max=9), help="The deflate level of the .docx files from 1 (fastest) to 9 (smallest), or 0 to store them uncompressed for quick drafts; default zlib's")
+@click.option('--pdf', is_flag=True, help="Also convert every validation document to PDF next to the .docx with headless LibreOffice")
+@click.option('--pdf_workers', type=click.IntRange(min=1), default=2, show_default=True, help="The number of LibreOffice converters kept running for --pdf")
+@click.option('--buffered_write', is_flag=True, help="Assemble every .docx in memory and write it to disk with a single write")
+@click.option('--log_level', type=click.Choice(LOG_LEVELS, case_sensitive=False), default=logging.getLevelName(LOG_LEVEL), show_default=True, help="The minimum level to log; table record dumps are logged at DEBUG")
+@click.option('--log_json', is_flag=True, help="Write the log file as JSON lines")
+@click.option('--log_max_records', type=click.IntRange(min=0), default=LOG_MAX_RECORDS, show_default=True, help="The maximum number of records shown per record dump in the log, 0 for no limit")
+def batch(manifest_file, outdir, logfile, jobs, incremental, only, skip, streaming, compression_level, buffered_write, pdf, pdf_workers, log_level, log_json, log_max_records):
+    """Generate the validation documents for every release in a manifest in one process,
+    sharing the parsed templates and inputs that the releases have in common.
+    Every release runs non-interactively with the answers given in the manifest.
+    """
+    if outdir is None:
+        outdir = get_default_outdir()
+        print(Fore.YELLOW + "--outdir was not specified and therefore was set to '{}'".format(outdir))
+        print(Style.RESET_ALL + '', end='')
+
+    pathlib.Path(outdir).mkdir(parents=True, exist_ok=True)
+
+    if logfile is None:
+        logfile = outdir + '/' + os.path.basename(__file__) + '.log'
+        print(Fore.YELLOW + "--logfile was not specified and therefore was set to '{}'".format(logfile))
+        print(Style.RESET_ALL + '', end='')
+
+    configure_logging(logfile, log_level.upper(), log_json, log_max_records)
+
+    doc_types = get_selected_doc_types(only, skip)
+    if len(doc_types) == 0:
+        print(Fore.RED + "--only and --skip leave no validation documents to generate")
+        print(Style.RESET_ALL + '', end='')
+        sys.exit(1)
+
+    releases = load_batch_manifest(manifest_file)
+
+    logging.info("Loaded '{}' releases from batch manifest '{}'".format(len(releases), manifest_file))
+
+    global g_answers
+    global g_non_interactive
+    global g_streaming
+    global g_compression_level
+    global g_buffered_write
+    global g_pdf_workers
+
+    g_non_interactive = True
+    g_streaming = streaming
+    g_compression_level = compression_level
+    g_buffered_write = buffered_write
+    g_pdf_workers = pdf_workers if pdf else 0
+
+    results = []
+
+    for release_ctr, release in enumerate(releases, start=1):
+        label = "{}. {} {} {}".format(release_ctr, release.get('software_name', ''), release.get('software_version', ''), release.get('server', '')).strip()
+        start_time = time.time()
+        try:
+            g_answers = release['answers']
+
+            load_config(release['config_file'])
+
+            missing_keys = get_missing_release_answers(release.get('document_prepared_by'), release.get('software_name'), release.get('software_version'), release.get('server'))
+            if len(missing_keys) > 0:
+                raise Exception("The following answers are required for release '{}': {}".format(label, ', '.join(missing_keys)))
+
+            release_outdir = release.get('outdir') or os.path.join(outdir, 'release-{}'.format(release_ctr))
+            pathlib.Path(release_outdir).mkdir(parents=True, exist_ok=True)
+
+            resolve_release(release['config_file'],
+                            release_outdir,
+                            release.get('template_files_dir'),
+                            release.get('software_name'),
+                            release.get('software_version'),
+                            release.get('server'),
+                            release.get('document_prepared_by'),
+                            release.get('document_prepared_date') or get_default_document_prepared_date())
+
+            label = "{}. {} {} {}".format(release_ctr, g_software_name, g_software_version, g_server)
+
+            release_doc_types = get_release_doc_types(doc_types)
+            if len(release_doc_types) == 0:
+                raise Exception("The config file of release '{}' has no section for the selected optional validation documents".format(label))
+
+            missing_keys = get_missing_document_answers(release_doc_types)
+            if len(missing_keys) > 0:
+                raise Exception("The following answers are required for release '{}': {}".format(label, ', '.join(missing_keys)))
+
+            print("\nGenerating release '{}' in '{}'".format(label, release_outdir))
+            logging.info("Generating release '{}' in '{}'".format(label, release_outdir))
+
+            generate_release(jobs, incremental, release_doc_types)
+
+            display_phase_timings()
+
+            display_reminders()
+
+            results.append((label, 'ok', time.time() - start_time))
+        except Exception as e:
+            logging.exception("Release '{}' failed".format(label))
+            print(Fore.RED + "Release '{}' failed: {}".format(label, e))
+            print(Style.RESET_ALL + '', end='')
+            results.append((label, 'failed', time.time() - start_time))
+
+    report_input_record_store_stats()
+
+    display_batch_summary(results)
+
+    if any([status != 'ok' for label, status, seconds in results]):
+        sys.exit(1)
+
+
+SERVE_LATENCY_SAMPLES = 1000
+
+SERVE_REQUEST_KEYS = ['config_file', 'outdir', 'template_files_dir', 'software_name', 'software_version', 'server',
+                      'document_prepared_by', 'document_prepared_date', 'answers', 'documents', 'incremental', 'streaming']
+
+
+class RenderService:
+    """Renders validation documents on request in a long-running process so that the configurations, parsed
+    templates and tab-delimited inputs stay warm between requests.  Requests are accepted concurrently but the
+    release state lives in the module globals, so the releases themselves are rendered one at a time."""
+
+    def __init__(self, outdir, jobs=1):
+        """The pool of document workers is started here, before any request thread exists, and is
+        handed the release state with every document
+        :param outdir: {str} the directory that request output directories are resolved against and must stay within
+        :param jobs: {int} the number of documents of a request to render concurrently
+        """
+        import collections
+
+        global g_document_executor
+
+        self.outdir = os.path.realpath(outdir)
+        self.jobs = jobs
+        self.start_time = time.time()
+        self.release_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.queued = 0
+        self.latencies = collections.defaultdict(lambda: collections.deque(maxlen=SERVE_LATENCY_SAMPLES))
+        self.counts = collections.Counter()
+
+        if jobs > 1:
+            g_document_executor = get_document_executor(jobs)
+            # forked workers are all started by the first submission
+            g_document_executor.submit(os.getpid).result()
+
+    def close(self):
+        """Shut down the pool of document workers
+        :return None:
+        """
+        global g_document_executor
+
+        if g_document_executor is not None:
+            g_document_executor.shutdown()
+            g_document_executor = None
+
+    def get_request_outdir(self, payload):
+        """Resolve the output directory of a render request
+        :param payload: {dict} the render request
+        :return outdir: {str} the real path of the request's 'outdir' below the service's output directory,
+        None when it resolves outside of it
+        """
+        outdir = os.path.realpath(os.path.join(self.outdir, payload.get('outdir') or ''))
+        if outdir != self.outdir and not outdir.startswith(self.outdir + os.sep):
+            return None
+
+        return outdir
+
+    def record_latency(self, key, seconds, status='ok'):
+        """Record the latency of a request or of rendering a document
+        :param key: {str} 'request' or the document type
+        :param seconds: {float} the latency
+        :param status: {str} 'ok' or 'failed'
+        :return None:
+        """
+        with self.stats_lock:
+            self.latencies[key].append(seconds)
+            self.counts[(key, status)] += 1
+
+    def get_stats(self):
+        """Summarize the latencies of the requests and of every document type, over the most recent samples
+        :return stats: {dict} the uptime, queue length, cache sizes and per-key latency percentiles in milliseconds
+        """
+        with self.stats_lock:
+            latencies = {key: sorted(samples) for key, samples in self.latencies.items()}
+            counts = dict(self.counts)
+            queued = self.queued
+
+        stats = {
+            'uptime_seconds': round(time.time() - self.start_time, 3),
+            'queued': queued,
+            'templates_cached': len(g_template_cache),
+            'input_files_cached': len(g_input_record_store),
+            'input_record_store': dict(g_input_record_store_stats),
+            'latency_ms': {}
+        }
+
+        for key, samples in latencies.items():
+            stats['latency_ms'][key] = {
+                'ok': counts.get((key, 'ok'), 0),
+                'failed': counts.get((key, 'failed'), 0),
+                'mean': round(1000 * sum(samples) / len(samples), 3),
+                'p50': round(1000 * samples[int(0.50 * (len(samples) - 1))], 3),
+                'p95': round(1000 * samples[int(0.95 * (len(samples) - 1))], 3),
+                'p99': round(1000 * samples[int(0.99 * (len(samples) - 1))], 3),
+                'max': round(1000 * samples[-1], 3)
+            }
+
+        return stats
+
+    def get_request_problems(self, payload):
+        """Validate a render request
+        :param payload: {object} the decoded JSON body of the request
+        :return problems: {list} descriptions of what is wrong with the request
+        """
+        if not isinstance(payload, dict):
+            return ["the request must be a JSON object"]
+
+        problems = ["unknown key '{}'".format(key) for key in payload if key not in SERVE_REQUEST_KEYS]
+
+        if payload.get('config_file') is None:
+            problems.append("'config_file' was not specified")
+        elif not os.path.exists(payload['config_file']):
+            problems.append("config_file '{}' does not exist".format(payload['config_file']))
+
+        if not isinstance(payload.get('answers', {}), dict):
+            problems.append("'answers' must be a mapping of question keys to answers")
+
+        if payload.get('outdir') is not None and (not isinstance(payload['outdir'], str) or self.get_request_outdir(payload) is None):
+            problems.append("'outdir' must be a directory within the output directory of the service '{}'".format(self.outdir))
+
+        documents = payload.get('documents')
+        if documents is not None:
+            if not isinstance(documents, list) or len(documents) == 0:
+                problems.append("'documents' must be a non-empty list of document types")
+            else:
+                problems.extend(["unknown document type '{}', must be one of: {}".format(doc_type, ', '.join(DOCUMENT_REGISTRY))
+                                 for doc_type in documents if doc_type not in DOCUMENT_REGISTRY])
+
+        return problems
+
+    def render(self, payload):
+        """Generate the requested validation documents of a release.  The payload carries the values the
+        generate command takes from its options and prompts; every answer must be in 'answers'.
+        :param payload: {dict} the render request
+        :return status_code, response: {tuple} the HTTP status code and the JSON response
+        """
+        problems = self.get_request_problems(payload)
+        if len(problems) > 0:
+            return 400, {'status': 'failed', 'errors': problems}
+
+        with self.stats_lock:
+            self.queued += 1
+
+        with self.release_lock:
+            with self.stats_lock:
+                self.queued -= 1
+            return self.render_release(payload)
+
+    def render_release(self, payload):
+        """Render the release of a validated request.  The caller must hold the release lock.
+        :param payload: {dict} the render request
+        :return status_code, response: {tuple} the HTTP status code and the JSON response
+        """
+        global g_answers
+        global g_non_interactive
+        global g_streaming
+
+        start_time = time.time()
+
+        g_answers = dict(payload.get('answers', {}))
+        g_non_interactive = True
+        g_streaming = bool(payload.get('streaming', False))
+
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output):
+                load_config(payload['config_file'])
+
+                doc_types = get_release_doc_types(payload.get('documents') or None)
+                if len(doc_types) == 0:
+                    self.record_latency('request', time.time() - start_time, 'failed')
+                    return 400, {'status': 'failed', 'errors': ["The config file has no section for the requested optional validation documents"]}
+
+                missing_keys = get_missing_release_answers(payload.get('document_prepared_by'), payload.get('software_name'), payload.get('software_version'), payload.get('server'))
+                if len(missing_keys) > 0:
+                    self.record_latency('request', time.time() - start_time, 'failed')
+                    return 400, {'status': 'failed', 'errors': ["The following answers are required: {}".format(', '.join(missing_keys))]}
+
+                outdir = self.get_request_outdir(payload)
+                pathlib.Path(outdir).mkdir(parents=True, exist_ok=True)
+
+                resolve_release(payload['config_file'],
+                                outdir,
+                                payload.get('template_files_dir'),
+                                payload.get('software_name'),
+                                payload.get('software_version'),
+                                payload.get('server'),
+                                payload.get('document_prepared_by'),
+                                payload.get('document_prepared_date') or get_default_document_prepared_date())
+
+                missing_keys = get_missing_document_answers(doc_types)
+                if len(missing_keys) > 0:
+                    self.record_latency('request', time.time() - start_time, 'failed')
+                    return 400, {'status': 'failed', 'errors': ["The following answers are required: {}".format(', '.join(missing_keys))]}
+
+                logging.info("Rendering '{}' for '{} {} {}' in '{}'".format(', '.join(doc_types), g_software_name, g_software_version, g_server, outdir))
+
+                generate_release(self.jobs, bool(payload.get('incremental', False)), doc_types)
+        except Exception as e:
+            logging.exception("Render request failed")
+            self.record_latency('request', time.time() - start_time, 'failed')
+            return 500, {'status': 'failed', 'errors': [str(e)], 'output': strip_ansi_codes(output.getvalue())}
+
+        for span in g_timing_spans:
+            if span['phase'] == 'render':
+                self.record_latency(span['doc_type'], span['duration'])
+
+        seconds = time.time() - start_time
+        self.record_latency('request', seconds)
+
+        return 200, {
+            'status': 'ok',
+            'seconds': round(seconds, 3),
+            'documents': {doc_type: get_outfile(doc_type) for doc_type in doc_types},
+            'phase_timings': get_phase_timings(),
+            'reminders': g_reminders,
+            'output': strip_ansi_codes(output.getvalue())
+        }
+
+
+def strip_ansi_codes(text):
+    """Remove the terminal color codes from text printed for the console
+    :param text: {str}
+    :return text: {str}
+    """
+    return re.sub('\x1b\\[[0-9;]*m', '', text)
+
+
+def run_render_service(service, host, port, socket_file=None):
+    """Serve the render service over HTTP on a TCP port or a Unix socket until interrupted.
+    POST /render renders a release, GET /stats reports the latency statistics and GET /health reports liveness.
+    :param service: {RenderService} the render service
+    :param host: {str} the address to listen on
+    :param port: {int} the port to listen on
+    :param socket_file: {str} the Unix socket to listen on instead of the TCP port, default None
+    :return None:
+    """
+    import http.server
+    import socketserver
+
+    class RenderRequestHandler(http.server.BaseHTTPRequestHandler):
+
+        def send_json(self, status_code, response):
+            body = json.dumps(response, indent=2).encode('utf-8')
+            self.send_response(status_code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/stats':
+                self.send_json(200, service.get_stats())
+            elif self.path == '/health':
+                self.send_json(200, {'status': 'ok'})
+            else:
+                self.send_json(404, {'status': 'failed', 'errors': ["unknown path '{}'".format(self.path)]})
+
+        def do_POST(self):
+            if self.path != '/render':
+                self.send_json(404, {'status': 'failed', 'errors': ["unknown path '{}'".format(self.path)]})
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'null')
+            except ValueError as e:
+                self.send_json(400, {'status': 'failed', 'errors': ["the request is not valid JSON: {}".format(e)]})
+                return
+            self.send_json(*service.render(payload))
+
+        def log_message(self, format, *args):
+            # Unix socket clients have no address, so the request line is logged without one
+            logging.info("Render service: " + format % args)
+
+    if socket_file is not None:
+        if os.path.exists(socket_file):
+            os.remove(socket_file)
+
+        class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+            daemon_threads = True
+
+        httpd = ThreadingUnixHTTPServer(socket_file, RenderRequestHandler)
+        address = socket_file
+    else:
+        httpd = http.server.ThreadingHTTPServer((host, port), RenderRequestHandler)
+        address = 'http://{}:{}'.format(host, httpd.server_address[1])
+
+    print("Render service listening on '{}'".format(address))
+    logging.info("Render service listening on '{}'".format(address))
+
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        service.close()
+        if socket_file is not None and os.path.exists(socket_file):
+            os.remove(socket_file)
+        logging.info("Render service stopped")
+
+
+@cli.command('serve')
+@click.option('--host', default='127.0.0.1', show_default=True, help="The address to listen on")
+@click.option('--port', type=click.IntRange(min=0, max=65535), default=8765, show_default=True, help="The port to listen on, 0 for any free port")
+@click.option('--socket', 'socket_file', help="Listen on this Unix socket instead of --host and --port")
+@click.option('--outdir', help="The directory that the output directories of the requests are relative to; the default is the current working directory")
+@click.option('--logfile', help="The log file")
+@click.option('--jobs', type=click.IntRange(min=1), default=1, show_default=True, help="The number of validation documents of a request to render concurrently")
+@click.option('--compression_level', type=click.IntRange(min=0, max=9), help="The deflate level of the .docx files from 1 (fastest) to 9 (smallest), or 0 to store them uncompressed for quick drafts; default zlib's")
+@click.option('--buffered_write', is_flag=True, help="Assemble every .docx in memory and write it to disk with a single write")
+@click.option('--log_level', type=click.Choice(LOG_LEVELS, case_sensitive=False), default=logging.getLevelName(LOG_LEVEL), show_default=True, help="The minimum level to log; table record dumps are logged at DEBUG")
+@click.option('--log_json', is_flag=True, help="Write the log file as JSON lines")
+@click.option('--log_max_records', type=click.IntRange(min=0), default=LOG_MAX_RECORDS, show_default=True, help="The maximum number of records shown per record dump in the log, 0 for no limit")
+def serve(host, port, socket_file, outdir, logfile, jobs, compression_level, buffered_write, log_level, log_json, log_max_records):
+    """Run a local render service that keeps the configurations, parsed templates and inputs warm
+    between requests.  POST a JSON release to /render with the values the generate command takes
+    from its options, and every answer under 'answers'; GET /stats for the latency statistics.
+    """
+    if outdir is None:
+        outdir = get_default_outdir()
+        print(Fore.YELLOW + "--outdir was not specified and therefore was set to '{}'".format(outdir))
+        print(Style.RESET_ALL + '', end='')
+
+    pathlib.Path(outdir).mkdir(parents=True, exist_ok=True)
+
+    if logfile is None:
+        logfile = outdir + '/' + os.path.basename(__file__) + '.log'
+        print(Fore.YELLOW + "--logfile was not specified and therefore was set to '{}'".format(logfile))
+        print(Style.RESET_ALL + '', end='')
+
+    configure_logging(logfile, log_level.upper(), log_json, log_max_records)
+
+    global g_compression_level
+    global g_buffered_write
+
+    g_compression_level = compression_level
+    g_buffered_write = buffered_write
+
+    run_render_service(RenderService(os.path.abspath(outdir), jobs), host, port, socket_file)
+
+
+def get_configuration_problems():
+    """Check that every template and tab-delimited input named in the configuration exists and that
+    the inputs have the required columns, without loading any template
+    :return problems: {list} descriptions of the missing settings, files and columns
+    """
+    problems = []
+
+    for doc_type in get_release_doc_types():
+        try:
+            get_template_file(doc_type)
+        except Exception as e:
+            problems.append("'{}' template: {}".format(doc_type, e))
+
+    input_files, input_problems = check_input_files()
+    problems.extend(input_problems)
+
+    return problems
+
+
+@cli.command('check')
+@click.option('--config_file', type=click.Path(exists=True), required=True, help="The configuration file for this project")
+@click.option('--template_files_dir', help="The directory containing the template files")
+@click.option('--outdir', help="The output directory to check is writable")
+@click.option('--logfile', help="The log file, default no log file")
+def check(config_file, template_files_dir, outdir, logfile):
+    """Validate the configuration file, templates, inputs and output directory without
+    rendering anything.  Exits with status 1 when there are problems.
+    """
+    if logfile is None:
+        logging.basicConfig(handlers=[logging.NullHandler()])
+    else:
+        configure_logging(logfile)
+
+    global g_template_files_dir
+
+    problems = []
+
+    try:
+        load_config(config_file)
+    except ValueError as e:
+        problems.append("config file '{}' is not valid JSON: {}".format(config_file, e))
+
+    if len(problems) == 0:
+        if template_files_dir is None:
+            template_files_dir = g_config.get('template_files_dir', os.path.dirname(os.path.abspath(config_file)) + '/template_files_dir')
+
+        if not os.path.isdir(template_files_dir):
+            problems.append("template_files_dir '{}' does not exist".format(template_files_dir))
+
+        g_template_files_dir = template_files_dir
+
+        problems.extend(get_configuration_problems())
+
+    if outdir is not None:
+        # the output directory is created with its parents, so the nearest existing ancestor must be writable
+        existing_dir = os.path.abspath(outdir)
+        while not os.path.exists(existing_dir):
+            existing_dir = os.path.dirname(existing_dir)
+        if not os.path.isdir(existing_dir) or not os.access(existing_dir, os.W_OK):
+            problems.append("outdir '{}' is not writable".format(outdir))
+
+    for problem in problems:
+        logging.error(problem)
+        print(Fore.RED + problem)
+        print(Style.RESET_ALL + '', end='')
+
+    if len(problems) > 0:
+        print("Found '{}' problems in config file '{}'".format(len(problems), config_file))
+        sys.exit(1)
+
+    print("Config file '{}' is valid".format(config_file))
+
+
+def get_store_file(config_file, store_file):
+    """Derive the input store of the import and query commands
+    :param config_file: {str} the configuration file, if specified
+    :param store_file: {str} the input store, if specified
+    :return store_file: {str} the --store file, else the input store named in the configuration file
+    """
+    if store_file is None and config_file is not None:
+        load_config(config_file)
+        store_file = get_input_store_file()
+
+    if store_file is None:
+        print(Fore.RED + "--store was not specified and no 'input store file basename' is set in the configuration file")
+        print(Style.RESET_ALL + '', end='')
+        sys.exit(1)
+
+    return store_file
+
+
+@cli.command('import')
+@click.option('--config_file', type=click.Path(exists=True), required=True, help="The configuration file naming the tab-delimited inputs")
+@click.option('--store', 'store_file', help="The SQLite input store, default the 'input store file basename' in the configuration file")
+@click.option('--logfile', help="The log file, default no log file")
+def import_inputs(config_file, store_file, logfile):
+    """Import the tab-delimited inputs of a project into the SQLite input store.  Only the files
+    that changed since they were last imported are read.
+    """
+    if logfile is None:
+        logging.basicConfig(handlers=[logging.NullHandler()])
+    else:
+        configure_logging(logfile)
+
+    store_file = get_store_file(config_file, store_file)
+
+    input_names = []
+    for input_name in INPUT_FILES:
+        try:
+            if INPUT_FILES[input_name]['get_file']() is not None:
+                input_names.append(input_name)
+        except Exception as e:
+            print(Fore.YELLOW + "Will not import the {}: {}".format(input_name, e))
+            print(Style.RESET_ALL + '', end='')
+
+    statuses = import_input_files(store_file, input_names)
+
+    for infile, status in statuses.items():
+        print("{:<9}  {}".format(status, infile))
+
+    print("Imported '{}' of '{}' files into the input store '{}'".format(list(statuses.values()).count('imported'), len(statuses), store_file))
+
+
+@cli.command('query')
+@click.option('--config_file', type=click.Path(exists=True), help="The configuration file naming the input store")
+@click.option('--store', 'store_file', type=click.Path(exists=True), help="The SQLite input store, default the 'input store file basename' in the configuration file")
+@click.option('--input', 'input_name', type=click.Choice(list(INPUT_FILES)), help="Only rows of this input")
+@click.option('--criticality', help="Only rows with this criticality")
+@click.option('--test_id', help="Only rows with this 'Test ID' or 'Test Number'")
+def query(config_file, store_file, input_name, criticality, test_id):
+    """Print the rows of the imported inputs that match the filters as tab-delimited lines, with
+    the file and row number of every row
+    """
+    logging.basicConfig(handlers=[logging.NullHandler()])
+
+    store_file = get_store_file(config_file, store_file)
+
+    rows = list(query_input_store(store_file, input_name, criticality, test_id))
+
+    headers = list(dict.fromkeys(itertools.chain.from_iterable([record.keys() for path, row_number, record in rows])))
+
+    writer = csv.writer(sys.stdout, delimiter='\t', lineterminator='\n')
+    writer.writerow(['File', 'Row'] + headers)
+    for path, row_number, record in rows:
+        writer.writerow([path, row_number] + [record.get(header, '') for header in headers])
+
+
+@cli.command('trace')
+@click.option('--config_file', type=click.Path(exists=True), required=True, help="The configuration file naming the User Requirements and OQ checklists")
+@click.option('--outfile', required=True, help="The tab-delimited traceability report")
+@click.option('--logfile', help="The log file, default no log file")
+def trace(config_file, outfile, logfile):
+    """Write the requirements without a test and the OQ tests without a requirement to a
+    tab-delimited report without rendering anything.  Exits with status 1 when there are problems.
+    """
+    if logfile is None:
+        logging.basicConfig(handlers=[logging.NullHandler()])
+    else:
+        configure_logging(logfile)
+
+    load_config(config_file)
+
+    input_files, problems = check_input_files(['User Requirements checklist', 'OQ checklist'])
+    for problem in problems:
+        logging.error(problem)
+        print(Fore.RED + problem)
+        print(Style.RESET_ALL + '', end='')
+
+    if len(problems) > 0:
+        sys.exit(1)
+
+    problem_count = write_traceability_report(outfile, get_traceability())
+
+    if problem_count > 0:
+        sys.exit(1)
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    cli()